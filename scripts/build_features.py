@@ -1,14 +1,58 @@
-"""Feature engineering script (stub)."""
+"""Build or incrementally update the per-(store, item) feature store.
 
+Example:
+    PYTHONPATH=src python -m scripts.build_features --sales data/sales.csv
+
+Sales CSV columns: date, store_id, item_id, units_sold[, on_hand][, promo].
+Persisted plans contribute stock observations unless --no-plans is given.
+"""
+
+import argparse
+import asyncio
 import logging
+import sys
+
+sys.path.insert(0, ".")
+from rimas.config import settings
+from rimas.logging import setup_logging
+from rimas.ml.features import DEFAULT_CHUNK_ROWS, build_features
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def main():
-    logger.info("Feature build stub - no features built")
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", action="append", default=[], help="Sales CSV (repeatable)")
+    parser.add_argument("--store-dir", default=settings.feature_store_dir)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--no-plans", action="store_true", help="Skip persisted plans")
+    parser.add_argument(
+        "--full", action="store_true", help="Rebuild from scratch, ignoring watermarks"
+    )
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace) -> None:
+    session_maker = None
+    if not args.no_plans:
+        from rimas.db.session import get_async_session_maker
+
+        session_maker = get_async_session_maker()
+    manifest = await build_features(
+        args.store_dir,
+        sales_paths=args.sales,
+        session_maker=session_maker,
+        full=args.full,
+        chunk_rows=args.chunk_rows,
+    )
+    logger.info(
+        "Feature store at %s: %d stores, as of day %s",
+        args.store_dir,
+        len(manifest["partitions"]),
+        manifest["end_day"],
+    )
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main(parse_args()))
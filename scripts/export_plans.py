@@ -0,0 +1,71 @@
+"""Export plans and recommendations as NDJSON, CSV or Parquet.
+
+Example:
+    PYTHONPATH=src python -m scripts.export_plans --store-id 1 \
+        --start 2024-01-01 --end 2024-02-01 --format parquet -o plans.parquet
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+
+sys.path.insert(0, ".")
+from rimas.db.session import get_async_session_maker
+from rimas.logging import setup_logging
+from rimas.services.export_service import (
+    DEFAULT_CHUNK_SIZE,
+    ExportFormat,
+    check_format_available,
+    stream_export,
+)
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store-id", type=int, default=None)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    parser.add_argument(
+        "--format",
+        choices=[f.value for f in ExportFormat],
+        default=ExportFormat.ndjson.value,
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "-o", "--output", default=None, help="Output file (default: stdout)"
+    )
+    return parser.parse_args(argv)
+
+
+async def export(args: argparse.Namespace) -> None:
+    fmt = ExportFormat(args.format)
+    check_format_available(fmt)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        async for chunk in stream_export(
+            get_async_session_maker(),
+            fmt,
+            store_id=args.store_id,
+            start=args.start,
+            end=args.end,
+            chunk_size=args.chunk_size,
+        ):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+    if args.output:
+        logger.info("Exported %d bytes to %s", written, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(export(parse_args()))
@@ -0,0 +1,77 @@
+"""Deterministic fake of an OpenAI-compatible chat completions endpoint.
+
+For local testing and benchmarking the LLM agent nodes without an API key
+or cost. Answers are a function of the prompt only: the `draft` object of
+the last user message, echoed back with `summary` / `rationale` strings
+marked as reviewed. Latency and a failure rate can be simulated; failures
+are chosen by prompt hash, so they are reproducible too.
+
+Example:
+    PYTHONPATH=src python -m scripts.fake_llm --port 8089 --latency-ms 300
+
+    OPENAI_API_KEY=fake LLM_BASE_URL=http://127.0.0.1:8089/v1 \
+        ORCHESTRATOR=langgraph uvicorn rimas.api.main:app
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def fake_answer(messages: list[dict]) -> str:
+    try:
+        prompt = json.loads(messages[-1]["content"])
+        answer = dict(prompt["draft"])
+    except (ValueError, KeyError, TypeError, IndexError):
+        return json.dumps({})
+    for key in ("summary", "rationale"):
+        if isinstance(answer.get(key), str):
+            answer[key] = f"{answer[key]} (reviewed)"
+    return json.dumps(answer, sort_keys=True)
+
+
+def create_app(latency_ms: float = 0.0, fail_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="fake-llm")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        digest = hashlib.sha256(json.dumps(body["messages"], sort_keys=True).encode()).digest()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if int.from_bytes(digest[:4], "big") / 2**32 < fail_rate:
+            return JSONResponse({"error": {"message": "simulated failure"}}, status_code=500)
+        return {
+            "id": f"fake-{digest.hex()[:16]}",
+            "object": "chat.completion",
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": fake_answer(body["messages"])},
+                "finish_reason": "stop",
+            }],
+        }
+
+    return app
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.fail_rate), host=args.host, port=args.port)
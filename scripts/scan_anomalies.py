@@ -0,0 +1,79 @@
+"""Backfill anomaly flags over historical sales with a vectorized batch scan.
+
+Example:
+    PYTHONPATH=src python -m scripts.scan_anomalies --sales data/sales.csv --workers 8
+
+Flags of the scanned stores within the scanned date range are replaced in
+the `anomaly_flags` table, so reruns are idempotent. Use -o to also write
+the flags as CSV, or --no-write to only report.
+"""
+
+import argparse
+import asyncio
+import csv
+import logging
+import sys
+
+sys.path.insert(0, ".")
+from rimas.logging import setup_logging
+from rimas.ml.anomaly_scan import FLAG_COLUMNS, ScanParams
+from rimas.ml.inference import scan_anomalies
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    defaults = ScanParams()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", action="append", required=True, help="Sales CSV (repeatable)")
+    parser.add_argument("--window", type=int, default=defaults.window, help="Trailing days")
+    parser.add_argument("--season", type=int, default=defaults.season, help="Season length in days")
+    parser.add_argument("--threshold", type=float, default=defaults.threshold)
+    parser.add_argument("--min-scale", type=float, default=defaults.min_scale)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("-o", "--output", default=None, help="Also write flags to this CSV")
+    parser.add_argument("--no-write", action="store_true", help="Do not write to the database")
+    return parser.parse_args(argv)
+
+
+def write_csv(path: str, flags: dict) -> None:
+    import numpy as np
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FLAG_COLUMNS)
+        days = flags["day"].astype("datetime64[D]").astype(str)
+        columns = [days if name == "day" else flags[name].tolist() for name in FLAG_COLUMNS]
+        writer.writerows(
+            ["" if isinstance(v, float) and np.isnan(v) else v for v in row] for row in zip(*columns)
+        )
+
+
+async def main(args: argparse.Namespace) -> None:
+    result = scan_anomalies(
+        args.sales,
+        window=args.window,
+        season=args.season,
+        threshold=args.threshold,
+        min_scale=args.min_scale,
+        workers=args.workers,
+    )
+    flags = result["flags"]
+    logger.info("Scanned %d points, flagged %d", result["points"], len(flags["day"]))
+    if args.output:
+        write_csv(args.output, flags)
+    if args.no_write or result["day_range"] is None:
+        return
+
+    from rimas.db.session import get_async_session_maker, init_db
+    from rimas.services.anomaly_service import write_flags
+
+    await init_db()
+    await write_flags(
+        get_async_session_maker(), flags, result["store_ids"], result["day_range"]
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -18,6 +18,7 @@ async def seed():
     maker = get_async_session_maker()
     async with maker() as session:
         plan = Plan(
+            store_id=1,
             request_payload={"store_id": 1, "horizon_days": 7, "items": []},
             agent_outputs={},
             final_decision={
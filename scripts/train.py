@@ -1,14 +1,81 @@
-"""Training script (stub)."""
+"""Train the demand and anomaly models and register them in MLflow.
 
+Example:
+    PYTHONPATH=src python -m scripts.train --sales data/sales.csv \
+        --tracking-uri file:./mlruns --workers 8
+
+Use --warm-start to fold only data after the current Production model's
+training window into it.
+"""
+
+import argparse
 import logging
+import sys
 
-logging.basicConfig(level=logging.INFO)
+sys.path.insert(0, ".")
+from rimas.config import settings
+from rimas.logging import setup_logging
+from rimas.ml.features import point_in_time_features, read_sales_daily
+from rimas.ml.training import (
+    DEFAULT_ALPHAS,
+    DEFAULT_FOLDS,
+    load_production,
+    log_and_register,
+    train_anomaly,
+    train_demand,
+)
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def main():
-    logger.info("Training stub - no model trained")
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", action="append", required=True, help="Sales CSV (repeatable)")
+    parser.add_argument("--model", choices=["demand", "anomaly", "all"], default="all")
+    parser.add_argument("--horizon-days", type=int, default=7)
+    parser.add_argument("--alphas", type=float, nargs="+", default=list(DEFAULT_ALPHAS))
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--workers", type=int, default=None, help="CV processes (default: all cores)")
+    parser.add_argument("--warm-start", action="store_true")
+    parser.add_argument("--tracking-uri", default=settings.mlflow_tracking_uri)
+    parser.add_argument("--no-register", action="store_true", help="Train and report only")
+    return parser.parse_args(argv)
+
+
+def main(args: argparse.Namespace) -> None:
+    daily = read_sales_daily(args.sales)
+    logger.info("Loaded %d daily rows", len(daily))
+
+    if args.model in ("demand", "all"):
+        base = load_production("demand_model", args.tracking_uri) if args.warm_start else None
+        x, y, days = point_in_time_features(daily, args.horizon_days)
+        model, metrics = train_demand(
+            x, y, days, args.alphas, args.folds, args.workers, base=base
+        )
+        logger.info("demand_model: %s", metrics)
+        if not args.no_register:
+            log_and_register(
+                "demand_model",
+                model,
+                {"horizon_days": args.horizon_days, "alpha": model.alpha, "warm_start": base is not None},
+                metrics,
+                args.tracking_uri,
+            )
+
+    if args.model in ("anomaly", "all"):
+        base = load_production("anomaly_model", args.tracking_uri) if args.warm_start else None
+        model, metrics = train_anomaly(daily, base=base)
+        logger.info("anomaly_model: %s", metrics)
+        if not args.no_register:
+            log_and_register(
+                "anomaly_model",
+                model,
+                {"warm_start": base is not None},
+                metrics,
+                args.tracking_uri,
+            )
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_args())
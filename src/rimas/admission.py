@@ -0,0 +1,199 @@
+"""Admission control for plan generation.
+
+Plan requests run in one of two priority classes, each with its own
+concurrency limit so nightly bulk runs cannot take the slots (and DB
+connections) interactive store-manager requests need:
+
+- `interactive`: POST /plans and /plans/ingest, one slot per request;
+- `bulk`: every plan of POST /plans/batch, one slot per plan.
+
+Within a class, waiting requests are served by start-time fair queuing on
+`store_id`: each store gets an equal share of the slots, so a store with a
+thousand queued plans delays another store's single plan by at most one
+turn, not a thousand. Queues are bounded; a full queue (or a wait that would
+outlast the request's deadline) is shed with `AdmissionRejected`, which the
+API turns into 429 + Retry-After.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Hashable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from rimas.config import settings
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+
+class AdmissionRejected(Exception):
+    """The request was shed; retry after `retry_after_s` seconds."""
+
+    def __init__(self, priority: str, reason: str, retry_after_s: int) -> None:
+        super().__init__(f"{priority} queue {reason}")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+@dataclass(order=True)
+class _Waiter:
+    start_tag: float
+    seq: int
+    key: Hashable = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class PriorityClass:
+    """Concurrency limit plus a bounded, store-fair queue for one priority class."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, wait_samples: int = 1024) -> None:
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._heap: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._finish_tags: dict[Hashable, float] = {}
+        self._service_s = 0.1  # EWMA of slot hold time, for Retry-After
+        self._waits: deque[float] = deque(maxlen=wait_samples)
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new request should have drained."""
+        backlog = (self.waiting + 1) / self.limit
+        return min(60, max(1, math.ceil(backlog * self._service_s)))
+
+    def check_capacity(self) -> None:
+        if self.waiting >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise AdmissionRejected(self.name, "full", self.retry_after())
+
+    def _enqueue(self, key: Hashable, cost: float) -> _Waiter:
+        start = max(self._virtual_time, self._finish_tags.get(key, 0.0))
+        self._finish_tags[key] = start + cost
+        waiter = _Waiter(
+            start, next(self._seq), key, asyncio.get_running_loop().create_future(), time.monotonic()
+        )
+        heapq.heappush(self._heap, waiter)
+        self.waiting += 1
+        self.counters["queued"] += 1
+        return waiter
+
+    def _grant_next(self) -> None:
+        while self._heap and self.in_flight < self.limit:
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():  # cancelled or timed out while queued
+                continue
+            self._virtual_time = waiter.start_tag
+            self.waiting -= 1
+            self.in_flight += 1
+            waiter.future.set_result(None)
+        if not self._heap:
+            # Idle: tags only matter relative to each other while a backlog exists.
+            self._finish_tags.clear()
+            self._virtual_time = 0.0
+
+    def _release(self, held_s: float) -> None:
+        self.in_flight -= 1
+        self._service_s += 0.1 * (held_s - self._service_s)
+        self._grant_next()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        key: Hashable,
+        timeout_s: float | None = None,
+        bounded: bool = True,
+        cost: float = 1.0,
+    ) -> AsyncIterator[None]:
+        """Hold one slot of this class for the duration of the block.
+
+        `timeout_s` bounds the queue wait; `bounded=False` skips the queue-size
+        check for work that was admitted as a whole (a batch's plans).
+        """
+        wait_s = 0.0
+        if self.in_flight < self.limit and not self.waiting:
+            self.in_flight += 1
+        else:
+            if bounded:
+                self.check_capacity()
+            waiter = self._enqueue(key, cost)
+            try:
+                await asyncio.wait_for(waiter.future, timeout_s)
+            except asyncio.TimeoutError:
+                self.waiting -= 1
+                self.counters["timed_out"] += 1
+                raise AdmissionRejected(self.name, "wait exceeded deadline", self.retry_after())
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release(0.0)  # granted just as the caller went away
+                else:
+                    self.waiting -= 1
+                raise
+            wait_s = time.monotonic() - waiter.enqueued_at
+        self.counters["admitted"] += 1
+        self._waits.append(wait_s)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "stores_waiting": len({w.key for w in self._heap if not w.future.done()}),
+            **self.counters,
+            "wait_ms": {
+                "mean": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                "p50": pct(0.5),
+                "p95": pct(0.95),
+                "max": round(waits[-1] * 1000, 2) if waits else 0.0,
+            },
+        }
+
+
+class AdmissionController:
+    def __init__(self, interactive_limit: int, interactive_queue: int, bulk_limit: int, bulk_queue: int) -> None:
+        self.classes = {
+            INTERACTIVE: PriorityClass(INTERACTIVE, interactive_limit, interactive_queue),
+            BULK: PriorityClass(BULK, bulk_limit, bulk_queue),
+        }
+
+    def __getitem__(self, priority: str) -> PriorityClass:
+        return self.classes[priority]
+
+    def stats(self) -> dict:
+        return {name: cls.stats() for name, cls in self.classes.items()}
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            interactive_limit=settings.admission_interactive_limit,
+            interactive_queue=settings.admission_interactive_queue,
+            bulk_limit=settings.admission_bulk_limit,
+            bulk_queue=settings.admission_bulk_queue,
+        )
+    return _controller
@@ -0,0 +1,175 @@
+"""Demand forecasts for plan items - one batched model call per plan.
+
+Forecasts (units over the plan horizon) are cached per (store, item,
+horizon) for the current UTC day and the serving model version: a new day
+or a hot-swapped model starts a fresh cache. Only the items missing from the
+cache go to `predict_demand_batch`, in a single call. Stub predictions (no
+model available) are returned but never cached, so real forecasts take over
+as soon as a model loads.
+
+With a `timeout_s` the model call runs on a small thread pool and the plan
+stops waiting when the budget runs out; the call still completes in the
+background and fills the cache for the next plan.
+"""
+
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, datetime
+
+from rimas.config import settings
+from rimas.ml.inference import predict_demand_batch
+from rimas.ml.model_manager import model_version
+
+logger = logging.getLogger(__name__)
+
+NO_FORECAST = float("nan")
+
+
+class ForecastCache:
+    """Bounded LRU of forecasts, scoped to one (day, model version) generation."""
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._generation: tuple[date, str | None] | None = None
+        self._entries: OrderedDict[tuple[int, int, int], float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_generation(self, generation: tuple[date, str | None]) -> None:
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get_many(
+        self, generation: tuple[date, str | None], store_id: int, item_ids: Sequence[int], horizon: int
+    ) -> tuple[array, list[int]]:
+        """(forecasts aligned with `item_ids`, indexes of the misses)."""
+        out = array("d", [NO_FORECAST]) * len(item_ids)
+        missing: list[int] = []
+        with self._lock:
+            self._check_generation(generation)
+            for i, item_id in enumerate(item_ids):
+                key = (store_id, item_id, horizon)
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(i)
+                    continue
+                self._entries.move_to_end(key)
+                out[i] = value
+            self.hits += len(item_ids) - len(missing)
+            self.misses += len(missing)
+        return out, missing
+
+    def put_many(
+        self,
+        generation: tuple[date, str | None],
+        store_id: int,
+        item_ids: Sequence[int],
+        horizon: int,
+        values: Sequence[float],
+    ) -> None:
+        with self._lock:
+            self._check_generation(generation)
+            for item_id, value in zip(item_ids, values):
+                self._entries[(store_id, item_id, horizon)] = value
+                self._entries.move_to_end((store_id, item_id, horizon))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache: ForecastCache | None = None
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_forecast_cache() -> ForecastCache:
+    global _cache
+    if _cache is None:
+        _cache = ForecastCache(settings.forecast_cache_max_entries)
+    return _cache
+
+
+def _predict_and_cache(
+    generation: tuple[date, str | None], store_id: int, item_ids: list[int], horizon_days: int
+) -> list[dict]:
+    preds = predict_demand_batch(store_id, item_ids, quantity=horizon_days)
+    if preds and not preds[0]["is_mock"]:
+        values = [p["prediction"] for p in preds]
+        get_forecast_cache().put_many(generation, store_id, item_ids, horizon_days, values)
+    return preds
+
+
+def _predict_within(timeout_s: float, *args) -> list[dict]:
+    global _executor
+    if timeout_s <= 0:
+        raise FutureTimeoutError()
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="forecast")
+    return _executor.submit(_predict_and_cache, *args).result(timeout=timeout_s)
+
+
+def forecast_items(
+    store_id: int | None,
+    item_ids: Sequence[int],
+    horizon_days: int,
+    timeout_s: float | None = None,
+) -> dict:
+    """Forecast demand over `horizon_days` for all items of a plan.
+
+    Returns `forecasts` (array aligned with `item_ids`, NaN where no model
+    forecast is available), `cached` (how many came from the cache),
+    `is_mock` and `timed_out` (the model call exceeded `timeout_s`).
+    """
+    if store_id is None or not item_ids:
+        return {
+            "forecasts": array("d", [NO_FORECAST]) * len(item_ids),
+            "cached": 0,
+            "is_mock": True,
+            "timed_out": False,
+        }
+
+    cache = get_forecast_cache()
+    generation = (datetime.utcnow().date(), model_version("demand_model"))
+    forecasts, missing = cache.get_many(generation, store_id, item_ids, horizon_days)
+    is_mock = timed_out = False
+    if missing:
+        miss_ids = [item_ids[i] for i in missing]
+        try:
+            args = (generation, store_id, miss_ids, horizon_days)
+            preds = _predict_and_cache(*args) if timeout_s is None else _predict_within(timeout_s, *args)
+        except FutureTimeoutError:
+            logger.warning("Demand forecast timed out", extra={"store_id": store_id, "items": len(miss_ids)})
+            preds, timed_out = [], True
+        except Exception:
+            logger.exception("Demand forecast failed", extra={"store_id": store_id, "items": len(miss_ids)})
+            preds = []
+        is_mock = not preds or preds[0]["is_mock"]
+        if not is_mock:
+            for i, pred in zip(missing, preds):
+                forecasts[i] = pred["prediction"]
+    return {
+        "forecasts": forecasts,
+        "cached": len(item_ids) - len(missing),
+        "is_mock": is_mock,
+        "timed_out": timed_out,
+    }
@@ -1,6 +1,6 @@
 """LangGraph workflow for multi-agent plans."""
 
-from langgraph.graph import StateGraph, END
+from functools import lru_cache
 
 from rimas.agents.state import PlanState
 from rimas.agents.data_analyst import data_analyst_agent
@@ -9,7 +9,11 @@ from rimas.agents.marketing import marketing_agent
 from rimas.agents.supervisor import supervisor_agent
 
 
+@lru_cache(maxsize=1)
 def build_plan_graph():
+    """Compile the legacy graph once; langgraph is imported on first use."""
+    from langgraph.graph import StateGraph, END
+
     graph = StateGraph(PlanState)
 
     graph.add_node("data_analyst", data_analyst_agent)
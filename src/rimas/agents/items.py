@@ -0,0 +1,69 @@
+"""Compact plan item storage.
+
+Items are held as parallel `array('q')` columns (struct-of-arrays) instead of
+one object per item: ~16 bytes per item, iterable as lightweight records.
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple
+
+
+class PlanItemRecord(NamedTuple):
+    item_id: int
+    current_stock: int
+
+
+class PlanItems:
+    """Array-backed columns of plan items (`item_ids`, `stocks`)."""
+
+    __slots__ = ("item_ids", "stocks")
+
+    def __init__(
+        self,
+        item_ids: Iterable[int] = (),
+        stocks: Iterable[int] = (),
+    ) -> None:
+        self.item_ids = array("q", item_ids)
+        self.stocks = array("q", stocks)
+        if len(self.item_ids) != len(self.stocks):
+            raise ValueError("item_ids and stocks must have the same length")
+
+    @classmethod
+    def from_inputs(cls, items: Iterable) -> "PlanItems":
+        """Build from objects or dicts exposing `item_id` / `current_stock`."""
+        out = cls()
+        for item in items:
+            if isinstance(item, dict):
+                out.append(item["item_id"], item["current_stock"])
+            else:
+                out.append(item.item_id, item.current_stock)
+        return out
+
+    def append(self, item_id: int, current_stock: int) -> None:
+        self.item_ids.append(item_id)
+        try:
+            self.stocks.append(current_stock)
+        except (TypeError, OverflowError):
+            self.item_ids.pop()
+            raise
+
+    def extend(self, item_ids: Iterable[int], stocks: Iterable[int]) -> None:
+        ids = array("q", item_ids)
+        st = array("q", stocks)
+        if len(ids) != len(st):
+            raise ValueError("item_id and current_stock columns differ in length")
+        self.item_ids.extend(ids)
+        self.stocks.extend(st)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def __iter__(self) -> Iterator[PlanItemRecord]:
+        return map(PlanItemRecord, self.item_ids, self.stocks)
+
+    def to_dicts(self) -> list[dict]:
+        return [
+            {"item_id": i, "current_stock": s}
+            for i, s in zip(self.item_ids, self.stocks)
+        ]
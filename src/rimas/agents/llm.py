@@ -0,0 +1,345 @@
+"""LLM calls for agent nodes: response cache, rate limits, timeouts, fallback.
+
+Requests go to an OpenAI-compatible `/chat/completions` endpoint
+(`settings.llm_base_url`; see `scripts/fake_llm.py` for a deterministic local
+stand-in). Every call:
+
+- is keyed by a SHA-256 of the normalized prompt (model, temperature and
+  whitespace-collapsed messages) and served from an in-memory LRU, then the
+  on-disk cache, before the endpoint is called; concurrent identical prompts
+  share one call;
+- waits for a slot of a process-wide semaphore (`llm_max_concurrency`) and a
+  token of a token bucket (`llm_requests_per_s`, `llm_burst`);
+- is bounded as a whole (queueing included) by `llm_timeout_s`.
+
+`llm_node` wraps a heuristic node: the LLM refines the heuristic's output,
+and any timeout, error or unusable answer falls back to the heuristic output.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from rimas.config import settings
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a retail planning analyst. You receive plan statistics and a draft "
+    "analysis as JSON. Reply with one JSON object that has exactly the keys of "
+    "`draft`, adjusting values only when the statistics justify it."
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def prompt_key(model: str, messages: list[dict], temperature: float = 0.0) -> str:
+    normalized = [
+        {"role": m["role"], "content": _WHITESPACE.sub(" ", m["content"]).strip()}
+        for m in messages
+    ]
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": normalized},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, at most `burst` banked."""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ResponseCache:
+    """LRU of responses in memory, backed by one JSON file per key on disk."""
+
+    def __init__(self, root: str | Path | None, max_entries: int = 10_000) -> None:
+        self.root = Path(root) if root else None
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _remember(self, key: str, content: str) -> None:
+        self._entries[key] = content
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_memory(self, key: str) -> str | None:
+        content = self._entries.get(key)
+        if content is not None:
+            self._entries.move_to_end(key)
+        return content
+
+    def read_disk(self, key: str) -> str | None:
+        if self.root is None:
+            return None
+        try:
+            return json.loads(self._path(key).read_text())["content"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def write_disk(self, key: str, content: str) -> None:
+        if self.root is None:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"content": content, "created_at": time.time()}, f)
+        os.replace(tmp, path)
+
+    async def get(self, key: str) -> str | None:
+        content = self.get_memory(key)
+        if content is None:
+            content = await asyncio.to_thread(self.read_disk, key)
+            if content is not None:
+                self._remember(key, content)
+        return content
+
+    async def put(self, key: str, content: str) -> None:
+        self._remember(key, content)
+        await asyncio.to_thread(self.write_disk, key, content)
+
+
+class LLMClient:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None,
+        model: str,
+        timeout_s: float = 10.0,
+        max_concurrency: int = 8,
+        requests_per_s: float = 5.0,
+        burst: float = 10.0,
+        cache: ResponseCache | None = None,
+        transport=None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout_s = timeout_s
+        self.max_concurrency = max_concurrency
+        self.requests_per_s = requests_per_s
+        self.burst = burst
+        self.cache = cache if cache is not None else ResponseCache(None)
+        self._transport = transport
+        # Loop-bound primitives, recreated if used from another event loop
+        # (e.g. batch workers running each plan with asyncio.run).
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._http = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._bucket: TokenBucket | None = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.counters = {"calls": 0, "cache_hits": 0, "shared": 0, "timeouts": 0, "errors": 0}
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        import httpx
+
+        self._loop = loop
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {},
+            timeout=self.timeout_s,
+            transport=self._transport,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.requests_per_s, self.burst)
+        self._inflight = {}
+
+    async def _call(self, messages: list[dict]) -> str:
+        async with self._semaphore:
+            await self._bucket.acquire()
+            self.counters["calls"] += 1
+            response = await self._http.post(
+                "/chat/completions",
+                json={
+                    "model": self.model,
+                    "messages": messages,
+                    "temperature": 0,
+                    "response_format": {"type": "json_object"},
+                },
+            )
+            response.raise_for_status()
+            return response.json()["choices"][0]["message"]["content"]
+
+    async def _complete(self, key: str, messages: list[dict]) -> str:
+        content = await self.cache.get(key)
+        if content is not None:
+            self.counters["cache_hits"] += 1
+            return content
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.counters["shared"] += 1
+            return await asyncio.shield(pending)
+        future = self._loop.create_future()
+        self._inflight[key] = future
+        try:
+            content = await self._call(messages)
+            await self.cache.put(key, content)
+            future.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            # The owner timed out; callers sharing the call fall back too.
+            future.set_exception(asyncio.TimeoutError())
+            future.exception()  # mark retrieved when no one else is waiting
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def complete(self, messages: list[dict], timeout_s: float | None = None) -> str:
+        """Response content for `messages`; raises on timeout or endpoint errors.
+
+        `timeout_s` can only shorten the client's own timeout (e.g. to fit a
+        request deadline).
+        """
+        self._bind_loop()
+        key = prompt_key(self.model, messages)
+        timeout = self.timeout_s if timeout_s is None else min(timeout_s, self.timeout_s)
+        try:
+            return await asyncio.wait_for(self._complete(key, messages), timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+
+    def stats(self) -> dict:
+        return {**self.counters, "cached_entries": len(self.cache)}
+
+    async def aclose(self) -> None:
+        if self._http is not None and self._loop is asyncio.get_running_loop():
+            await self._http.aclose()
+        self._http = self._loop = None
+
+
+_client: LLMClient | None = None
+
+
+def get_llm_client() -> LLMClient:
+    global _client
+    if _client is None:
+        _client = LLMClient(
+            base_url=settings.llm_base_url,
+            api_key=settings.openai_api_key,
+            model=settings.llm_model,
+            timeout_s=settings.llm_timeout_s,
+            max_concurrency=settings.llm_max_concurrency,
+            requests_per_s=settings.llm_requests_per_s,
+            burst=settings.llm_burst,
+            cache=ResponseCache(settings.llm_cache_dir, settings.llm_cache_max_entries),
+        )
+    return _client
+
+
+async def close_llm_client() -> None:
+    if _client is not None:
+        await _client.aclose()
+
+
+def _merge(draft: dict, answer: Any) -> dict | None:
+    """Draft values overridden by answer values of the same JSON type, or None."""
+    if not isinstance(answer, dict):
+        return None
+    out = dict(draft)
+    for key, value in draft.items():
+        new = answer.get(key)
+        if new is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if isinstance(new, (int, float)) and not isinstance(new, bool):
+                out[key] = new
+        elif type(new) is type(value):
+            out[key] = new
+    return out
+
+
+def llm_node(
+    output_key: str,
+    heuristic: Callable[[dict], dict],
+    facts: Callable[[dict], dict],
+    client_factory: Callable[[], LLMClient] = get_llm_client,
+    budget: Callable[[dict], float | None] = lambda state: None,
+):
+    """Async node refining `heuristic`'s `agent_outputs[output_key]` with the LLM.
+
+    `facts(state)` gives the compact plan statistics sent with the draft; it
+    must not include per-item lists, so prompts stay small on large plans.
+    `budget(state)` bounds the call further (seconds, None for no bound);
+    with no budget left the heuristic output is used without calling.
+    """
+
+    async def node(state: dict) -> dict:
+        update = heuristic(state)
+        draft = update["agent_outputs"][output_key]
+        timeout_s = budget(state)
+        if timeout_s is not None and timeout_s <= 0:
+            outputs = {output_key: {**draft, "source": "heuristic", "fallback_reason": "deadline"}}
+            return {**update, "agent_outputs": {**update["agent_outputs"], **outputs}}
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": json.dumps(
+                    {"task": output_key, "facts": facts(state), "draft": draft},
+                    sort_keys=True,
+                    default=str,
+                ),
+            },
+        ]
+        try:
+            content = await client_factory().complete(messages, timeout_s)
+            merged = _merge(draft, json.loads(content))
+            if merged is None:
+                raise ValueError("answer is not a JSON object")
+        except Exception as e:
+            reason = "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+            logger.warning("LLM node fell back to heuristic", extra={"node": output_key, "reason": reason})
+            outputs = {output_key: {**draft, "source": "heuristic", "fallback_reason": reason}}
+        else:
+            outputs = {output_key: {**merged, "source": "llm"}}
+        return {**update, "agent_outputs": {**update["agent_outputs"], **outputs}}
+
+    node.__name__ = f"{output_key}_llm_node"
+    return node
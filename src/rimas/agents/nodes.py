@@ -1,19 +1,40 @@
 """LangGraph nodes for plan orchestration."""
 
 import logging
+import math
 
+from rimas.agents.forecast import forecast_items
+from rimas.agents.items import PlanItems
+from rimas.agents.llm import llm_node
 from rimas.agents.state import PlanState
+from rimas.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _state_items(state: PlanState) -> PlanItems:
+    """Plan items from state (falls back to legacy `request["items"]` dicts)."""
+    items = state.get("items")
+    if items is None:
+        items = PlanItems.from_inputs((state.get("request") or {}).get("items", []))
+    return items
+
+
+def node_budget(state: PlanState) -> float | None:
+    """Seconds an expensive node may spend, or None without a deadline."""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return deadline.budget(settings.plan_node_reserve_ms / 1000)
+
+
 def data_analysis_node(state: PlanState) -> dict:
     """Analyze data patterns from request."""
     request = state.get("request") or {}
-    items = request.get("items", [])
+    items = _state_items(state)
     horizon = request.get("horizon_days", 7)
 
-    low_stock = sum(1 for i in items if i.get("current_stock", 0) < 30)
+    low_stock = sum(1 for stock in items.stocks if stock < 30)
     summary = f"Stub: {len(items)} items, {low_stock} low-stock, horizon={horizon}d"
     trends = ["stable", "seasonal"] if low_stock <= len(items) / 2 else ["declining", "restock_needed"]
 
@@ -29,11 +50,44 @@ def data_analysis_node(state: PlanState) -> dict:
     }
 
 
+def order_quantity(stock: int, forecast: float) -> int:
+    """Units to order so stock covers the forecast; without one, top up to 50."""
+    target = 50 if math.isnan(forecast) else math.ceil(forecast)
+    return max(0, target - stock)
+
+
+def forecast_summary(result: dict, horizon: int) -> dict:
+    """Agent output for a `forecast_items` result (no per-item values)."""
+    known = [f for f in result["forecasts"] if not math.isnan(f)]
+    output = {
+        "horizon_days": horizon,
+        "forecast_count": len(known),
+        "cached_count": result["cached"],
+        "total_demand": round(sum(known), 2),
+        "is_mock": result["is_mock"],
+    }
+    if result["timed_out"]:
+        # Items the cache could not serve fall back to the stock heuristic.
+        output.update(source="heuristic", fallback_reason="deadline")
+    return output
+
+
+def demand_forecast_node(state: PlanState) -> dict:
+    """Forecast demand over the horizon for all items with one batched model call."""
+    request = state.get("request") or {}
+    items = _state_items(state)
+    horizon = request.get("horizon_days", 7)
+
+    result = forecast_items(request.get("store_id"), items.item_ids, horizon, node_budget(state))
+    return {
+        "forecasts": result["forecasts"],
+        "agent_outputs": {"demand_forecast": forecast_summary(result, horizon)},
+    }
+
+
 def inventory_analysis_node(state: PlanState) -> dict:
     """Analyze inventory levels and reorder needs."""
-    request = state.get("request") or {}
-    items = request.get("items", [])
-    constraints = request.get("constraints", {})
+    items = _state_items(state)
 
     if not items:
         return {
@@ -46,7 +100,7 @@ def inventory_analysis_node(state: PlanState) -> dict:
             }
         }
 
-    total_stock = sum(i.get("current_stock", 0) for i in items)
+    total_stock = sum(items.stocks)
     avg_stock = total_stock / len(items)
     stock_level = "adequate" if avg_stock >= 30 else "low" if avg_stock >= 10 else "critical"
     risk_score = max(0.0, 1.0 - avg_stock / 50)
@@ -95,7 +149,7 @@ def marketing_analysis_node(state: PlanState) -> dict:
 def supervisor_node(state: PlanState) -> dict:
     """Aggregate agent outputs and produce final recommendations."""
     request = state.get("request") or {}
-    items = request.get("items", [])
+    items = _state_items(state)
     constraints = request.get("constraints", {})
     max_discount = constraints.get("max_discount", 0.2)
     agent_outputs = state.get("agent_outputs") or {}
@@ -103,13 +157,19 @@ def supervisor_node(state: PlanState) -> dict:
     inv = agent_outputs.get("inventory_analysis", {})
     mkt = agent_outputs.get("marketing_analysis", {})
 
+    forecasts = state.get("forecasts")
+    if forecasts is None or len(forecasts) != len(items):
+        forecasts = [math.nan] * len(items)
+
     recommendations = []
-    for item in items:
-        item_id = item.get("item_id", 0)
-        stock = item.get("current_stock", 0)
-        qty = max(0, 50 - stock) if stock < 50 else 0
+    for item_id, stock, forecast in zip(items.item_ids, items.stocks, forecasts):
+        qty = order_quantity(stock, forecast)
         discount = min(0.1, max_discount) if qty > 0 else 0.0
-        rationale = f"stock={stock}, {inv.get('recommendation', 'maintain')}, {mkt.get('suggested_action', '')}"
+        demand = "" if math.isnan(forecast) else f"forecast={forecast:.1f}, "
+        rationale = (
+            f"stock={stock}, {demand}{inv.get('recommendation', 'maintain')}, "
+            f"{mkt.get('suggested_action', '')}"
+        )
         recommendations.append({
             "item_id": item_id,
             "recommended_order_qty": qty,
@@ -133,3 +193,34 @@ def supervisor_node(state: PlanState) -> dict:
         "final_decision": final_decision,
         "recommendations": recommendations,
     }
+
+
+# -- LLM variants (used when an LLM is configured) ------------------------------
+
+def _plan_facts(state: PlanState) -> dict:
+    """Compact plan statistics for LLM prompts (no per-item lists)."""
+    request = state.get("request") or {}
+    items = _state_items(state)
+    stocks = items.stocks
+    forecast = (state.get("agent_outputs") or {}).get("demand_forecast", {})
+    return {
+        "store_id": request.get("store_id"),
+        "horizon_days": request.get("horizon_days", 7),
+        "item_count": len(items),
+        "min_stock": min(stocks, default=0),
+        "mean_stock": round(sum(stocks) / len(stocks), 1) if stocks else 0.0,
+        "max_stock": max(stocks, default=0),
+        "low_stock_count": sum(1 for stock in stocks if stock < 30),
+        "forecast_demand": forecast.get("total_demand"),
+    }
+
+
+data_analysis_llm_node = llm_node(
+    "data_analysis", data_analysis_node, _plan_facts, budget=node_budget
+)
+inventory_analysis_llm_node = llm_node(
+    "inventory_analysis", inventory_analysis_node, _plan_facts, budget=node_budget
+)
+marketing_analysis_llm_node = llm_node(
+    "marketing_analysis", marketing_analysis_node, _plan_facts, budget=node_budget
+)
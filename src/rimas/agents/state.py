@@ -1,11 +1,21 @@
 """Shared state for multi-agent workflow."""
 
+from array import array
 from datetime import datetime
 from typing import Annotated, TypedDict
 
+from rimas.agents.items import PlanItems
+from rimas.deadline import Deadline
+from rimas.services.checkpoint_service import CheckpointStore
+
 
 def _merge_agent_outputs(left: dict, right: dict) -> dict:
-    """Merge agent output updates (right into left)."""
+    """Merge agent output updates (right into left).
+
+    Returns a new dict: LangGraph keeps references to earlier channel values
+    (streamed states, checkpoints), so the accumulator must not be mutated.
+    The dict holds one entry per agent, so the copy is bounded by node count.
+    """
     out = dict(left) if left else {}
     if right:
         out.update(right)
@@ -15,8 +25,12 @@ def _merge_agent_outputs(left: dict, right: dict) -> dict:
 class PlanState(TypedDict, total=False):
     """Workflow state for plan orchestration."""
 
-    request: dict
+    request: dict  # request header (store_id, horizon_days, constraints), no items
+    items: PlanItems  # shared by reference across nodes, never copied
+    forecasts: array  # demand over the horizon, aligned with items (NaN: none)
     trace_id: str
+    deadline: Deadline | None  # request deadline; expensive nodes degrade when it nears
+    checkpoints: CheckpointStore | None  # saved node updates, for resumable runs
     generated_at: datetime
     agent_outputs: Annotated[dict, _merge_agent_outputs]
     final_decision: dict
@@ -1,13 +1,28 @@
 """FastAPI dependencies."""
 
+import math
+import time
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from rimas.db.replica import LAST_WRITE_COOKIE, get_replica_router
 from rimas.db.session import get_async_session_maker
 
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+
+async def get_db(request: Request, response: Response) -> AsyncGenerator[AsyncSession, None]:
+    router = get_replica_router()
+    if router is not None and request.method not in _SAFE_METHODS:
+        # Read-your-writes: this client's reads go to the primary for a while.
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            f"{time.time():.3f}",
+            max_age=math.ceil(router.read_your_writes_s),
+            httponly=True,
+        )
     maker = get_async_session_maker()
     async with maker() as session:
         try:
@@ -18,3 +33,43 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+def get_session_maker() -> async_sessionmaker[AsyncSession]:
+    """Session factory for handlers that outlive the request (streaming bodies)."""
+    return get_async_session_maker()
+
+
+def _last_write_at(request: Request) -> float | None:
+    try:
+        return float(request.cookies[LAST_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        return None
+
+
+async def get_read_db(
+    request: Request,
+    primary: AsyncSession = Depends(get_db),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only handlers: the replica when it is configured,
+    caught up and the client has not written recently; else the primary.
+
+    The primary session connects lazily, so replica reads never touch it.
+    """
+    router = get_replica_router()
+    if router is None or not await router.use_replica(_last_write_at(request)):
+        yield primary
+        return
+    async with router.session_maker() as session:
+        yield session
+
+
+async def get_read_session_maker(
+    request: Request,
+    primary: async_sessionmaker[AsyncSession] = Depends(get_session_maker),
+) -> async_sessionmaker[AsyncSession]:
+    """Like `get_read_db`, for read-only handlers that stream (exports)."""
+    router = get_replica_router()
+    if router is None or not await router.use_replica(_last_write_at(request)):
+        return primary
+    return router.session_maker
@@ -7,9 +7,19 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from rimas.api.compression import CompressionMiddleware
+from rimas.config import settings
 from rimas.logging import setup_logging
-from rimas.db.session import init_db
+from rimas.db.replica import dispose_replica
+from rimas.db.session import get_async_session_maker, init_db
+from rimas.db.shards import dispose_shards, init_shards
 from rimas.api.routes import health, predict, anomaly, plans
+from rimas.agents.llm import close_llm_client
+from rimas.ml.model_manager import start_model_managers, stop_model_managers
+from rimas.services.anomaly_service import start_checkpointer, stop_checkpointer
+from rimas.services.audit_buffer import start_audit_buffer, stop_audit_buffer
+from rimas.services.batch_service import shutdown_process_pool
+from rimas.services.checkpoint_service import start_checkpoint_cleanup, stop_checkpoint_cleanup
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -18,7 +28,20 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await init_shards()
+    await start_model_managers()
+    start_checkpointer(get_async_session_maker())
+    start_checkpoint_cleanup(get_async_session_maker())
+    await start_audit_buffer(get_async_session_maker())
     yield
+    await stop_checkpoint_cleanup()
+    await stop_audit_buffer()
+    await stop_checkpointer(get_async_session_maker())
+    await stop_model_managers()
+    await close_llm_client()
+    await dispose_replica()
+    await dispose_shards()
+    shutdown_process_pool()
 
 
 app = FastAPI(
@@ -36,6 +59,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    path_prefixes=("/plans",),
+    minimum_size=settings.compression_min_bytes,
+    gzip_level=settings.compression_gzip_level,
+    zstd_level=settings.compression_zstd_level,
+)
+
 app.include_router(health.router, tags=["Health"])
 app.include_router(predict.router, prefix="/predict-demand", tags=["ML"])
 app.include_router(anomaly.router, prefix="/detect-anomaly", tags=["ML"])
@@ -1,11 +1,15 @@
 """Anomaly detection endpoint."""
 
 import logging
+from datetime import datetime
 
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from rimas.api.deps import get_db
 from rimas.ml.inference import detect_anomaly
+from rimas.services.anomaly_service import score_stream
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -30,3 +34,43 @@ async def anomaly_endpoint(req: AnomalyRequest) -> AnomalyResponse:
         value=req.value or 0.0,
     )
     return AnomalyResponse(**result)
+
+
+class StreamPoint(BaseModel):
+    metric: str
+    ts: datetime
+    value: float
+
+
+class StreamRequest(BaseModel):
+    store_id: int
+    points: list[StreamPoint] = Field(min_length=1, max_length=10_000)
+
+
+class StreamPointResult(BaseModel):
+    metric: str
+    ts: datetime
+    value: float
+    score: float
+    is_anomaly: bool
+    mean: float
+    std: float
+    late: bool
+
+
+class StreamResponse(BaseModel):
+    store_id: int
+    results: list[StreamPointResult]
+
+
+@router.post("/stream", response_model=StreamResponse)
+async def anomaly_stream_endpoint(
+    req: StreamRequest,
+    db: AsyncSession = Depends(get_db),
+) -> StreamResponse:
+    """Score a batch of timestamped points against per-(store, metric) history."""
+    scores = await score_stream(db, req.store_id, req.points)
+    return StreamResponse(
+        store_id=req.store_id,
+        results=[StreamPointResult(**vars(s)) for s in scores],
+    )
@@ -2,9 +2,69 @@
 
 from fastapi import APIRouter
 
+from rimas.config import settings
+
 router = APIRouter()
 
 
 @router.get("/health")
 def health() -> dict:
     return {"status": "healthy", "service": "rimas"}
+
+
+@router.get("/health/models")
+def model_health() -> dict:
+    """Serving version and shadow-scoring stats of each managed model."""
+    from rimas.ml.model_manager import MANAGED_MODELS, get_model_manager
+
+    return {name: get_model_manager(name).status() for name in MANAGED_MODELS}
+
+
+@router.get("/health/features")
+def feature_health() -> dict:
+    """Online feature cache size and hit/miss counters."""
+    from rimas.ml.online_features import get_online_features
+
+    return get_online_features().stats()
+
+
+@router.get("/health/llm")
+def llm_health() -> dict:
+    """LLM call, cache and timeout counters of this worker."""
+    from rimas.agents.llm import get_llm_client
+
+    return {"enabled": settings.has_llm, **get_llm_client().stats()}
+
+
+@router.get("/health/admission")
+def admission_health() -> dict:
+    """In-flight, queued and shed plan requests and queue waits per priority class."""
+    from rimas.admission import get_admission
+
+    return get_admission().stats()
+
+
+@router.get("/health/plan-cache")
+def plan_cache_health() -> dict:
+    """Size and hit/revalidation counters of this worker's plan response cache."""
+    from rimas.services.plan_cache import get_plan_cache
+
+    return get_plan_cache().stats()
+
+
+@router.get("/health/replica")
+def replica_health() -> dict:
+    """Replica lag and how reads were routed by this worker."""
+    from rimas.db.replica import get_replica_router
+
+    router = get_replica_router()
+    return {"enabled": router is not None, **(router.stats() if router else {})}
+
+
+@router.get("/health/audit")
+def audit_health() -> dict:
+    """Write-behind audit buffer size and flush counters of this worker."""
+    from rimas.services.audit_buffer import get_audit_buffer
+
+    buffer = get_audit_buffer()
+    return {"write_behind": buffer is not None, **(buffer.stats() if buffer else {})}
@@ -2,14 +2,39 @@
 
 import logging
 import uuid
+from datetime import date, datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from rimas.api.deps import get_db
-from rimas.api.schemas import CreatePlanRequest, PlanMetadata, PlanResponse
+from rimas.admission import BULK, INTERACTIVE, AdmissionRejected, get_admission
+from rimas.api.deps import get_db, get_read_db, get_read_session_maker, get_session_maker
+from rimas.config import settings
+from rimas.db.shards import get_shards, use_plan_shard, use_store_shard
+from rimas.deadline import Deadline, DeadlineExceeded, run_within
+from rimas.logging import log_context
+from rimas.api.schemas import (
+    BatchPlanRequest,
+    BatchPlanResponse,
+    BatchPlanResult,
+    CreatePlanRequest,
+    PlanMetadata,
+    PlanResponse,
+    PlanStatsResponse,
+)
+from rimas.services.batch_service import iter_plan_batch, run_plan_batch
+from rimas.services.export_service import (
+    MEDIA_TYPES,
+    ExportFormat,
+    check_format_available,
+    stream_export,
+)
+from rimas.services.ingest import NDJSON_MEDIA_TYPES, PlanIngestError, parse_plan_ndjson
 from rimas.services.orchestration import run_plan_workflow
-from rimas.services.plan_service import get_plan, approve_plan, reject_plan
+from rimas.services.plan_cache import etag_matches, get_plan_cache, plan_etag
+from rimas.services.plan_stats_service import get_plan_stats, get_plan_stats_across
+from rimas.services.plan_service import get_plan, get_plan_updated_at, approve_plan, reject_plan
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -32,12 +57,101 @@ def _plan_to_response(plan) -> PlanResponse:
     )
 
 
+def _request_deadline(header_ms: int | None, body_ms: int | None = None) -> Deadline:
+    """Deadline from the client's budget, capped at the interactive SLA."""
+    requested = header_ms or body_ms or settings.plan_deadline_ms
+    return Deadline.after_ms(min(requested, settings.plan_deadline_ms))
+
+
+def _shed(e: AdmissionRejected, store_id: int | None = None) -> HTTPException:
+    logger.warning("Plan request shed", extra={"priority": e.priority, "reason": e.reason, "store_id": store_id})
+    return HTTPException(
+        status_code=429,
+        detail=f"Too many plan requests ({e})",
+        headers={"Retry-After": str(e.retry_after_s)},
+    )
+
+
+async def _run_interactive_plan(
+    req, db: AsyncSession, deadline: Deadline, idempotency_key: str | None = None
+) -> dict:
+    """Generate, persist and commit a plan within `deadline`.
+
+    Waits for an interactive admission slot first (429 if the queue is full
+    or the wait would leave too little of the deadline), then fails with 504
+    if generation and commit overrun what is left. A retry with the same
+    `idempotency_key` resumes the interrupted run or returns its plan.
+    """
+    reserve_s = (settings.plan_persist_reserve_ms + settings.plan_node_reserve_ms) / 1000
+    admission = get_admission()[INTERACTIVE]
+    use_store_shard(db, req.store_id)
+    with log_context(store_id=req.store_id, trace_id=idempotency_key):
+        try:
+            async with admission.slot(req.store_id, timeout_s=deadline.budget(reserve_s)):
+                result = await run_plan_workflow(
+                    req=req, db=db, deadline=deadline, idempotency_key=idempotency_key
+                )
+                await run_within(deadline, db.commit())
+        except AdmissionRejected as e:
+            raise _shed(e, req.store_id)
+        except DeadlineExceeded:
+            logger.warning("Plan deadline exceeded")
+            raise HTTPException(status_code=504, detail="Plan deadline exceeded")
+    return result
+
+
 @router.post("/", response_model=PlanResponse)
 async def create_plan_endpoint(
     req: CreatePlanRequest,
     db: AsyncSession = Depends(get_db),
+    x_deadline_ms: int | None = Header(default=None, gt=0),
+    idempotency_key: str | None = Header(default=None, min_length=1, max_length=128),
+) -> PlanResponse:
+    """Create a plan within the client's deadline (`X-Deadline-Ms` or `deadline_ms`).
+
+    Budgets above `settings.plan_deadline_ms` are capped to it. Retries
+    sent with the same `Idempotency-Key` resume from the last finished node
+    (or return the plan already created) instead of starting over.
+    """
+    deadline = _request_deadline(x_deadline_ms, req.deadline_ms)
+    result = await _run_interactive_plan(req, db, deadline, idempotency_key)
+    return PlanResponse(
+        plan_id=result["plan_id"],
+        status=result["status"],
+        recommendations=result["recommendations"],
+        metadata=result["metadata"],
+    )
+
+
+@router.post(
+    "/ingest",
+    response_model=PlanResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def ingest_plan_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    x_deadline_ms: int | None = Header(default=None, gt=0),
+    idempotency_key: str | None = Header(default=None, min_length=1, max_length=128),
 ) -> PlanResponse:
-    result = await run_plan_workflow(req=req, db=db)
+    """Create a plan from a streamed NDJSON body (header line + item lines).
+
+    The deadline (`X-Deadline-Ms`, capped at `settings.plan_deadline_ms`)
+    starts once the body is parsed.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in NDJSON_MEDIA_TYPES:
+        raise HTTPException(status_code=415, detail="Expected application/x-ndjson")
+    try:
+        req = await parse_plan_ndjson(request.stream())
+    except PlanIngestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    result = await _run_interactive_plan(req, db, _request_deadline(x_deadline_ms), idempotency_key)
     return PlanResponse(
         plan_id=result["plan_id"],
         status=result["status"],
@@ -46,15 +160,130 @@ async def create_plan_endpoint(
     )
 
 
+@router.post("/batch", response_model=BatchPlanResponse)
+async def create_plan_batch_endpoint(
+    req: BatchPlanRequest,
+    stream: bool = False,
+    session_maker: async_sessionmaker = Depends(get_session_maker),
+):
+    """Generate plans for many stores.
+
+    With `stream=true` results are sent as NDJSON lines as soon as each
+    persisted chunk commits; otherwise all results are returned in request order.
+    Plans run in the bulk admission class; the batch is shed with 429 while
+    the bulk queue is full.
+    """
+    try:
+        get_admission()[BULK].check_capacity()
+    except AdmissionRejected as e:
+        raise _shed(e)
+    if not stream:
+        results = await run_plan_batch(req.plans, session_maker)
+        return BatchPlanResponse(results=results)
+
+    async def body():
+        async for chunk in iter_plan_batch(req.plans, session_maker):
+            yield "".join(
+                BatchPlanResult(**r).model_dump_json() + "\n" for r in chunk
+            ).encode("utf-8")
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@router.get("/export")
+async def export_plans_endpoint(
+    format: ExportFormat = ExportFormat.ndjson,
+    store_id: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    session_maker: async_sessionmaker = Depends(get_read_session_maker),
+) -> StreamingResponse:
+    """Stream plans + recommendations as NDJSON, CSV or Parquet (chunked).
+
+    Without `store_id`, all shards are read and merged by creation time.
+    """
+    try:
+        check_format_available(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    registry = get_shards()
+    if registry is None:
+        session_makers = [session_maker]
+    elif store_id is None:
+        session_makers = registry.session_makers
+    else:
+        session_makers = [registry.session_makers[registry.shard_for_store(store_id)]]
+    filename = f"plans.{format.value}"
+    return StreamingResponse(
+        stream_export(session_makers, format, store_id=store_id, start=start, end=end),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/stats", response_model=PlanStatsResponse)
+async def plan_stats_endpoint(
+    store_id: int | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    db: AsyncSession = Depends(get_read_db),
+) -> PlanStatsResponse:
+    """Created / approved / rejected counts, average order quantity and
+    decision latency per day (UTC), for one store or all.
+
+    Reads the `plan_daily_stats` rollup (on every shard when no store is
+    given), so the cost depends on the date range only. Defaults to the
+    last 30 days.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start is after end")
+    if (end - start).days >= settings.plan_stats_max_days:
+        raise HTTPException(
+            status_code=400, detail=f"Date range exceeds {settings.plan_stats_max_days} days"
+        )
+    registry = get_shards()
+    if store_id is None and registry is not None:
+        stats = await get_plan_stats_across(registry.session_makers, start, end)
+    else:
+        if store_id is not None:
+            use_store_shard(db, store_id)
+        stats = await get_plan_stats(db, start, end, store_id=store_id)
+    return PlanStatsResponse(store_id=store_id, start=start, end=end, **stats)
+
+
 @router.get("/{plan_id}", response_model=PlanResponse)
 async def get_plan_endpoint(
     plan_id: str,
-    db: AsyncSession = Depends(get_db),
-) -> PlanResponse:
-    plan = await get_plan(db, plan_id)
-    if plan is None:
-        raise HTTPException(status_code=404, detail="Plan not found")
-    return _plan_to_response(plan)
+    db: AsyncSession = Depends(get_read_db),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """Plan by id, with an `ETag`; `If-None-Match` with the current tag gives 304.
+
+    Responses are cached per process (see `rimas.services.plan_cache`).
+    """
+    use_plan_shard(db, plan_id)
+    cache = get_plan_cache()
+    entry, fresh = cache.get(plan_id)
+    if entry is not None and not fresh:
+        updated_at = await get_plan_updated_at(db, plan_id)
+        if updated_at is not None and plan_etag(updated_at) == entry.etag:
+            cache.touch(entry)
+        else:
+            cache.invalidate(plan_id)
+            entry = None
+    if entry is None:
+        plan = await get_plan(db, plan_id)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="Plan not found")
+        entry = cache.put(
+            plan_id, plan_etag(plan.updated_at), _plan_to_response(plan).model_dump_json().encode()
+        )
+    headers = {"ETag": entry.etag}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
 
 
 @router.post("/{plan_id}/approve", response_model=PlanResponse)
@@ -62,7 +291,10 @@ async def approve_plan_endpoint(
     plan_id: str,
     db: AsyncSession = Depends(get_db),
 ) -> PlanResponse:
-    plan = await approve_plan(db, plan_id)
+    use_plan_shard(db, plan_id)
+    with log_context(plan_id=plan_id):
+        plan = await approve_plan(db, plan_id)
+    get_plan_cache().invalidate(plan_id)
     if plan is None:
         raise HTTPException(status_code=404, detail="Plan not found")
     return _plan_to_response(plan)
@@ -73,7 +305,10 @@ async def reject_plan_endpoint(
     plan_id: str,
     db: AsyncSession = Depends(get_db),
 ) -> PlanResponse:
-    plan = await reject_plan(db, plan_id)
+    use_plan_shard(db, plan_id)
+    with log_context(plan_id=plan_id):
+        plan = await reject_plan(db, plan_id)
+    get_plan_cache().invalidate(plan_id)
     if plan is None:
         raise HTTPException(status_code=404, detail="Plan not found")
     return _plan_to_response(plan)
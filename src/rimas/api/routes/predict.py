@@ -14,6 +14,7 @@ router = APIRouter()
 class PredictRequest(BaseModel):
     product_id: str | None = None
     quantity: float | None = 1.0
+    store_id: int | None = None
 
 
 class PredictResponse(BaseModel):
@@ -27,5 +28,6 @@ async def predict_endpoint(req: PredictRequest) -> PredictResponse:
     result = predict_demand(
         product_id=req.product_id or "default",
         quantity=req.quantity or 1.0,
+        store_id=req.store_id,
     )
     return PredictResponse(**result)
@@ -1,11 +1,13 @@
 """Pydantic schemas for REST contract."""
 
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
+
+from rimas.agents.items import PlanItems
 
 
 class PlanStatus(str, Enum):
@@ -30,6 +32,27 @@ class CreatePlanRequest(BaseModel):
     horizon_days: int = 7
     constraints: PlanConstraints = Field(default_factory=PlanConstraints)
     items: list[PlanItemInput] = Field(default_factory=list, min_length=1)
+    # Time budget for POST /plans (the X-Deadline-Ms header takes precedence);
+    # not part of the persisted payload.
+    deadline_ms: Optional[int] = Field(default=None, gt=0, exclude=True)
+
+
+class ColumnarPlanRequest(BaseModel):
+    """Plan request whose items live in array-backed columns (streamed ingestion)."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    store_id: int
+    horizon_days: int = 7
+    constraints: PlanConstraints = Field(default_factory=PlanConstraints)
+    items: PlanItems
+
+    @field_serializer("items")
+    def _serialize_items(self, items: PlanItems) -> list[dict]:
+        return items.to_dicts()
+
+
+PlanRequest = CreatePlanRequest | ColumnarPlanRequest
 
 
 class PlanRecommendation(BaseModel):
@@ -51,3 +74,45 @@ class PlanResponse(BaseModel):
     status: PlanStatus
     recommendations: list[PlanRecommendation] = Field(default_factory=list)
     metadata: PlanMetadata
+
+
+class PlanStats(BaseModel):
+    created: int = 0
+    approved: int = 0
+    rejected: int = 0
+    avg_order_qty: Optional[float] = None  # per recommendation
+    avg_decision_latency_s: Optional[float] = None  # creation to approval / rejection
+
+
+class PlanDayStats(PlanStats):
+    day: date
+
+
+class PlanStatsResponse(BaseModel):
+    store_id: Optional[int] = None
+    start: date
+    end: date
+    days: list[PlanDayStats] = Field(default_factory=list)
+    totals: PlanStats
+
+
+# Upper bound on plans per batch request, so one call cannot queue unbounded work.
+BATCH_MAX_PLANS = 5000
+
+
+class BatchPlanRequest(BaseModel):
+    plans: list[CreatePlanRequest] = Field(min_length=1, max_length=BATCH_MAX_PLANS)
+
+
+class BatchPlanResult(BaseModel):
+    index: int
+    store_id: int
+    plan_id: Optional[str] = None
+    status: Optional[PlanStatus] = None
+    recommendations: list[PlanRecommendation] = Field(default_factory=list)
+    metadata: Optional[PlanMetadata] = None
+    error: Optional[str] = None
+
+
+class BatchPlanResponse(BaseModel):
+    results: list[BatchPlanResult]
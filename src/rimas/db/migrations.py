@@ -1,6 +1,145 @@
-"""Database migrations - stub for Alembic integration."""
+"""Database migrations - lightweight schema versioning.
+
+`upgrade_schema` is run at startup. On an up-to-date database it costs one
+catalog lookup plus one single-row select; only on a version mismatch does
+it run `create_all`, add columns that are missing from existing tables
+(nullable columns only - anything else needs a real migration) and run the
+data backfills registered for the versions being crossed.
 
 # For production, configure Alembic and run:
 #   alembic init alembic
 #   alembic revision --autogenerate -m "initial"
 #   alembic upgrade head
+"""
+
+import logging
+from collections import defaultdict
+
+from sqlalchemy import Connection, delete, inspect, insert, select, text, update
+
+from rimas.db.models import SCHEMA_VERSION, Base, Plan, PlanDailyStats, SchemaVersion
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant identifying the schema-upgrade advisory lock.
+_UPGRADE_LOCK_KEY = 0x52494D4153
+
+
+def current_version(conn: Connection) -> int | None:
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return None
+    return conn.execute(select(SchemaVersion.version)).scalar_one_or_none()
+
+
+def _add_missing_columns(conn: Connection) -> None:
+    inspector = inspect(conn)
+    preparer = conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} {col_type}"
+            ))
+            logger.info("Added column", extra={"table": table.name, "column": column.name})
+
+
+def _create_missing_indexes(conn: Connection) -> None:
+    """Create declared indexes absent from existing tables (create_all skips them)."""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn, checkfirst=True)
+                logger.info("Created index", extra={"index": index.name})
+
+
+def _lock_for_upgrade(conn: Connection) -> None:
+    """Serialise concurrent upgrades (e.g. several pods starting at once).
+
+    PostgreSQL takes a transaction-scoped advisory lock; SQLite serialises
+    writers on its own.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _UPGRADE_LOCK_KEY})
+
+
+def _backfill_plan_store_id(conn: Connection) -> None:
+    """Fill `plans.store_id` for rows created before the column existed."""
+    result = conn.execute(
+        update(Plan)
+        .where(Plan.store_id.is_(None))
+        .values(store_id=Plan.request_payload["store_id"].as_integer())
+    )
+    logger.info("Backfilled plans.store_id", extra={"rows": result.rowcount})
+
+
+def _backfill_plan_daily_stats(conn: Connection) -> None:
+    """Build `plan_daily_stats` from existing plans.
+
+    A decided plan counts on the day of its last update, which is when it
+    was approved or rejected.
+    """
+    from rimas.services.plan_stats_service import COUNTERS, order_totals
+
+    sums: dict = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    plans = conn.execute(
+        select(Plan.store_id, Plan.status, Plan.created_at, Plan.updated_at, Plan.final_decision)
+        .where(Plan.store_id.is_not(None), Plan.created_at.is_not(None))
+        .execution_options(yield_per=1000)
+    )
+    for store_id, status, created_at, updated_at, final_decision in plans:
+        row = sums[(store_id, created_at.date())]
+        recs, qty = order_totals(final_decision)
+        row["created"] += 1
+        row["recommendations"] += recs
+        row["order_qty_sum"] += qty
+        if status in ("approved", "rejected") and updated_at is not None:
+            decided = sums[(store_id, updated_at.date())]
+            decided[status] += 1
+            decided["decision_latency_s_sum"] += max(0.0, (updated_at - created_at).total_seconds())
+    conn.execute(delete(PlanDailyStats))
+    if sums:
+        conn.execute(
+            insert(PlanDailyStats),
+            [{"store_id": store_id, "day": day, **row} for (store_id, day), row in sums.items()],
+        )
+    logger.info("Backfilled plan_daily_stats", extra={"rows": len(sums)})
+
+
+# Data backfills, keyed by the schema version that introduced them. Each runs
+# once, when a database is upgraded from an older version.
+BACKFILLS = {
+    2: _backfill_plan_store_id,
+    6: _backfill_plan_daily_stats,
+}
+
+
+def upgrade_schema(conn: Connection) -> bool:
+    """Bring the schema to SCHEMA_VERSION. Returns True if anything ran.
+
+    The version is re-checked under the upgrade lock, so when several
+    workers start together only the first one migrates.
+    """
+    if current_version(conn) == SCHEMA_VERSION:
+        return False
+    _lock_for_upgrade(conn)
+    version = current_version(conn)
+    if version == SCHEMA_VERSION:
+        return False
+    logger.info(
+        "Upgrading schema", extra={"from_version": version, "to_version": SCHEMA_VERSION}
+    )
+    Base.metadata.create_all(conn)
+    _add_missing_columns(conn)
+    _create_missing_indexes(conn)
+    for target, backfill in sorted(BACKFILLS.items()):
+        if version is None or version < target:
+            backfill(conn)
+    conn.execute(delete(SchemaVersion))
+    conn.execute(insert(SchemaVersion).values(id=1, version=SCHEMA_VERSION))
+    return True
@@ -1,12 +1,16 @@
 """SQLAlchemy models."""
 
-from datetime import datetime
+from datetime import date, datetime
 from uuid import uuid4
 
-from sqlalchemy import JSON, DateTime, ForeignKey, String
+from sqlalchemy import JSON, Date, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
+# Bump whenever tables or columns are added; `init_db` upgrades on mismatch.
+SCHEMA_VERSION = 6
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -21,11 +25,14 @@ class Plan(Base):
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=uuid_default
     )
+    store_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
     request_payload: Mapped[dict] = mapped_column(JSON, nullable=False)
     agent_outputs: Mapped[dict] = mapped_column(JSON, nullable=False)
     final_decision: Mapped[dict] = mapped_column(JSON, nullable=False)
     status: Mapped[str] = mapped_column(String(50), default="completed")
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, index=True
+    )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
@@ -49,3 +56,80 @@ class PlanEvent(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     plan: Mapped["Plan"] = relationship("Plan", back_populates="events")
+
+
+class SchemaVersion(Base):
+    """Single-row table recording the schema version the DB was upgraded to."""
+
+    __tablename__ = "schema_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class AnomalyState(Base):
+    """Checkpointed streaming-detector state of one (store, metric) stream."""
+
+    __tablename__ = "anomaly_state"
+
+    store_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    metric: Mapped[str] = mapped_column(String(100), primary_key=True)
+    state: Mapped[dict] = mapped_column(JSON, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
+class AnomalyFlag(Base):
+    """A historical point flagged by the batch anomaly scan, with its scores."""
+
+    __tablename__ = "anomaly_flags"
+    __table_args__ = (Index("ix_anomaly_flags_store_day", "store_id", "day"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    store_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    item_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    metric: Mapped[str] = mapped_column(String(100), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    value: Mapped[float] = mapped_column(Float, nullable=False)
+    zscore: Mapped[float | None] = mapped_column(Float, nullable=True)
+    mad: Mapped[float | None] = mapped_column(Float, nullable=True)
+    seasonal: Mapped[float | None] = mapped_column(Float, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class PlanCheckpoint(Base):
+    """State update of one finished graph node, or the persisted plan id.
+
+    Keyed by the plan's idempotency key (also its trace_id). Node rows hold
+    the node's JSON-encoded state update in `payload`; the `PERSISTED_NODE` row records
+    the plan created for the key.
+    """
+
+    __tablename__ = "plan_checkpoints"
+
+    key: Mapped[str] = mapped_column(String(128), primary_key=True)
+    node: Mapped[str] = mapped_column(String(64), primary_key=True)
+    payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    plan_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class PlanDailyStats(Base):
+    """Running plan counters of one store and day, behind `GET /plans/stats`.
+
+    Updated in the transaction that creates or decides a plan. Decisions
+    count on the day they are made; `decision_latency_s_sum` adds up the time
+    from creation to approval / rejection.
+    """
+
+    __tablename__ = "plan_daily_stats"
+
+    store_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    created: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    approved: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rejected: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    recommendations: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    order_qty_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    decision_latency_s_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
@@ -0,0 +1,116 @@
+"""Read-replica routing for read-only endpoints.
+
+When `settings.database_url_read_async` is set, read-only handlers get a
+session on the replica instead of the primary, unless:
+
+- the replica's replication lag (probed at most every
+  `replica_lag_check_interval_s`) exceeds `replica_max_lag_s` or cannot be
+  measured, or
+- the client wrote within the last `read_your_writes_s` seconds (the
+  `rimas_last_write` cookie set by write requests), so it reads its own
+  writes from the primary.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from rimas.config import settings
+
+logger = logging.getLogger(__name__)
+
+LAST_WRITE_COOKIE = "rimas_last_write"
+
+# Zero when the standby has replayed everything it received: an idle primary
+# would otherwise look like ever-growing lag.
+_PG_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+async def probe_lag(engine: AsyncEngine) -> float:
+    """Replication lag of `engine`'s database in seconds (0 for non-PostgreSQL)."""
+    async with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            return float(await conn.scalar(_PG_LAG_SQL) or 0.0)
+        await conn.execute(text("SELECT 1"))
+        return 0.0
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        max_lag_s: float = 5.0,
+        read_your_writes_s: float = 5.0,
+        check_interval_s: float = 5.0,
+        probe_timeout_s: float = 1.0,
+        lag_probe: Callable[[AsyncEngine], Awaitable[float]] = probe_lag,
+    ) -> None:
+        self.engine = engine
+        self.session_maker = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+        )
+        self.max_lag_s = max_lag_s
+        self.read_your_writes_s = read_your_writes_s
+        self.check_interval_s = check_interval_s
+        self.probe_timeout_s = probe_timeout_s
+        self._lag_probe = lag_probe
+        self.lag_s: float | None = None  # None: unknown or replica unreachable
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.counters = {"replica": 0, "primary_lag": 0, "primary_sticky": 0}
+
+    async def _refresh_lag(self) -> None:
+        if time.monotonic() - self._checked_at < self.check_interval_s or self._lock.locked():
+            return
+        async with self._lock:
+            try:
+                self.lag_s = await asyncio.wait_for(self._lag_probe(self.engine), self.probe_timeout_s)
+            except Exception as e:
+                logger.warning("Replica lag probe failed", extra={"error": str(e)})
+                self.lag_s = None
+            self._checked_at = time.monotonic()
+
+    async def use_replica(self, last_write_at: float | None) -> bool:
+        """Whether a read should go to the replica; `last_write_at` is a Unix time."""
+        if last_write_at is not None and time.time() - last_write_at < self.read_your_writes_s:
+            self.counters["primary_sticky"] += 1
+            return False
+        await self._refresh_lag()
+        if self.lag_s is None or self.lag_s > self.max_lag_s:
+            self.counters["primary_lag"] += 1
+            return False
+        self.counters["replica"] += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"lag_s": self.lag_s, "max_lag_s": self.max_lag_s, **self.counters}
+
+
+_router: ReplicaRouter | None = None
+
+
+def get_replica_router() -> ReplicaRouter | None:
+    """The process-wide router, or None when no replica is configured (or sharding is on)."""
+    global _router
+    if _router is None and settings.database_url_read_async and not settings.database_shard_urls:
+        _router = ReplicaRouter(
+            create_async_engine(settings.database_url_read_async, echo=False),
+            max_lag_s=settings.replica_max_lag_s,
+            read_your_writes_s=settings.read_your_writes_s,
+            check_interval_s=settings.replica_lag_check_interval_s,
+        )
+    return _router
+
+
+async def dispose_replica() -> None:
+    global _router
+    if _router is not None:
+        await _router.engine.dispose()
+        _router = None
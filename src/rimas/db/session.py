@@ -3,7 +3,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from rimas.config import settings
-from rimas.db.models import Base
+from rimas.db.migrations import upgrade_schema
 
 _engine = None
 _session_maker = None
@@ -33,6 +33,7 @@ def get_async_session_maker():
 
 
 async def init_db() -> None:
+    """Ensure the schema is current (a cheap version check on a warm DB)."""
     engine = get_async_engine()
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
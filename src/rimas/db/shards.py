@@ -0,0 +1,141 @@
+"""Store-level sharding of plan storage (`settings.database_shard_urls`).
+
+Shard 0 is the main database (`database_url_async`). Each URL in
+`database_shard_urls` adds a shard (1, 2, ...). A store's plans, their
+events, checkpoints and daily stats all live on one shard: the one given by
+`shard_map`, else `store_id % shard count`. Everything else (anomaly state,
+schema version) stays on shard 0.
+
+Plan IDs made while sharding is on are version-8 UUIDs whose first byte is
+the shard index, so a plan is found from its id without a lookup. Version-4
+ids, made before sharding was enabled, belong to shard 0.
+
+Request sessions from `get_db` are created before the shard is known; the
+route points them at a shard (`use_store_shard` / `use_plan_shard`) before
+the first query. Queries across stores fan out to every shard.
+"""
+
+import logging
+from uuid import UUID, uuid4
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from rimas.config import settings
+from rimas.db.migrations import upgrade_schema
+from rimas.db.session import get_async_engine
+
+logger = logging.getLogger(__name__)
+
+MAX_SHARDS = 256  # the shard index is one byte of the plan id
+_SHARD_SHIFT = 120
+_VERSION_SHIFT = 76
+
+
+def new_plan_id(shard: int | None = None) -> str:
+    """A random plan id; it encodes `shard` unless that is None."""
+    if shard is None:
+        return str(uuid4())
+    value = uuid4().int
+    value = (value & ~(0xFF << _SHARD_SHIFT)) | (shard << _SHARD_SHIFT)
+    value = (value & ~(0xF << _VERSION_SHIFT)) | (0x8 << _VERSION_SHIFT)
+    return str(UUID(int=value))
+
+
+def shard_of_plan_id(plan_id: str) -> int:
+    """Shard encoded in `plan_id`; 0 for ids made without sharding (or invalid ones)."""
+    try:
+        value = UUID(plan_id)
+    except ValueError:
+        return 0
+    return value.int >> _SHARD_SHIFT if value.version == 8 else 0
+
+
+class ShardRegistry:
+    def __init__(self, engines: list[AsyncEngine], shard_map: dict[int, int] | None = None) -> None:
+        if not 1 <= len(engines) <= MAX_SHARDS:
+            raise ValueError(f"Between 1 and {MAX_SHARDS} shards are supported, got {len(engines)}")
+        self.shard_map = dict(shard_map or {})
+        bad = {store: shard for store, shard in self.shard_map.items() if not 0 <= shard < len(engines)}
+        if bad:
+            raise ValueError(f"shard_map points at unknown shards: {bad}")
+        self.engines = engines
+        self.session_makers = [
+            async_sessionmaker(
+                engine,
+                class_=AsyncSession,
+                expire_on_commit=False,
+                autoflush=False,
+                info={"shard": shard},
+            )
+            for shard, engine in enumerate(engines)
+        ]
+
+    @property
+    def count(self) -> int:
+        return len(self.engines)
+
+    def shard_for_store(self, store_id: int) -> int:
+        return self.shard_map.get(store_id, store_id % self.count)
+
+    def shard_for_plan(self, plan_id: str) -> int:
+        shard = shard_of_plan_id(plan_id)
+        return shard if shard < self.count else 0
+
+    def use(self, db: AsyncSession, shard: int) -> None:
+        """Bind a session that has not run a query yet to `shard`."""
+        if db.in_transaction():
+            raise RuntimeError("Session already has a transaction; choose the shard before querying")
+        engine = self.engines[shard]
+        db.bind = engine
+        db.sync_session.bind = engine.sync_engine
+        db.info["shard"] = shard
+
+
+_registry: ShardRegistry | None = None
+
+
+def get_shards() -> ShardRegistry | None:
+    """The process-wide registry, or None when sharding is off."""
+    global _registry
+    if _registry is None and settings.database_shard_urls:
+        engines = [get_async_engine()]
+        engines += [create_async_engine(url, echo=False) for url in settings.database_shard_urls]
+        _registry = ShardRegistry(engines, settings.shard_map)
+    return _registry
+
+
+def every_shard(session_maker: async_sessionmaker) -> list[async_sessionmaker]:
+    """Session factories to fan out to: every shard's, or just `session_maker`."""
+    registry = get_shards()
+    return list(registry.session_makers) if registry is not None else [session_maker]
+
+
+def use_store_shard(db: AsyncSession, store_id: int) -> None:
+    registry = get_shards()
+    if registry is not None:
+        registry.use(db, registry.shard_for_store(store_id))
+
+
+def use_plan_shard(db: AsyncSession, plan_id: str) -> None:
+    registry = get_shards()
+    if registry is not None:
+        registry.use(db, registry.shard_for_plan(plan_id))
+
+
+async def init_shards() -> None:
+    """Bring every extra shard's schema up to date (shard 0 is done by `init_db`)."""
+    registry = get_shards()
+    if registry is None:
+        return
+    for shard, engine in enumerate(registry.engines[1:], start=1):
+        async with engine.begin() as conn:
+            if await conn.run_sync(upgrade_schema):
+                logger.info("Upgraded shard schema", extra={"shard": shard})
+
+
+async def dispose_shards() -> None:
+    global _registry
+    if _registry is not None:
+        for engine in _registry.engines[1:]:
+            await engine.dispose()
+        _registry = None
@@ -0,0 +1,52 @@
+"""Request deadlines for plan generation.
+
+A `Deadline` is an absolute `time.monotonic()` instant. It is created once
+per request (from the `X-Deadline-Ms` header or `deadline_ms` field, capped
+at `settings.plan_deadline_ms`) and threaded through `PlanState["deadline"]`
+into every node, model call and DB operation, which size their own timeouts
+from what is left.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable
+from dataclasses import dataclass
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out; pending work was cancelled."""
+
+
+@dataclass(frozen=True)
+class Deadline:
+    at: float  # time.monotonic() instant
+
+    @classmethod
+    def after_ms(cls, ms: float) -> "Deadline":
+        return cls(time.monotonic() + ms / 1000)
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)."""
+        return max(0.0, self.at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.at
+
+    def budget(self, reserve_s: float = 0.0, cap_s: float | None = None) -> float:
+        """Seconds a step may take, keeping `reserve_s` for the steps after it."""
+        budget = max(0.0, self.remaining() - reserve_s)
+        return budget if cap_s is None else min(budget, cap_s)
+
+
+async def run_within(deadline: Deadline | None, aw: Awaitable[T], reserve_s: float = 0.0) -> T:
+    """Await `aw`, cancelling it and raising `DeadlineExceeded` once the budget is spent."""
+    if deadline is None:
+        return await aw
+    try:
+        return await asyncio.wait_for(aw, deadline.budget(reserve_s))
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded("plan deadline exceeded") from e
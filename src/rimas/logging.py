@@ -1,16 +1,165 @@
-"""Structured logging configuration."""
+"""Structured logging configuration.
 
+Log calls only enqueue the record: a `QueueListener` thread formats it (JSON
+by default) and writes it to stdout, so the event loop never blocks on I/O.
+The queue is bounded; when it is full, records are dropped and counted
+rather than stalling the caller. Request context (`trace_id`, `plan_id`,
+`store_id`, bound with `log_context`) is captured at the call site and
+added to every record, along with the call's `extra` fields. DEBUG records
+are sampled per call site: the first is always kept, then one in
+`1 / debug_sample_rate`.
+"""
+
+import atexit
+import contextvars
+import copy
+import itertools
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+_context: contextvars.ContextVar[dict] = contextvars.ContextVar("rimas_log_context", default={})
+
+# Attributes every LogRecord has; anything else came from `extra=`.
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "context"}
+
+_listener: "_Listener | None" = None
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """Add `fields` (e.g. trace_id, plan_id, store_id) to records logged in this block."""
+    token = _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Keep the first DEBUG record of each call site, then one in `every`."""
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counters: defaultdict[tuple[str, int], itertools.count] = defaultdict(itertools.count)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG:
+            return True
+        if not self.every:
+            return False
+        return next(self._counters[(record.pathname, record.lineno)]) % self.every == 0
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue without blocking; count records dropped on a full queue."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
 
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only what must happen on the caller's thread: resolve the message
+        # (args may change later) and capture the request context. The
+        # record is formatted by the listener thread.
+        record = copy.copy(record)  # other handlers still get the original
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.context = _context.get()
+        return record
 
-def setup_logging(level: str = "INFO") -> None:
-    """Configure structured logging."""
-    logging.basicConfig(
-        level=getattr(logging, level.upper(), logging.INFO),
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        handlers=[logging.StreamHandler(sys.stdout)],
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)  # wait for room: the thread is draining
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_format: bool | None = None,
+    queue_size: int | None = None,
+    debug_sample_rate: float | None = None,
+) -> None:
+    """Configure structured logging (idempotent; settings fill unset arguments)."""
+    from rimas.config import settings
+
+    global _listener
+    stop_logging()
+
+    json_format = settings.log_json if json_format is None else json_format
+    queue_size = settings.log_queue_size if queue_size is None else queue_size
+    debug_sample_rate = settings.log_debug_sample_rate if debug_sample_rate is None else debug_sample_rate
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(
+        JsonFormatter()
+        if json_format
+        else logging.Formatter(
+            "%(asctime)s | %(levelname)s | %(name)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
     )
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(DebugSampler(debug_sample_rate))
+
+    root = logging.getLogger()
+    for old in [h for h in root.handlers if isinstance(h, DroppingQueueHandler)]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+
+    _listener = _Listener(log_queue, output)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    handlers = [h for h in logging.getLogger().handlers if isinstance(h, DroppingQueueHandler)]
+    return sum(h.dropped for h in handlers)
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,166 @@
+"""Vectorized batch anomaly scan over daily sales history.
+
+Each (store, item) series is laid out as a row of a dense [items x days]
+matrix per store (days without a sales row count as zero units) and scored
+against the trailing `window` days before each point:
+
+    zscore    (x - mean) / std
+    mad       (x - median) / (1.4826 * MAD), robust to earlier outliers
+    seasonal  (x - same-weekday mean) / std of past seasonal residuals
+
+Means and variances come from cumulative sums, medians from a strided
+window view, so every score is a handful of array operations per store
+rather than a Python loop per point. Scales are floored at `min_scale`
+units so flat series do not divide by zero. Only recorded days with a full
+window are scored; the seasonal score needs one more window of residuals.
+
+Stores are spread across a process pool; `scan_daily` returns the flagged
+points only.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+METRIC = "units_sold"
+SCORE_NAMES = ("zscore", "mad", "seasonal")
+FLAG_COLUMNS = ("store_id", "item_id", "day", "value", *SCORE_NAMES)
+# Items per block when taking windowed medians, bounding the
+# [items x days x window] working set.
+_MEDIAN_BLOCK_ITEMS = 256
+
+
+@dataclass(frozen=True)
+class ScanParams:
+    window: int = 28
+    season: int = 7
+    threshold: float = 3.5
+    min_scale: float = 1.0
+
+
+def _trailing(cs: np.ndarray, width: int) -> np.ndarray:
+    """Sums over the `width` columns before each column t >= width (leading-0 cumsums)."""
+    return cs[:, width:-1] - cs[:, : -width - 1]
+
+
+def _cumsum(m: np.ndarray) -> np.ndarray:
+    return np.pad(np.cumsum(m, axis=1, dtype=np.float64), ((0, 0), (1, 0)))
+
+
+def _std_score(x: np.ndarray, ref: np.ndarray, width: int, min_scale: float) -> np.ndarray:
+    """(x - trailing mean of ref) / trailing std of ref, for columns t >= width."""
+    s1 = _trailing(_cumsum(ref), width)
+    s2 = _trailing(_cumsum(ref * ref), width)
+    mean = s1 / width
+    var = np.maximum(s2 - s1 * mean, 0.0) / (width - 1)
+    return (x[:, width:] - mean) / np.maximum(np.sqrt(var), min_scale)
+
+
+def score_matrix(units: np.ndarray, params: ScanParams) -> dict[str, np.ndarray]:
+    """Scores of every point of an [items x days] matrix; NaN where undefined."""
+    n_items, span = units.shape
+    w, s = params.window, params.season
+    scores = {name: np.full(units.shape, np.nan) for name in SCORE_NAMES}
+    if span <= w:
+        return scores
+
+    scores["zscore"][:, w:] = _std_score(units, units, w, params.min_scale)
+
+    windows = np.lib.stride_tricks.sliding_window_view(units[:, :-1], w, axis=1)
+    mad = scores["mad"]
+    for lo in range(0, n_items, _MEDIAN_BLOCK_ITEMS):
+        block = windows[lo : lo + _MEDIAN_BLOCK_ITEMS]
+        median = np.median(block, axis=-1)
+        spread = np.median(np.abs(block - median[..., None]), axis=-1) * 1.4826
+        mad[lo : lo + _MEDIAN_BLOCK_ITEMS, w:] = (
+            units[lo : lo + _MEDIAN_BLOCK_ITEMS, w:] - median
+        ) / np.maximum(spread, params.min_scale)
+
+    # Residual from the mean of the same weekday over the trailing window.
+    lags = max(w // s, 1)
+    start = lags * s
+    if span > start + w:
+        baseline = sum(units[:, start - k * s : span - k * s] for k in range(1, lags + 1)) / lags
+        resid = units[:, start:] - baseline
+        scores["seasonal"][:, start + w :] = _std_score(resid, resid, w, params.min_scale)
+    return scores
+
+
+def scan_store(
+    store_id: int, items: np.ndarray, days: np.ndarray, units: np.ndarray, params: ScanParams
+) -> dict[str, np.ndarray]:
+    """Flagged points (`FLAG_COLUMNS`) of one store's daily rows."""
+    item_ids, row = np.unique(items, return_inverse=True)
+    first = int(days.min())
+    col = days - first
+    matrix = np.zeros((len(item_ids), int(col.max()) + 1))
+    matrix[row, col] = units
+    scores = score_matrix(matrix, params)
+
+    # Score only days that had a sales row.
+    point_scores = {name: m[row, col] for name, m in scores.items()}
+    with np.errstate(invalid="ignore"):
+        flagged = np.zeros(len(row), bool)
+        for values in point_scores.values():
+            flagged |= np.abs(values) > params.threshold
+    return {
+        "store_id": np.full(int(flagged.sum()), store_id, np.int64),
+        "item_id": item_ids[row[flagged]],
+        "day": days[flagged],
+        "value": units[flagged],
+        **{name: values[flagged] for name, values in point_scores.items()},
+    }
+
+
+def _scan_stores(batch: list[tuple], params: dict) -> list[dict]:
+    scan_params = ScanParams(**params)
+    return [scan_store(*args, scan_params) for args in batch]
+
+
+def _store_batches(daily, n_batches: int) -> list[list[tuple]]:
+    """Split recorded daily rows by store into `n_batches` of similar size."""
+    daily = daily[daily["recorded"].astype(bool)] if "recorded" in daily else daily
+    stores = daily["store_id"].to_numpy(np.int64)
+    order = np.argsort(stores, kind="stable")
+    stores = stores[order]
+    items = daily["item_id"].to_numpy(np.int64)[order]
+    days = daily["day"].to_numpy(np.int64)[order]
+    units = daily["units"].to_numpy(np.float64)[order]
+    bounds = np.flatnonzero(np.diff(stores)) + 1
+    starts = np.concatenate([[0], bounds])
+    ends = np.concatenate([bounds, [len(stores)]])
+
+    # Largest stores first, each to the currently lightest batch.
+    batches: list[list[tuple]] = [[] for _ in range(n_batches)]
+    load = [0] * n_batches
+    for lo, hi in sorted(zip(starts, ends), key=lambda b: b[0] - b[1]):
+        i = load.index(min(load))
+        batches[i].append((int(stores[lo]), items[lo:hi], days[lo:hi], units[lo:hi]))
+        load[i] += int(hi - lo)
+    return [b for b in batches if b]
+
+
+def scan_daily(daily, params: ScanParams = ScanParams(), workers: int | None = None) -> dict[str, np.ndarray]:
+    """Scan daily rows (`features.DAILY_COLUMNS`) of many stores; returns flag columns.
+
+    `workers=1` scans in-process; otherwise stores are spread across a
+    process pool (default: all cores).
+    """
+    workers = workers or os.cpu_count() or 1
+    results: list[dict] = []
+    if len(daily):
+        if workers == 1:
+            results = _scan_stores(_store_batches(daily, 1)[0], asdict(params))
+        else:
+            batches = _store_batches(daily, workers * 4)
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+                for part in pool.map(_scan_stores, batches, [asdict(params)] * len(batches)):
+                    results.extend(part)
+    if not results:
+        return {
+            name: np.empty(0, np.int64 if name in ("store_id", "item_id", "day") else np.float64)
+            for name in FLAG_COLUMNS
+        }
+    return {name: np.concatenate([r[name] for r in results]) for name in FLAG_COLUMNS}
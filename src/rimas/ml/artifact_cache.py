@@ -0,0 +1,257 @@
+"""Local, content-addressed cache of MLflow model artifacts.
+
+Layout under `root`:
+
+    objects/<sha256>/...   model directories, keyed by a digest of their contents
+    index.json             {"stages": {"<name>/<stage>": {...}}, "versions": {"<name>/<version>": digest}}
+    .lock                  flock guarding index updates and eviction
+    .lock-<name>-<version> flock held while a version is downloaded
+    shared/<digest>/       memory-mappable copy of an object (see `shared_weights`)
+
+A registry version is downloaded once (concurrent workers wait on the
+per-version lock and then reuse the first download) and then served from
+disk by every process and across restarts. If the tracking server is
+unreachable, the last good version recorded for `<name>/<stage>` is served.
+Objects are evicted least-recently-used first once the cache exceeds
+`max_bytes`; objects referenced by any `<name>/<stage>` are never evicted.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedModel:
+    name: str
+    stage: str
+    version: str
+    digest: str
+    path: Path
+
+
+def _tree_digest(root: Path) -> str:
+    """sha256 over relative paths and contents of every file under `root`."""
+    h = hashlib.sha256()
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        h.update(path.relative_to(root).as_posix().encode())
+        h.update(b"\0")
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def _tree_size(root: Path) -> int:
+    return sum(p.stat().st_size for p in root.rglob("*") if p.is_file())
+
+
+class ModelArtifactCache:
+    def __init__(
+        self,
+        root: str | Path,
+        max_bytes: int,
+        tracking_uri: str | None = None,
+        request_timeout_s: float = 5.0,
+        max_retries: int = 0,
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.tracking_uri = tracking_uri
+        self.request_timeout_s = request_timeout_s
+        self.max_retries = max_retries
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.root / "index.json"
+
+    # -- registry access (overridable) -------------------------------------
+
+    def _client(self):
+        from mlflow.tracking import MlflowClient
+
+        return MlflowClient(tracking_uri=self.tracking_uri, registry_uri=self.tracking_uri)
+
+    def _call_with_timeout(self, fn, *args):
+        """Run a registry call, giving up after `request_timeout_s`.
+
+        MLflow retries with backoff for minutes by default. The call runs in
+        a daemon thread so an unreachable server fails fast here (and the
+        last good cached version is served) without changing MLflow's
+        process-wide retry settings for other callers.
+        """
+        result: dict = {}
+
+        def target():
+            try:
+                result["value"] = fn(*args)
+            except BaseException as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=target, daemon=True, name="mlflow-registry")
+        thread.start()
+        thread.join(self.request_timeout_s)
+        if thread.is_alive():
+            raise TimeoutError(f"MLflow registry did not answer within {self.request_timeout_s}s")
+        if "error" in result:
+            raise result["error"]
+        return result["value"]
+
+    def resolve_version(self, name: str, stage: str) -> str:
+        """Registry version currently serving `name` at `stage`."""
+        if stage.isdigit():
+            return stage
+        versions = self._call_with_timeout(
+            self._client().get_latest_versions, name, [stage]
+        )
+        if not versions:
+            raise LookupError(f"No version of {name!r} in stage {stage!r}")
+        return str(max(int(v.version) for v in versions))
+
+    def download(self, name: str, version: str, dst: Path) -> Path:
+        """Download `name`/`version` under `dst`; returns the model directory."""
+        import mlflow.artifacts
+
+        source = self._call_with_timeout(
+            self._client().get_model_version_download_uri, name, version
+        )
+        local = mlflow.artifacts.download_artifacts(
+            artifact_uri=source, dst_path=str(dst), tracking_uri=self.tracking_uri
+        )
+        return Path(local)
+
+    # -- index -------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self, name: str = ".lock"):
+        with open(self.root / name, "a+") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self) -> dict:
+        try:
+            index = json.loads(self._index_path.read_text())
+        except (FileNotFoundError, ValueError):
+            index = {}
+        index.setdefault("stages", {})
+        index.setdefault("versions", {})
+        return index
+
+    def _write_index(self, index: dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".index-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self._index_path)
+
+    def _touch(self, digest: str) -> None:
+        now = time.time()
+        os.utime(self.objects / digest, (now, now))
+
+    # -- public API --------------------------------------------------------
+
+    def resolve(self, name: str, stage: str) -> CachedModel:
+        """Return a local copy of `name`@`stage`, downloading it at most once."""
+        key = f"{name}/{stage}"
+        try:
+            version = self.resolve_version(name, stage)
+        except Exception as e:
+            cached = self.last_good(name, stage)
+            if cached is None:
+                raise
+            logger.warning(
+                "Registry unreachable, using cached model",
+                extra={"model": key, "version": cached.version, "error": str(e)},
+            )
+            return cached
+
+        digest = self._cached_digest(name, version)
+        if digest is None:
+            with self._locked(f".lock-{name}-{version}"):
+                # Re-check: another process may have finished the download.
+                digest = self._cached_digest(name, version) or self._fetch(name, version)
+
+        with self._locked():
+            index = self._read_index()
+            index["versions"][f"{name}/{version}"] = digest
+            index["stages"][key] = {"version": version, "digest": digest, "resolved_at": time.time()}
+            self._write_index(index)
+            self._touch(digest)
+            self._evict(index)
+        return CachedModel(name, stage, version, digest, self.objects / digest)
+
+    def _cached_digest(self, name: str, version: str) -> str | None:
+        digest = self._read_index()["versions"].get(f"{name}/{version}")
+        if digest is None or not (self.objects / digest).is_dir():
+            return None
+        return digest
+
+    def last_good(self, name: str, stage: str) -> CachedModel | None:
+        entry = self._read_index()["stages"].get(f"{name}/{stage}")
+        if entry is None or not (self.objects / entry["digest"]).is_dir():
+            return None
+        self._touch(entry["digest"])
+        return CachedModel(
+            name, stage, entry["version"], entry["digest"], self.objects / entry["digest"]
+        )
+
+    def _fetch(self, name: str, version: str) -> str:
+        tmp = Path(tempfile.mkdtemp(dir=self.root, prefix=".download-"))
+        try:
+            model_dir = self.download(name, version, tmp) or tmp
+            digest = _tree_digest(model_dir)
+            target = self.objects / digest
+            try:
+                os.rename(model_dir, target)
+            except OSError:
+                # Another process stored identical content first.
+                if not target.is_dir():
+                    raise
+            logger.info("Model artifacts cached", extra={"model": name, "version": version, "digest": digest})
+            return digest
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _evict(self, index: dict) -> None:
+        """Drop least-recently-used objects until the cache fits `max_bytes`.
+
+        Called under the index lock. Objects referenced by any stage entry
+        (the current/last-good version of every model) are kept, so eviction
+        never breaks another model's offline fallback or a resolve in flight.
+        """
+        pinned = {entry["digest"] for entry in index["stages"].values()}
+        shared = self.root / "shared"
+        entries = []
+        for path in self.objects.iterdir():
+            if path.is_dir():
+                size = _tree_size(path) + _tree_size(shared / path.name)
+                entries.append((path.stat().st_mtime, path, size))
+        total = sum(size for _, _, size in entries)
+        evicted = set()
+        for _, path, size in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if path.name in pinned:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            shutil.rmtree(shared / path.name, ignore_errors=True)
+            total -= size
+            evicted.add(path.name)
+            logger.info("Evicted cached model artifacts", extra={"digest": path.name})
+        if evicted:
+            index["versions"] = {
+                k: d for k, d in index["versions"].items() if d not in evicted
+            }
+            self._write_index(index)
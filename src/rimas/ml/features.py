@@ -0,0 +1,546 @@
+"""Per-(store, item) demand features: offline build and memory-mapped reads.
+
+Inputs are daily sales history (CSV, read in chunks) and the item stock
+levels of persisted plans. Features are computed as of the latest day seen:
+
+    demand_mean_7     mean daily units sold over the last 7 days
+    demand_mean_28    mean daily units sold over the last 28 days
+    demand_trend      demand_mean_7 / demand_mean_28 (1.0 without history)
+    stockout_rate_28  share of observed days in the last 28 with stock <= 0
+    promo_lift        mean units on promo days / mean units on other days
+
+Builds are incremental: only sales after the stored watermark (and plans
+created after the plan watermark) are read. Each store partition keeps the
+last `WINDOW_DAYS` of daily values and running promo sums, so a run never
+rescans older history.
+
+Store layout under `root` (one generation directory per build, so readers
+that still map an older generation keep working):
+
+    manifest.json                  watermarks, feature names, partition paths
+    store=<id>/<gen>/item_ids.npy  sorted int64 item ids
+    store=<id>/<gen>/features.npy  float32 [n_items, len(FEATURE_NAMES)]
+    store=<id>/<gen>/tail_*.npy    rolling window state for the next build
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections.abc import AsyncIterator, Iterable
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = (
+    "demand_mean_7",
+    "demand_mean_28",
+    "demand_trend",
+    "stockout_rate_28",
+    "promo_lift",
+)
+WINDOW_DAYS = 28
+SALES_COLUMNS = ("date", "store_id", "item_id", "units_sold", "on_hand", "promo")
+DAILY_COLUMNS = ("store_id", "item_id", "day", "units", "promo", "recorded", "stockout", "observed")
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+def _to_day(values) -> np.ndarray:
+    """Datetimes (or ISO strings) -> days since the epoch as int64."""
+    return np.asarray(values, dtype="datetime64[D]").astype(np.int64)
+
+
+# -- inputs -----------------------------------------------------------------
+
+def read_sales_chunks(path: str | Path, since_day: int | None, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Yield daily frames (`DAILY_COLUMNS`) for sales rows after `since_day`.
+
+    `on_hand` and `promo` columns are optional.
+    """
+    import pandas as pd
+
+    for chunk in pd.read_csv(
+        path, chunksize=chunk_rows, usecols=lambda c: c in SALES_COLUMNS
+    ):
+        day = _to_day(chunk["date"].to_numpy())
+        keep = day > since_day if since_day is not None else np.ones(len(day), bool)
+        if not keep.any():
+            continue
+        chunk = chunk[keep]
+        if "on_hand" in chunk:
+            on_hand = chunk["on_hand"].to_numpy(dtype=np.float64)
+            observed = ~np.isnan(on_hand)
+            stockout = observed & (np.nan_to_num(on_hand, nan=1.0) <= 0)
+        else:
+            observed = stockout = np.zeros(len(chunk), bool)
+        promo = chunk["promo"].to_numpy() if "promo" in chunk else np.zeros(len(chunk))
+        yield pd.DataFrame({
+            "store_id": chunk["store_id"].to_numpy(np.int64),
+            "item_id": chunk["item_id"].to_numpy(np.int64),
+            "day": day[keep],
+            "units": chunk["units_sold"].to_numpy(np.float64),
+            "promo": promo.astype(np.int8) > 0,
+            "recorded": np.ones(len(chunk), bool),
+            "stockout": stockout,
+            "observed": observed,
+        })
+
+
+async def read_plan_stock_chunks(
+    session_maker, since: datetime | None, chunk_rows: int = 500
+) -> AsyncIterator[tuple["object", datetime | None]]:
+    """Yield (daily frame, latest created_at) for plans created after `since`.
+
+    Plan items contribute a stock observation for their creation day.
+    """
+    import pandas as pd
+    from sqlalchemy import select
+
+    from rimas.db.models import Plan
+
+    stmt = select(Plan.store_id, Plan.created_at, Plan.request_payload).where(
+        Plan.store_id.is_not(None)
+    )
+    if since is not None:
+        stmt = stmt.where(Plan.created_at > since)
+    stmt = stmt.order_by(Plan.created_at).execution_options(yield_per=chunk_rows)
+
+    async with session_maker() as session:
+        result = await session.stream(stmt)
+        async for rows in result.partitions():
+            stores, items, days, stocks = [], [], [], []
+            for row in rows:
+                day = int(_to_day(row.created_at))
+                for item in (row.request_payload or {}).get("items") or []:
+                    stores.append(row.store_id)
+                    items.append(item["item_id"])
+                    days.append(day)
+                    stocks.append(item["current_stock"])
+            if not stores:
+                continue
+            stock = np.asarray(stocks, np.int64)
+            yield pd.DataFrame({
+                "store_id": np.asarray(stores, np.int64),
+                "item_id": np.asarray(items, np.int64),
+                "day": np.asarray(days, np.int64),
+                "units": np.zeros(len(stores)),
+                "promo": np.zeros(len(stores), bool),
+                "recorded": np.zeros(len(stores), bool),
+                "stockout": stock <= 0,
+                "observed": np.ones(len(stores), bool),
+            }), rows[-1].created_at
+
+
+_DAILY_KEYS = ["store_id", "item_id", "day"]
+_DAILY_AGG = {"units": "sum", "promo": "max", "recorded": "max", "stockout": "max", "observed": "max"}
+
+
+def aggregate_daily(frames: Iterable) -> "object":
+    """Reduce daily frames to one row per (store, item, day)."""
+    import pandas as pd
+
+    parts = [f for f in frames if len(f)]
+    if not parts:
+        return pd.DataFrame(columns=list(DAILY_COLUMNS))
+    return pd.concat(parts).groupby(_DAILY_KEYS, sort=False, as_index=False).agg(_DAILY_AGG)
+
+
+def read_sales_daily(
+    paths: Iterable[str | Path], since_day: int | None = None, chunk_rows: int = DEFAULT_CHUNK_ROWS
+):
+    """Daily totals of all sales rows after `since_day`, reducing chunk by chunk."""
+    return aggregate_daily(
+        frame.groupby(_DAILY_KEYS, sort=False, as_index=False).agg(_DAILY_AGG)
+        for path in paths
+        for frame in read_sales_chunks(path, since_day, chunk_rows)
+    )
+
+
+# -- partitions ---------------------------------------------------------------
+
+class Partition:
+    """Feature rows and rolling state of one store."""
+
+    __slots__ = (
+        "item_ids",
+        "features",
+        "tail_units",
+        "tail_stockout",
+        "tail_observed",
+        "tail_promo",
+        "tail_recorded",
+        "promo_stats",
+    )
+
+    def __init__(
+        self,
+        item_ids,
+        features,
+        tail_units,
+        tail_stockout,
+        tail_observed,
+        tail_promo,
+        tail_recorded,
+        promo_stats,
+    ):
+        self.item_ids = item_ids
+        self.features = features
+        self.tail_units = tail_units
+        self.tail_stockout = tail_stockout  # stock <= 0 seen that day
+        self.tail_observed = tail_observed  # any stock level seen that day
+        self.tail_promo = tail_promo
+        self.tail_recorded = tail_recorded  # a sales row exists for that day
+        # [n, 4] over recorded days before the tail: promo units, promo days,
+        # other units, other days
+        self.promo_stats = promo_stats
+
+    @classmethod
+    def empty(cls) -> "Partition":
+        window = np.zeros((0, WINDOW_DAYS), bool)
+        return cls(
+            np.empty(0, np.int64),
+            np.empty((0, len(FEATURE_NAMES)), np.float32),
+            np.empty((0, WINDOW_DAYS), np.float32),
+            window,
+            window,
+            window,
+            window,
+            np.empty((0, 4), np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: str | None = None) -> "Partition":
+        return cls(*(
+            np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            for name in cls.__slots__
+        ))
+
+    def save(self, path: Path) -> None:
+        path.mkdir(parents=True)
+        for name in self.__slots__:
+            np.save(path / f"{name}.npy", getattr(self, name), allow_pickle=False)
+
+
+def _window_promo_stats(units: np.ndarray, promo: np.ndarray, recorded: np.ndarray) -> np.ndarray:
+    units = units.astype(np.float64)
+    on_promo = promo & recorded
+    off_promo = ~promo & recorded
+    return np.column_stack([
+        (units * on_promo).sum(axis=1),
+        on_promo.sum(axis=1),
+        (units * off_promo).sum(axis=1),
+        off_promo.sum(axis=1),
+    ])
+
+
+def update_partition(prev: Partition, prev_end: int | None, daily, end_day: int) -> Partition:
+    """Roll `prev` (state as of `prev_end`) forward to `end_day` with `daily` rows.
+
+    Windows are computed on a dense [items x days] matrix covering the
+    previous tail plus the new days, so the work is a handful of vectorized
+    array operations per store. Rows older than the previous tail are too
+    late to change any window and are dropped.
+    """
+    item_ids = np.union1d(prev.item_ids, daily["item_id"].to_numpy(np.int64))
+    if prev_end is None:
+        prev_end = int(daily["day"].min()) - 1
+    start = prev_end - WINDOW_DAYS + 1
+    span = end_day - start + 1
+    shape = (len(item_ids), span)
+
+    units = np.zeros(shape, np.float32)
+    stockout = np.zeros(shape, bool)
+    observed = np.zeros(shape, bool)
+    promo = np.zeros(shape, bool)
+    recorded = np.zeros(shape, bool)
+    promo_stats = np.zeros((len(item_ids), 4), np.float64)
+    if len(prev.item_ids):
+        rows = np.searchsorted(item_ids, prev.item_ids)
+        units[rows, :WINDOW_DAYS] = prev.tail_units
+        stockout[rows, :WINDOW_DAYS] = prev.tail_stockout
+        observed[rows, :WINDOW_DAYS] = prev.tail_observed
+        promo[rows, :WINDOW_DAYS] = prev.tail_promo
+        recorded[rows, :WINDOW_DAYS] = prev.tail_recorded
+        promo_stats[rows] = prev.promo_stats
+
+    days = daily["day"].to_numpy(np.int64)
+    late = days < start
+    if late.any():
+        logger.warning("Dropping rows older than the feature window", extra={"rows": int(late.sum())})
+    keep = ~late
+    r = np.searchsorted(item_ids, daily["item_id"].to_numpy(np.int64)[keep])
+    c = days[keep] - start
+    # (store, item, day) is unique in `daily`, so plain fancy-index updates are safe.
+    units[r, c] += daily["units"].to_numpy(np.float32)[keep]
+    stockout[r, c] |= daily["stockout"].to_numpy(bool)[keep]
+    observed[r, c] |= daily["observed"].to_numpy(bool)[keep]
+    promo[r, c] |= daily["promo"].to_numpy(bool)[keep]
+    recorded[r, c] |= daily["recorded"].to_numpy(bool)[keep]
+
+    # Days rolling out of the window are folded into the running promo sums.
+    rolled = slice(0, span - WINDOW_DAYS)
+    promo_stats += _window_promo_stats(units[:, rolled], promo[:, rolled], recorded[:, rolled])
+
+    tail = slice(span - WINDOW_DAYS, span)
+    part = Partition(
+        item_ids,
+        None,
+        units[:, tail].copy(),
+        stockout[:, tail].copy(),
+        observed[:, tail].copy(),
+        promo[:, tail].copy(),
+        recorded[:, tail].copy(),
+        promo_stats,
+    )
+    part.features = compute_features(part)
+    return part
+
+
+def compute_features(part: Partition) -> np.ndarray:
+    """Feature matrix from a partition's rolling state (as of its last day)."""
+    units = part.tail_units.astype(np.float64)
+    mean_7 = units[:, -7:].mean(axis=1)
+    mean_28 = units.mean(axis=1)
+    trend = np.divide(mean_7, mean_28, out=np.ones_like(mean_7), where=mean_28 > 0)
+    observed_days = part.tail_observed.sum(axis=1)
+    stockout_rate = np.divide(
+        part.tail_stockout.sum(axis=1), observed_days,
+        out=np.zeros_like(mean_7), where=observed_days > 0,
+    )
+    ps = part.promo_stats + _window_promo_stats(part.tail_units, part.tail_promo, part.tail_recorded)
+    promo_mean = np.divide(ps[:, 0], ps[:, 1], out=np.zeros_like(mean_7), where=ps[:, 1] > 0)
+    base_mean = np.divide(ps[:, 2], ps[:, 3], out=np.zeros_like(mean_7), where=ps[:, 3] > 0)
+    lift = np.divide(
+        promo_mean, base_mean, out=np.ones_like(mean_7), where=(ps[:, 1] > 0) & (base_mean > 0)
+    )
+    return np.column_stack([mean_7, mean_28, trend, stockout_rate, lift]).astype(np.float32)
+
+
+def _windowed(cs: np.ndarray, t: np.ndarray, width: int) -> np.ndarray:
+    """Sums over `width` days ending at column `t`, from cumulative sums `cs` (leading 0 column)."""
+    return cs[:, t + 1] - cs[:, t + 1 - width]
+
+
+def point_in_time_features(daily, horizon_days: int = 7) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Training examples: features as of each day, and mean daily demand after it.
+
+    Uses the same definitions as `compute_features`, evaluated at every day
+    with a full `WINDOW_DAYS` history and `horizon_days` of future, via
+    cumulative sums over dense [items x days] matrices per store. Returns
+    (X [n, len(FEATURE_NAMES)], y [n], day [n]).
+    """
+    xs, ys, ds = [], [], []
+    for _, group in daily.groupby("store_id"):
+        item_ids, r = np.unique(group["item_id"].to_numpy(np.int64), return_inverse=True)
+        days = group["day"].to_numpy(np.int64)
+        first = int(days.min())
+        span = int(days.max()) - first + 1
+        t = np.arange(WINDOW_DAYS - 1, span - horizon_days)
+        if not len(t):
+            continue
+        c = days - first
+        shape = (len(item_ids), span)
+        units = np.zeros(shape, np.float64)
+        flags = {name: np.zeros(shape, bool) for name in ("stockout", "observed", "promo", "recorded")}
+        units[r, c] = group["units"].to_numpy(np.float64)
+        for name, matrix in flags.items():
+            matrix[r, c] = group[name].to_numpy(bool)
+
+        def cumsum(m):
+            return np.pad(np.cumsum(m, axis=1, dtype=np.float64), ((0, 0), (1, 0)))
+
+        cs_units = cumsum(units)
+        mean_7 = _windowed(cs_units, t, 7) / 7
+        mean_28 = _windowed(cs_units, t, WINDOW_DAYS) / WINDOW_DAYS
+        trend = np.divide(mean_7, mean_28, out=np.ones_like(mean_7), where=mean_28 > 0)
+        stockouts = _windowed(cumsum(flags["stockout"]), t, WINDOW_DAYS)
+        observed = _windowed(cumsum(flags["observed"]), t, WINDOW_DAYS)
+        stockout_rate = np.divide(stockouts, observed, out=np.zeros_like(mean_7), where=observed > 0)
+        on_promo = flags["promo"] & flags["recorded"]
+        off_promo = ~flags["promo"] & flags["recorded"]
+        promo_days = cumsum(on_promo)[:, t + 1]
+        base_days = cumsum(off_promo)[:, t + 1]
+        promo_mean = np.divide(
+            cumsum(units * on_promo)[:, t + 1], promo_days,
+            out=np.zeros_like(mean_7), where=promo_days > 0,
+        )
+        base_mean = np.divide(
+            cumsum(units * off_promo)[:, t + 1], base_days,
+            out=np.zeros_like(mean_7), where=base_days > 0,
+        )
+        lift = np.divide(
+            promo_mean, base_mean, out=np.ones_like(mean_7), where=(promo_days > 0) & (base_mean > 0)
+        )
+        target = (cs_units[:, t + 1 + horizon_days] - cs_units[:, t + 1]) / horizon_days
+
+        # Only item-days with some sales history are examples.
+        seen = cumsum(flags["recorded"])[:, t + 1] > 0
+        features = np.stack([mean_7, mean_28, trend, stockout_rate, lift], axis=-1)
+        xs.append(features[seen])
+        ys.append(target[seen])
+        ds.append(np.broadcast_to(first + t, seen.shape)[seen])
+    if not xs:
+        return np.empty((0, len(FEATURE_NAMES))), np.empty(0), np.empty(0, np.int64)
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(ds)
+
+
+# -- store --------------------------------------------------------------------
+
+def _empty_manifest() -> dict:
+    return {
+        "feature_names": list(FEATURE_NAMES),
+        "window_days": WINDOW_DAYS,
+        "end_day": None,
+        "partitions": {},
+        "sales_watermark": None,
+        "plans_watermark": None,
+    }
+
+
+def _read_manifest(root: Path) -> dict:
+    try:
+        return json.loads((root / "manifest.json").read_text())
+    except FileNotFoundError:
+        return _empty_manifest()
+
+
+def _write_manifest(root: Path, manifest: dict) -> None:
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".manifest-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, root / "manifest.json")
+
+
+def write_partitions(root: Path, daily, base: dict) -> dict:
+    """Roll every partition of `base` forward with `daily` rows and publish them.
+
+    New generations are written first and the manifest is swapped atomically;
+    the generations it replaced are removed afterwards.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    previous = _read_manifest(root)
+    prev_end = base["end_day"]
+    end_day = int(daily["day"].max()) if len(daily) else prev_end
+    if prev_end is not None:
+        end_day = max(end_day, prev_end)
+    gen = f"{int(datetime.utcnow().timestamp() * 1000):013d}"
+
+    partitions = dict(base["partitions"])
+    by_store = {int(s): g for s, g in daily.groupby("store_id")} if len(daily) else {}
+    for store in set(by_store) | set(map(int, partitions)):
+        group = by_store.get(store, daily.iloc[:0])
+        old = partitions.get(str(store))
+        prev = Partition.load(root / old) if old else Partition.empty()
+        part = update_partition(prev, prev_end if old else None, group, end_day)
+        partitions[str(store)] = f"store={store}/{gen}"
+        part.save(root / partitions[str(store)])
+
+    manifest = {**base, "end_day": end_day, "partitions": partitions}
+    _write_manifest(root, manifest)
+    live = set(partitions.values())
+    for rel in previous["partitions"].values():
+        if rel not in live:
+            shutil.rmtree(root / rel, ignore_errors=True)
+    return manifest
+
+
+async def build_features(
+    root: str | Path,
+    sales_paths: Iterable[str | Path] = (),
+    session_maker=None,
+    full: bool = False,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> dict:
+    """Build (`full`) or incrementally update the feature store at `root`."""
+    root = Path(root)
+    base = _empty_manifest() if full else _read_manifest(root)
+
+    frames = [read_sales_daily(sales_paths, base["sales_watermark"], chunk_rows)]
+    sales_watermark = base["sales_watermark"]
+    if len(frames[0]):
+        sales_watermark = max(sales_watermark or 0, int(frames[0]["day"].max()))
+
+    plans_watermark = base["plans_watermark"]
+    if session_maker is not None:
+        since = datetime.fromisoformat(plans_watermark) if plans_watermark else None
+        async for frame, latest in read_plan_stock_chunks(session_maker, since):
+            frames.append(frame)
+            plans_watermark = latest.isoformat()
+
+    daily = aggregate_daily(frames)
+    if not len(daily):
+        logger.info("No new sales or plans since the last feature build")
+        return base
+    base = {**base, "sales_watermark": sales_watermark, "plans_watermark": plans_watermark}
+    manifest = write_partitions(root, daily, base)
+    logger.info(
+        "Features built",
+        extra={"rows": len(daily), "stores": len(manifest["partitions"]), "end_day": manifest["end_day"]},
+    )
+    return manifest
+
+
+class FeatureStore:
+    """Read-only, memory-mapped view of a feature store directory."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self._manifest_mtime: float | None = None
+        self._manifest: dict = {"partitions": {}}
+        self._partitions: dict[int, Partition] = {}
+
+    def _refresh(self) -> None:
+        try:
+            mtime = (self.root / "manifest.json").stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self._manifest_mtime:
+            self._manifest = _read_manifest(self.root)
+            self._manifest_mtime = mtime
+            self._partitions = {}
+
+    def partition(self, store_id: int) -> Partition | None:
+        self._refresh()
+        part = self._partitions.get(store_id)
+        if part is None:
+            rel = self._manifest["partitions"].get(str(store_id))
+            if rel is None:
+                return None
+            part = self._partitions[store_id] = Partition.load(self.root / rel, mmap_mode="r")
+        return part
+
+    def lookup(self, store_id: int, item_ids) -> tuple[np.ndarray, np.ndarray]:
+        """Features for `item_ids` of one store: (matrix, found mask); missing rows are NaN."""
+        item_ids = np.asarray(item_ids, np.int64)
+        out = np.full((len(item_ids), len(FEATURE_NAMES)), np.nan, np.float32)
+        part = self.partition(store_id)
+        if part is None or not len(part.item_ids):
+            return out, np.zeros(len(item_ids), bool)
+        pos = np.searchsorted(part.item_ids, item_ids)
+        pos_clipped = np.minimum(pos, len(part.item_ids) - 1)
+        found = part.item_ids[pos_clipped] == item_ids
+        out[found] = part.features[pos_clipped[found]]
+        return out, found
+
+    def get(self, store_id: int, item_id: int) -> dict[str, float] | None:
+        row, found = self.lookup(store_id, [item_id])
+        if not found[0]:
+            return None
+        return dict(zip(FEATURE_NAMES, map(float, row[0])))
+
+
+
+_store: FeatureStore | None = None
+
+
+def get_feature_store() -> FeatureStore:
+    global _store
+    if _store is None:
+        from rimas.config import settings
+
+        _store = FeatureStore(settings.feature_store_dir)
+    return _store
@@ -1,17 +1,43 @@
-"""Inference - demand prediction and anomaly detection."""
+"""Inference - demand prediction and anomaly detection.
+
+`detect_anomaly` scores one value online; `scan_anomalies` is the batch mode
+for backfilling flags over historical sales (see `rimas.ml.anomaly_scan`).
+"""
 
 import logging
+from collections.abc import Sequence
 from typing import Any
 
 from rimas.ml.mlflow_client import get_model
+from rimas.ml.model_manager import get_model_manager
 
 logger = logging.getLogger(__name__)
 
 
-def predict_demand(product_id: str, quantity: float) -> dict[str, Any]:
-    model = get_model("demand_model")
+def _predict(name: str, rows: list[dict]) -> Any | None:
+    """Predict with the managed (hot-swapped) version, else the lazily loaded one."""
+    managed = get_model_manager(name).predict(rows)
+    if managed is not None:
+        return managed[0]
+    model = get_model(name)
     if model is not None:
-        pred = model.predict([{"product_id": product_id, "quantity": quantity}])
+        return model.predict(rows)
+    return None
+
+
+def _demand_features(store_id: int | None, product_id: str) -> dict[str, float]:
+    """Stored (store, item) features, via the online feature cache."""
+    if store_id is None or not product_id.isdigit():
+        return {}
+    from rimas.ml.online_features import get_online_features
+
+    return get_online_features().get(store_id, int(product_id)) or {}
+
+
+def predict_demand(product_id: str, quantity: float, store_id: int | None = None) -> dict[str, Any]:
+    row = {"product_id": product_id, "quantity": quantity, **_demand_features(store_id, product_id)}
+    pred = _predict("demand_model", [row])
+    if pred is not None:
         return {"prediction": float(pred[0]), "product_id": product_id, "is_mock": False}
     return {
         "prediction": 100.0 * quantity,
@@ -20,10 +46,35 @@ def predict_demand(product_id: str, quantity: float) -> dict[str, Any]:
     }
 
 
+def predict_demand_batch(
+    store_id: int, item_ids: Sequence[int], quantity: float = 1.0
+) -> list[dict[str, Any]]:
+    """Forecast every item of a store with one feature lookup and one model call."""
+    from rimas.ml.features import FEATURE_NAMES
+    from rimas.ml.online_features import get_online_features
+
+    features, found = get_online_features().get_many(store_id, item_ids)
+    rows = []
+    for item_id, row, ok in zip(item_ids, features.tolist(), found.tolist()):
+        record = {"product_id": str(item_id), "quantity": quantity}
+        if ok:
+            record.update(zip(FEATURE_NAMES, row))
+        rows.append(record)
+    preds = _predict("demand_model", rows) if rows else None
+    if preds is not None:
+        return [
+            {"item_id": item_id, "prediction": float(p), "is_mock": False}
+            for item_id, p in zip(item_ids, preds)
+        ]
+    return [
+        {"item_id": item_id, "prediction": 100.0 * quantity, "is_mock": True}
+        for item_id in item_ids
+    ]
+
+
 def detect_anomaly(metric: str, value: float) -> dict[str, Any]:
-    model = get_model("anomaly_model")
-    if model is not None:
-        pred = model.predict([{"metric": metric, "value": value}])
+    pred = _predict("anomaly_model", [{"metric": metric, "value": value}])
+    if pred is not None:
         return {"is_anomaly": bool(pred[0]), "score": 0.0, "metric": metric, "is_mock": False}
     is_anomaly = value > 1000 or value < 0
     return {
@@ -32,3 +83,35 @@ def detect_anomaly(metric: str, value: float) -> dict[str, Any]:
         "metric": metric,
         "is_mock": True,
     }
+
+
+def scan_anomalies(
+    sales_paths: Sequence[str],
+    window: int = 28,
+    season: int = 7,
+    threshold: float = 3.5,
+    min_scale: float = 1.0,
+    workers: int | None = None,
+) -> dict[str, Any]:
+    """Vectorized rolling z-score / MAD / seasonal scan of sales CSVs.
+
+    Returns the flag columns plus what was scanned (`store_ids`,
+    `day_range`, `points`), which `anomaly_service.write_flags` replaces.
+    """
+    from rimas.ml.anomaly_scan import ScanParams, scan_daily
+    from rimas.ml.features import read_sales_daily
+
+    daily = read_sales_daily(sales_paths)
+    params = ScanParams(window=window, season=season, threshold=threshold, min_scale=min_scale)
+    flags = scan_daily(daily, params, workers)
+    logger.info(
+        "Anomaly scan finished",
+        extra={"points": len(daily), "flagged": len(flags["day"]), "workers": workers},
+    )
+    days = daily["day"]
+    return {
+        "flags": flags,
+        "store_ids": sorted(int(s) for s in daily["store_id"].unique()),
+        "day_range": (int(days.min()), int(days.max())) if len(daily) else None,
+        "points": len(daily),
+    }
@@ -1,26 +1,76 @@
 """MLflow client - model loading and tracking."""
 
 import logging
+import time
 from typing import Any
 
 from rimas.config import settings
+from rimas.ml.artifact_cache import CachedModel, ModelArtifactCache
 
 logger = logging.getLogger(__name__)
 
-_loaded_model = None
+_artifact_cache: ModelArtifactCache | None = None
+_loaded_models: dict[tuple[str, str], Any] = {}
+_failed_at: dict[tuple[str, str], float] = {}
+
+
+def get_artifact_cache() -> ModelArtifactCache:
+    global _artifact_cache
+    if _artifact_cache is None:
+        _artifact_cache = ModelArtifactCache(
+            settings.model_cache_dir,
+            max_bytes=settings.model_cache_max_bytes,
+            tracking_uri=settings.mlflow_tracking_uri,
+            request_timeout_s=settings.model_registry_timeout_s,
+        )
+    return _artifact_cache
+
+
+def _load_pyfunc(path) -> Any:
+    import mlflow.pyfunc
+
+    return mlflow.pyfunc.load_model(str(path))
+
+
+def load_cached_model(cached: CachedModel) -> Any:
+    """Load a cached model, with weights shared across workers if enabled."""
+    if settings.model_shared_weights:
+        from rimas.ml.shared_weights import load_shared
+
+        try:
+            return load_shared(get_artifact_cache(), cached, _load_pyfunc)
+        except Exception as e:
+            logger.warning(
+                "Shared weights unavailable, loading a private copy",
+                extra={"model": cached.name, "version": cached.version, "error": str(e)},
+            )
+    return _load_pyfunc(cached.path)
 
 
 def get_model(model_name: str = "demand_model", stage: str = "Production") -> Any | None:
-    global _loaded_model
+    """Load `model_name`@`stage` once per process via the local artifact cache.
+
+    Failures are remembered for `settings.model_retry_interval_s` so callers
+    fall back to the stub without hitting MLflow on every request.
+    """
+    key = (model_name, stage)
+    model = _loaded_models.get(key)
+    if model is not None:
+        return model
+    failed_at = _failed_at.get(key)
+    if failed_at is not None and time.monotonic() - failed_at < settings.model_retry_interval_s:
+        return None
     try:
-        import mlflow
-        import mlflow.pyfunc
-
-        mlflow.set_tracking_uri(settings.mlflow_tracking_uri)
-        model_uri = f"models:/{model_name}/{stage}"
-        _loaded_model = mlflow.pyfunc.load_model(model_uri)
-        logger.info("Model loaded from MLflow", extra={"model_uri": model_uri})
-        return _loaded_model
+        cached = get_artifact_cache().resolve(model_name, stage)
+        model = load_cached_model(cached)
+        _loaded_models[key] = model
+        _failed_at.pop(key, None)
+        logger.info(
+            "Model loaded from cache",
+            extra={"model": model_name, "version": cached.version, "path": str(cached.path)},
+        )
+        return model
     except Exception as e:
+        _failed_at[key] = time.monotonic()
         logger.warning("No model in MLflow, using stub", extra={"error": str(e)})
         return None
@@ -0,0 +1,264 @@
+"""Hot-swappable model versions with background refresh and shadow scoring.
+
+A `ModelManager` serves one registered model. A background task polls the
+registry (through the local artifact cache), loads a new version in a worker
+thread and swaps it in with a single reference assignment, so in-flight
+predictions keep the version they started with and are never blocked by a
+load. Optionally a candidate stage (e.g. `Staging`) is scored on a fraction
+of requests off the request path, recording latency and prediction deltas.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from rimas.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    version: str
+    model: Any
+
+
+@dataclass
+class ShadowStats:
+    scored: int = 0
+    skipped: int = 0
+    errors: int = 0
+    active_latency_ms: float = 0.0
+    candidate_latency_ms: float = 0.0
+    abs_delta: float = 0.0
+    max_abs_delta: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, active_ms: float, candidate_ms: float, deltas: Sequence[float]) -> None:
+        with self._lock:
+            self.scored += 1
+            self.active_latency_ms += active_ms
+            self.candidate_latency_ms += candidate_ms
+            if deltas:
+                mean = sum(deltas) / len(deltas)
+                self.abs_delta += mean
+                self.max_abs_delta = max(self.max_abs_delta, max(deltas))
+
+    def as_dict(self) -> dict:
+        n = self.scored or 1
+        return {
+            "scored": self.scored,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "mean_active_latency_ms": self.active_latency_ms / n,
+            "mean_candidate_latency_ms": self.candidate_latency_ms / n,
+            "mean_abs_delta": self.abs_delta / n,
+            "max_abs_delta": self.max_abs_delta,
+        }
+
+
+def _resolve_cached(name: str, stage: str):
+    from rimas.ml.mlflow_client import get_artifact_cache
+
+    return get_artifact_cache().resolve(name, stage)
+
+
+def _load_cached(cached) -> Any:
+    from rimas.ml.mlflow_client import load_cached_model
+
+    return load_cached_model(cached)
+
+
+class ModelManager:
+    """Serve `name`@`stage`, refreshing it in the background."""
+
+    def __init__(
+        self,
+        name: str,
+        stage: str = "Production",
+        candidate_stage: str | None = None,
+        shadow_fraction: float = 0.0,
+        poll_interval_s: float = 60.0,
+        resolver: Callable[[str, str], Any] = _resolve_cached,
+        loader: Callable[[Any], Any] = _load_cached,
+        shadow_max_inflight: int = 4,
+    ) -> None:
+        self.name = name
+        self.stage = stage
+        self.candidate_stage = candidate_stage
+        self.shadow_fraction = shadow_fraction
+        self.poll_interval_s = poll_interval_s
+        self._resolver = resolver
+        self._loader = loader
+        self._active: LoadedModel | None = None
+        self._candidate: LoadedModel | None = None
+        self._task: asyncio.Task | None = None
+        self._refresh_lock = asyncio.Lock()
+        self._shadow_pool: ThreadPoolExecutor | None = None
+        self._shadow_slots = threading.BoundedSemaphore(shadow_max_inflight)
+        self.shadow_stats = ShadowStats()
+
+    @property
+    def active(self) -> LoadedModel | None:
+        return self._active
+
+    @property
+    def version(self) -> str | None:
+        active = self._active
+        return active.version if active is not None else None
+
+    # -- refresh -----------------------------------------------------------
+
+    async def _load(self, stage: str, current: LoadedModel | None) -> LoadedModel | None:
+        """Load `stage` if it resolves to a version other than `current`."""
+        cached = await asyncio.to_thread(self._resolver, self.name, stage)
+        if current is not None and cached.version == current.version:
+            return None
+        model = await asyncio.to_thread(self._loader, cached)
+        return LoadedModel(cached.version, model)
+
+    async def refresh(self) -> bool:
+        """Poll the registry once; returns True if the active version changed."""
+        async with self._refresh_lock:
+            swapped = False
+            try:
+                loaded = await self._load(self.stage, self._active)
+                if loaded is not None:
+                    previous = self.version
+                    self._active = loaded
+                    swapped = True
+                    logger.info(
+                        "Model version swapped in",
+                        extra={"model": self.name, "version": loaded.version, "previous": previous},
+                    )
+            except Exception as e:
+                logger.warning(
+                    "Model refresh failed, keeping current version",
+                    extra={"model": self.name, "version": self.version, "error": str(e)},
+                )
+            if self.candidate_stage and self.shadow_fraction > 0:
+                try:
+                    candidate = await self._load(self.candidate_stage, self._candidate)
+                    if candidate is not None:
+                        self._candidate = candidate
+                        self.shadow_stats = ShadowStats()
+                except Exception as e:
+                    logger.info(
+                        "No shadow candidate",
+                        extra={"model": self.name, "stage": self.candidate_stage, "error": str(e)},
+                    )
+            return swapped
+
+    async def _poll(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.poll_interval_s)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(
+                self._poll(), name=f"model-refresh-{self.name}"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._shadow_pool is not None:
+            self._shadow_pool.shutdown(wait=False, cancel_futures=True)
+            self._shadow_pool = None
+
+    # -- scoring -----------------------------------------------------------
+
+    def predict(self, rows: list[dict]) -> tuple[Any, str] | None:
+        """Predict with the active version; None if no version is loaded yet."""
+        active = self._active
+        if active is None:
+            return None
+        started = time.perf_counter()
+        preds = active.model.predict(rows)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        candidate = self._candidate
+        if candidate is not None and random.random() < self.shadow_fraction:
+            self._submit_shadow(candidate, rows, preds, elapsed_ms)
+        return preds, active.version
+
+    def _submit_shadow(self, candidate: LoadedModel, rows, active_preds, active_ms: float) -> None:
+        if not self._shadow_slots.acquire(blocking=False):
+            self.shadow_stats.skipped += 1
+            return
+        if self._shadow_pool is None:
+            self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._shadow_pool.submit(self._score_shadow, candidate, rows, active_preds, active_ms)
+
+    def _score_shadow(self, candidate: LoadedModel, rows, active_preds, active_ms: float) -> None:
+        stats = self.shadow_stats
+        try:
+            started = time.perf_counter()
+            preds = candidate.model.predict(rows)
+            candidate_ms = (time.perf_counter() - started) * 1000
+            deltas = [abs(float(c) - float(a)) for c, a in zip(preds, active_preds)]
+            stats.record(active_ms, candidate_ms, deltas)
+        except Exception:
+            stats.errors += 1
+            logger.exception("Shadow scoring failed", extra={"model": self.name})
+        finally:
+            self._shadow_slots.release()
+
+    def status(self) -> dict:
+        candidate = self._candidate
+        return {
+            "name": self.name,
+            "stage": self.stage,
+            "version": self.version,
+            "candidate_stage": self.candidate_stage,
+            "candidate_version": candidate.version if candidate is not None else None,
+            "shadow_fraction": self.shadow_fraction,
+            "shadow": self.shadow_stats.as_dict(),
+        }
+
+
+_managers: dict[str, ModelManager] = {}
+
+MANAGED_MODELS = ("demand_model", "anomaly_model")
+
+
+def get_model_manager(name: str) -> ModelManager:
+    manager = _managers.get(name)
+    if manager is None:
+        manager = ModelManager(
+            name,
+            candidate_stage=settings.model_shadow_stage,
+            shadow_fraction=settings.model_shadow_fraction,
+            poll_interval_s=settings.model_refresh_interval_s,
+        )
+        _managers[name] = manager
+    return manager
+
+
+def model_version(name: str = "demand_model") -> str | None:
+    """Version currently serving `name`, or None if none is loaded."""
+    manager = _managers.get(name)
+    return manager.version if manager is not None else None
+
+
+async def start_model_managers() -> None:
+    if settings.model_refresh_interval_s <= 0:
+        return
+    for name in MANAGED_MODELS:
+        get_model_manager(name).start()
+
+
+async def stop_model_managers() -> None:
+    for manager in _managers.values():
+        await manager.stop()
@@ -0,0 +1,115 @@
+"""Model implementations served through MLflow pyfunc.
+
+Both models keep sufficient statistics, so retraining on new data only
+(warm start) folds the new examples into the stored statistics instead of
+refitting from scratch.
+
+- `RidgeDemandModel`: ridge regression of mean daily demand on the
+  `FEATURE_NAMES` features; prediction = daily demand x `quantity`
+  (e.g. a horizon in days). Rows without features get the training mean.
+- `ZScoreAnomalyModel`: per-metric running mean/variance (Welford); a value
+  is anomalous when |z| exceeds the learned threshold.
+"""
+
+from dataclasses import dataclass, field
+
+import mlflow.pyfunc
+import numpy as np
+
+from rimas.ml.features import FEATURE_NAMES
+
+
+@dataclass
+class RidgeStats:
+    """Sufficient statistics of a linear model with intercept: X'X, X'y, y'y, n."""
+
+    xtx: np.ndarray = field(default_factory=lambda: np.zeros((len(FEATURE_NAMES) + 1,) * 2))
+    xty: np.ndarray = field(default_factory=lambda: np.zeros(len(FEATURE_NAMES) + 1))
+    yty: float = 0.0
+    n: int = 0
+
+    @classmethod
+    def from_data(cls, x: np.ndarray, y: np.ndarray) -> "RidgeStats":
+        xa = np.column_stack([x, np.ones(len(x))])
+        return cls(xa.T @ xa, xa.T @ y, float(y @ y), len(y))
+
+    def __add__(self, other: "RidgeStats") -> "RidgeStats":
+        return RidgeStats(
+            self.xtx + other.xtx, self.xty + other.xty, self.yty + other.yty, self.n + other.n
+        )
+
+    def solve(self, alpha: float) -> np.ndarray:
+        """Coefficients (intercept last); the intercept is not penalized."""
+        penalty = np.eye(len(self.xty)) * alpha
+        penalty[-1, -1] = 0.0
+        return np.linalg.solve(self.xtx + penalty + 1e-9 * np.eye(len(self.xty)), self.xty)
+
+
+def predict_linear(coef: np.ndarray, x: np.ndarray) -> np.ndarray:
+    return x @ coef[:-1] + coef[-1]
+
+
+def _rows(model_input) -> list[dict]:
+    if hasattr(model_input, "to_dict"):
+        return model_input.to_dict(orient="records")
+    return list(model_input)
+
+
+class RidgeDemandModel(mlflow.pyfunc.PythonModel):
+    def __init__(self, stats: RidgeStats, alpha: float, trained_through_day: int | None) -> None:
+        self.stats = stats
+        self.alpha = alpha
+        self.trained_through_day = trained_through_day
+        self.coef = stats.solve(alpha)
+        self.mean_demand = float(stats.xty[-1] / stats.n) if stats.n else 0.0
+
+    def predict(self, context, model_input, params=None):
+        rows = _rows(model_input)
+        x = np.array(
+            [[float(row.get(name, np.nan)) for name in FEATURE_NAMES] for row in rows], np.float64
+        ).reshape(len(rows), len(FEATURE_NAMES))
+        quantity = np.array([float(row.get("quantity", 1.0) or 1.0) for row in rows])
+        known = ~np.isnan(x).any(axis=1)
+        daily = np.full(len(rows), self.mean_demand)
+        if known.any():
+            daily[known] = predict_linear(self.coef, x[known])
+        return np.maximum(daily, 0.0) * quantity
+
+
+@dataclass
+class MetricStats:
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def merge(self, values: np.ndarray) -> "MetricStats":
+        """Chan et al. parallel combination with a batch of values."""
+        if not len(values):
+            return self
+        n_b, mean_b = len(values), float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        return MetricStats(n, self.mean + delta * n_b / n, self.m2 + m2_b + delta**2 * self.n * n_b / n)
+
+    @property
+    def std(self) -> float:
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+
+
+class ZScoreAnomalyModel(mlflow.pyfunc.PythonModel):
+    def __init__(self, stats: dict[str, MetricStats], threshold: float, trained_through_day: int | None) -> None:
+        self.stats = stats
+        self.threshold = threshold
+        self.trained_through_day = trained_through_day
+
+    def scores(self, rows: list[dict]) -> np.ndarray:
+        out = np.zeros(len(rows))
+        for i, row in enumerate(rows):
+            st = self.stats.get(row.get("metric"))
+            if st is not None and st.std > 0:
+                out[i] = abs(float(row["value"]) - st.mean) / st.std
+        return out
+
+    def predict(self, context, model_input, params=None):
+        return self.scores(_rows(model_input)) > self.threshold
@@ -0,0 +1,105 @@
+"""Online feature lookup for inference.
+
+A bounded, in-process LRU cache with TTL in front of the memory-mapped
+`FeatureStore`. Lookups are batched: `get_many` serves a whole plan's items
+with one pass over the cache and one vectorized store lookup for the misses.
+Missing (store, item) pairs are cached too, so unknown items do not hit the
+store on every request.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+
+import numpy as np
+
+from rimas.config import settings
+from rimas.ml.features import FEATURE_NAMES, FeatureStore, get_feature_store
+
+
+class OnlineFeatureCache:
+    def __init__(
+        self,
+        store: FeatureStore,
+        max_entries: int = 100_000,
+        ttl_s: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.store = store
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        # (store_id, item_id) -> (expires_at, feature row or None if unknown)
+        self._entries: OrderedDict[tuple[int, int], tuple[float, np.ndarray | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, store_id: int, item_ids: Sequence[int]) -> tuple[np.ndarray, np.ndarray]:
+        """Features for `item_ids` of one store: (matrix, found mask); missing rows are NaN."""
+        out = np.full((len(item_ids), len(FEATURE_NAMES)), np.nan, np.float32)
+        found = np.zeros(len(item_ids), bool)
+        now = self._clock()
+        missing: list[int] = []
+        with self._lock:
+            for i, item_id in enumerate(item_ids):
+                entry = self._entries.get((store_id, item_id))
+                if entry is None or entry[0] <= now:
+                    missing.append(i)
+                    continue
+                self._entries.move_to_end((store_id, item_id))
+                if entry[1] is not None:
+                    out[i] = entry[1]
+                    found[i] = True
+            self.hits += len(item_ids) - len(missing)
+            self.misses += len(missing)
+        if not missing:
+            return out, found
+
+        miss_ids = [item_ids[i] for i in missing]
+        rows, row_found = self.store.lookup(store_id, miss_ids)
+        out[missing] = rows
+        found[missing] = row_found
+        expires_at = now + self.ttl_s
+        with self._lock:
+            for item_id, row, ok in zip(miss_ids, rows, row_found):
+                self._entries[(store_id, item_id)] = (expires_at, row.copy() if ok else None)
+                self._entries.move_to_end((store_id, item_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return out, found
+
+    def get(self, store_id: int, item_id: int) -> dict[str, float] | None:
+        rows, found = self.get_many(store_id, [item_id])
+        if not found[0]:
+            return None
+        return dict(zip(FEATURE_NAMES, map(float, rows[0])))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache: OnlineFeatureCache | None = None
+
+
+def get_online_features() -> OnlineFeatureCache:
+    global _cache
+    if _cache is None:
+        _cache = OnlineFeatureCache(
+            get_feature_store(),
+            max_entries=settings.feature_cache_max_entries,
+            ttl_s=settings.feature_cache_ttl_s,
+        )
+    return _cache
@@ -0,0 +1,111 @@
+"""Shared-memory model weights across worker processes.
+
+Every uvicorn worker loading its own copy of a pyfunc model makes memory grow
+linearly with the worker count. Here a model is loaded once, pickled with
+its large NumPy arrays written out as `.npy` files, and each worker then
+unpickles it with those arrays memory-mapped read-only (`np.load(mmap_mode="r")`).
+The mapped pages come from the page cache and are shared by every process,
+so RSS per added worker stays roughly constant.
+
+Layout, next to the artifact cache objects:
+
+    shared/<digest>/model.pkl     pickle with persistent ids for external arrays
+    shared/<digest>/w00000.npy    one file per array of at least `min_bytes`
+
+Only plain, non-object `ndarray`s are externalized; models that write to
+their weights at predict time cannot use this loader (the arrays are read-only).
+"""
+
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "model.pkl"
+MIN_SHARED_BYTES = 64 * 1024
+
+
+class _ExternalizingPickler(pickle.Pickler):
+    """Writes large arrays to `<out_dir>/*.npy` and pickles a reference instead."""
+
+    def __init__(self, file, out_dir: Path, min_bytes: int) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.out_dir = out_dir
+        self.min_bytes = min_bytes
+        self._saved: dict[int, tuple[str, Any]] = {}
+
+    def persistent_id(self, obj):
+        import numpy as np
+
+        if type(obj) is not np.ndarray or obj.dtype.hasobject or obj.nbytes < self.min_bytes:
+            return None
+        saved = self._saved.get(id(obj))
+        if saved is None:
+            name = f"w{len(self._saved):05d}.npy"
+            np.save(self.out_dir / name, obj, allow_pickle=False)
+            # Keep `obj` referenced so its id cannot be reused while pickling.
+            saved = self._saved[id(obj)] = (name, obj)
+        return saved[0]
+
+
+class _MappingUnpickler(pickle.Unpickler):
+    def __init__(self, file, src_dir: Path) -> None:
+        super().__init__(file)
+        self.src_dir = src_dir
+        self._mapped: dict[str, Any] = {}
+
+    def persistent_load(self, pid):
+        import numpy as np
+
+        # Shared references to one array map one file once.
+        array = self._mapped.get(pid)
+        if array is None:
+            array = self._mapped[pid] = np.load(self.src_dir / pid, mmap_mode="r", allow_pickle=False)
+        return array
+
+
+def dump_shared(model: Any, target: Path, min_bytes: int = MIN_SHARED_BYTES) -> None:
+    """Write `model` to `target` atomically, externalizing large arrays."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=target.parent, prefix=".shared-"))
+    try:
+        with open(tmp / MANIFEST, "wb") as f:
+            _ExternalizingPickler(f, tmp, min_bytes).dump(model)
+        os.rename(tmp, target)
+    except OSError:
+        # Another process materialized the same digest first.
+        if not (target / MANIFEST).is_file():
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_mapped(target: Path) -> Any:
+    """Unpickle a model written by `dump_shared`, mapping its arrays read-only."""
+    with open(target / MANIFEST, "rb") as f:
+        return _MappingUnpickler(f, target).load()
+
+
+def load_shared(cache, cached, loader: Callable[[Path], Any]) -> Any:
+    """Load `cached` (a `CachedModel`) with weights shared across processes.
+
+    The first process to get here loads the model with `loader` and
+    materializes it under the cache's `shared/<digest>`; every other process
+    (and every later restart) only maps the files.
+    """
+    target = cache.root / "shared" / cached.digest
+    if not (target / MANIFEST).is_file():
+        with cache._locked(f".lock-shared-{cached.digest}"):
+            if not (target / MANIFEST).is_file():
+                dump_shared(loader(cached.path), target)
+                logger.info(
+                    "Model weights materialized for sharing",
+                    extra={"model": cached.name, "version": cached.version, "path": str(target)},
+                )
+    return load_mapped(target)
@@ -0,0 +1,200 @@
+"""Streaming anomaly detection with O(1) state per (store, metric).
+
+Each key keeps an exponentially weighted mean/variance and P² quantile
+sketches (Jain & Chlamtac, 1985), so the cost per point is constant no
+matter how long the history is. A point is scored against the state *before*
+it is folded in: `z = (value - ewma_mean) / ewma_std`, and flagged once the
+key has seen `warmup` points and `|z|` exceeds `z_threshold`.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime
+
+QUANTILES = (0.01, 0.5, 0.99)
+
+
+class P2Quantile:
+    """Single-quantile P² estimator: five markers, no stored samples."""
+
+    __slots__ = ("p", "heights", "positions", "desired", "increments", "count")
+
+    def __init__(self, p: float) -> None:
+        self.p = p
+        self.heights: list[float] = []
+        self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1.0, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.0]
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+        self.count = 0
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        q = self.heights
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1.0 if d > 0 else -1.0
+                candidate = q[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < candidate < q[i + 1]:
+                    j = i + int(step)
+                    candidate = q[i] + step * (q[j] - q[i]) / (n[j] - n[i])
+                q[i] = candidate
+                n[i] += step
+
+    def value(self) -> float | None:
+        if not self.heights:
+            return None
+        if self.count < 5:
+            return self.heights[min(len(self.heights) - 1, int(self.p * len(self.heights)))]
+        return self.heights[2]
+
+    def to_dict(self) -> dict:
+        return {
+            "p": self.p,
+            "heights": self.heights,
+            "positions": self.positions,
+            "desired": self.desired,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "P2Quantile":
+        sketch = cls(data["p"])
+        sketch.heights = list(data["heights"])
+        sketch.positions = list(data["positions"])
+        sketch.desired = list(data["desired"])
+        sketch.count = data["count"]
+        return sketch
+
+
+@dataclass
+class PointScore:
+    metric: str
+    ts: datetime
+    value: float
+    score: float
+    is_anomaly: bool
+    mean: float
+    std: float
+    late: bool = False
+
+
+class MetricState:
+    """EWMA mean/variance plus quantile sketches of one (store, metric) stream."""
+
+    __slots__ = ("count", "mean", "var", "last_ts", "sketches")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.last_ts: datetime | None = None
+        self.sketches = [P2Quantile(p) for p in QUANTILES]
+
+    def score(self, value: float) -> float:
+        std = math.sqrt(self.var)
+        if self.count < 2 or std == 0:
+            return 0.0
+        return (value - self.mean) / std
+
+    def update(self, value: float, alpha: float, ts: datetime) -> None:
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            incr = alpha * diff
+            self.mean += incr
+            self.var = (1 - alpha) * (self.var + diff * incr)
+        self.count += 1
+        self.last_ts = ts
+        for sketch in self.sketches:
+            sketch.add(value)
+
+    def quantiles(self) -> dict[str, float | None]:
+        return {f"p{round(s.p * 100):02d}": s.value() for s in self.sketches}
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "var": self.var,
+            "last_ts": self.last_ts.isoformat() if self.last_ts else None,
+            "sketches": [s.to_dict() for s in self.sketches],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MetricState":
+        state = cls()
+        state.count = data["count"]
+        state.mean = data["mean"]
+        state.var = data["var"]
+        state.last_ts = datetime.fromisoformat(data["last_ts"]) if data["last_ts"] else None
+        state.sketches = [P2Quantile.from_dict(s) for s in data["sketches"]]
+        return state
+
+
+class StreamingDetector:
+    """In-process detector state for many (store_id, metric) keys."""
+
+    def __init__(self, halflife_points: float = 50.0, z_threshold: float = 4.0, warmup: int = 20) -> None:
+        self.alpha = 1 - 0.5 ** (1 / halflife_points)
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.states: dict[tuple[int, str], MetricState] = {}
+        self.dirty: set[tuple[int, str]] = set()
+
+    def score_points(self, store_id: int, points) -> list[PointScore]:
+        """Score and fold in points (`metric`, `ts`, `value`), oldest first per key.
+
+        Points older than a key's latest folded timestamp are scored but not
+        folded in, so replays and out-of-order retries cannot skew the state.
+        """
+        order = sorted(range(len(points)), key=lambda i: points[i].ts)
+        results: list[PointScore | None] = [None] * len(points)
+        for i in order:
+            point = points[i]
+            key = (store_id, point.metric)
+            state = self.states.get(key)
+            if state is None:
+                state = self.states[key] = MetricState()
+            z = state.score(point.value)
+            late = state.last_ts is not None and point.ts < state.last_ts
+            results[i] = PointScore(
+                metric=point.metric,
+                ts=point.ts,
+                value=point.value,
+                score=z,
+                is_anomaly=state.count >= self.warmup and abs(z) > self.z_threshold,
+                mean=state.mean,
+                std=math.sqrt(state.var),
+                late=late,
+            )
+            if not late:
+                state.update(point.value, self.alpha, point.ts)
+                self.dirty.add(key)
+        return results
+
+    def take_dirty(self) -> dict[tuple[int, str], dict]:
+        """Serialized states changed since the last call (for checkpointing)."""
+        dirty, self.dirty = self.dirty, set()
+        return {key: self.states[key].to_dict() for key in dirty}
@@ -0,0 +1,194 @@
+"""Training - demand and anomaly models, logged and registered in MLflow.
+
+Demand: ridge regression on point-in-time features (see
+`features.point_in_time_features`). Every (alpha, fold) candidate of a
+forward-chaining, time-ordered cross-validation is scored in a process pool;
+the workers memory-map the training arrays from a temporary directory
+instead of receiving pickled copies.
+
+Warm start: the current Production model is loaded and only examples after
+its `trained_through_day` are folded into its sufficient statistics.
+"""
+
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from rimas.ml.models import (
+    MetricStats,
+    RidgeDemandModel,
+    RidgeStats,
+    ZScoreAnomalyModel,
+    predict_linear,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALPHAS = (0.01, 0.1, 1.0, 10.0, 100.0)
+DEFAULT_FOLDS = 4
+ANOMALY_METRIC = "units_sold"
+
+
+def time_fold_bounds(days: np.ndarray, n_folds: int) -> list[tuple[int, int]]:
+    """Forward-chaining folds as (val_start_day, val_end_day) pairs.
+
+    Fold k trains on every day before `val_start_day` and validates on
+    [val_start_day, val_end_day).
+    """
+    unique = np.unique(days)
+    if len(unique) < n_folds + 1:
+        return []
+    edges = [int(unique[len(unique) * k // (n_folds + 1)]) for k in range(1, n_folds + 1)]
+    edges.append(int(unique[-1]) + 1)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _score_candidate(
+    data_dir: str, alpha: float, bounds: tuple[int, int], base: RidgeStats
+) -> tuple[float, float, int]:
+    """Validation MSE of `alpha` on one fold; runs in a worker process."""
+    x = np.load(Path(data_dir) / "x.npy", mmap_mode="r")
+    y = np.load(Path(data_dir) / "y.npy", mmap_mode="r")
+    days = np.load(Path(data_dir) / "day.npy", mmap_mode="r")
+    train = days < bounds[0]
+    val = (days >= bounds[0]) & (days < bounds[1])
+    coef = (base + RidgeStats.from_data(x[train], y[train])).solve(alpha)
+    err = predict_linear(coef, x[val]) - y[val]
+    return alpha, float(err @ err), int(val.sum())
+
+
+def cross_validate(
+    x: np.ndarray,
+    y: np.ndarray,
+    days: np.ndarray,
+    alphas=DEFAULT_ALPHAS,
+    n_folds: int = DEFAULT_FOLDS,
+    workers: int | None = None,
+    base: RidgeStats | None = None,
+) -> dict[float, float]:
+    """Mean validation MSE per alpha, over all folds, scored in parallel."""
+    bounds = time_fold_bounds(days, n_folds)
+    if not bounds:
+        return {}
+    base = base or RidgeStats()
+    sse = {alpha: 0.0 for alpha in alphas}
+    count = {alpha: 0 for alpha in alphas}
+    with tempfile.TemporaryDirectory(prefix="rimas-cv-") as data_dir:
+        np.save(Path(data_dir) / "x.npy", x)
+        np.save(Path(data_dir) / "y.npy", y)
+        np.save(Path(data_dir) / "day.npy", days)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = [
+                pool.submit(_score_candidate, data_dir, alpha, b, base)
+                for alpha in alphas
+                for b in bounds
+            ]
+            for future in futures:
+                alpha, err, n = future.result()
+                sse[alpha] += err
+                count[alpha] += n
+    return {alpha: sse[alpha] / count[alpha] for alpha in alphas if count[alpha]}
+
+
+def train_demand(
+    x: np.ndarray,
+    y: np.ndarray,
+    days: np.ndarray,
+    alphas=DEFAULT_ALPHAS,
+    n_folds: int = DEFAULT_FOLDS,
+    workers: int | None = None,
+    base: RidgeDemandModel | None = None,
+) -> tuple[RidgeDemandModel, dict]:
+    """Fit (or warm-start) the demand model; returns (model, metrics)."""
+    if base is not None and base.trained_through_day is not None:
+        new = days > base.trained_through_day
+        x, y, days = x[new], y[new], days[new]
+    base_stats = base.stats if base is not None else RidgeStats()
+    cv = cross_validate(x, y, days, alphas, n_folds, workers, base_stats)
+    if cv:
+        alpha = min(cv, key=cv.get)
+    else:
+        alpha = base.alpha if base is not None else 1.0
+    through = int(days.max()) if len(days) else (base.trained_through_day if base else None)
+    model = RidgeDemandModel(base_stats + RidgeStats.from_data(x, y), alpha, through)
+    metrics = {"n_new_examples": float(len(y)), "n_examples": float(model.stats.n), "alpha": alpha}
+    if cv:
+        metrics["cv_mse"] = cv[alpha]
+        metrics.update({f"cv_mse_alpha_{a:g}": mse for a, mse in cv.items()})
+    return model, metrics
+
+
+def train_anomaly(
+    daily, contamination: float = 0.005, base: ZScoreAnomalyModel | None = None
+) -> tuple[ZScoreAnomalyModel, dict]:
+    """Fit per-metric running statistics and a z-score threshold on daily units sold."""
+    recorded = daily[daily["recorded"].astype(bool)]
+    days = recorded["day"].to_numpy(np.int64)
+    if base is not None and base.trained_through_day is not None:
+        recorded = recorded[days > base.trained_through_day]
+        days = days[days > base.trained_through_day]
+    values = recorded["units"].to_numpy(np.float64)
+    stats = dict(base.stats) if base is not None else {}
+    stats[ANOMALY_METRIC] = stats.get(ANOMALY_METRIC, MetricStats()).merge(values)
+    through = int(days.max()) if len(days) else (base.trained_through_day if base else None)
+    threshold = base.threshold if base is not None else 3.0
+    model = ZScoreAnomalyModel(stats, threshold, trained_through_day=through)
+    if len(values):
+        z = model.scores([{"metric": ANOMALY_METRIC, "value": v} for v in values])
+        model.threshold = max(3.0, float(np.quantile(z, 1 - contamination)))
+    return model, {"n_new_examples": float(len(values)), "threshold": model.threshold}
+
+
+# -- MLflow -----------------------------------------------------------------------
+
+def _use_tracking_uri(uri: str) -> None:
+    import mlflow
+
+    # The registry defaults to the tracking server, unless an earlier caller
+    # in this process pointed it elsewhere.
+    mlflow.set_tracking_uri(uri)
+    mlflow.set_registry_uri(uri)
+
+
+def load_production(name: str, tracking_uri: str):
+    """Current Production model of `name` (unwrapped), or None."""
+    import mlflow
+
+    _use_tracking_uri(tracking_uri)
+    try:
+        return mlflow.pyfunc.load_model(f"models:/{name}/Production").unwrap_python_model()
+    except Exception as e:
+        logger.info("No Production model to warm-start from", extra={"model": name, "error": str(e)})
+        return None
+
+
+def log_and_register(
+    name: str,
+    model,
+    params: dict,
+    metrics: dict,
+    tracking_uri: str,
+    stage: str = "Production",
+) -> str:
+    """Log a training run, register the model and move it to `stage`; returns the version."""
+    import mlflow
+    from mlflow.tracking import MlflowClient
+
+    _use_tracking_uri(tracking_uri)
+    with mlflow.start_run(run_name=f"train-{name}") as run:
+        mlflow.log_params(params)
+        mlflow.log_metrics(metrics)
+        mlflow.pyfunc.log_model("model", python_model=model, registered_model_name=name)
+    client = MlflowClient()
+    version = max(
+        int(v.version) for v in client.search_model_versions(f"run_id='{run.info.run_id}'")
+    )
+    client.transition_model_version_stage(
+        name, str(version), stage, archive_existing_versions=True
+    )
+    logger.info("Model registered", extra={"model": name, "version": version, "stage": stage})
+    return str(version)
@@ -1,49 +1,72 @@
 """Stub orchestration (legacy graph + heuristics)."""
 
+import asyncio
 import logging
 from datetime import datetime
 from uuid import uuid4
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from rimas.agents.forecast import forecast_items
 from rimas.agents.graph import build_plan_graph
-from rimas.api.schemas import CreatePlanRequest, PlanMetadata, PlanStatus
-from rimas.services.plan_service import create_plan
+from rimas.agents.items import PlanItems
+from rimas.agents.nodes import forecast_summary, order_quantity
+from rimas.api.schemas import PlanMetadata, PlanRequest, PlanStatus
+from rimas.config import settings
+from rimas.deadline import Deadline, run_within
+from rimas.logging import log_context
+from rimas.ml.model_manager import model_version
+from rimas.services.plan_service import apply_statement_timeout, create_plan, plan_result
 
 logger = logging.getLogger(__name__)
 
 
-def _generate_recommendations(req: CreatePlanRequest, agent_result: dict) -> list[dict]:
-    """Produce deterministic recommendations from request items."""
+def _forecast(req: PlanRequest, items: PlanItems, deadline: Deadline | None) -> dict:
+    """Forecasts for all items (one batched call) within what is left of `deadline`."""
+    timeout_s = deadline.budget(settings.plan_node_reserve_ms / 1000) if deadline else None
+    return forecast_items(req.store_id, items.item_ids, req.horizon_days, timeout_s)
+
+
+def _generate_recommendations(req: PlanRequest, items: PlanItems, forecasts) -> list[dict]:
+    """Recommendations from demand forecasts, or heuristics where there are none."""
     recs = []
-    for item in req.items:
-        qty = max(0, 50 - item.current_stock) if item.current_stock < 50 else 0
+    for item_id, stock, forecast in zip(items.item_ids, items.stocks, forecasts):
+        qty = order_quantity(stock, forecast)
         discount = min(0.1, req.constraints.max_discount) if qty > 0 else 0.0
         recs.append({
-            "item_id": item.item_id,
+            "item_id": item_id,
             "recommended_order_qty": qty,
             "recommended_discount": round(discount, 2),
             "confidence": 0.85,
-            "rationale": f"Stub: stock={item.current_stock}, horizon={req.horizon_days}d",
+            "rationale": f"Stub: stock={stock}, horizon={req.horizon_days}d",
         })
     return recs
 
 
-async def run_plan_workflow_stub(
-    req: CreatePlanRequest,
-    db: AsyncSession,
-) -> dict:
+def generate_plan_stub(req: PlanRequest, deadline: Deadline | None = None) -> dict:
+    """Run the legacy graph and build an unpersisted plan draft."""
     from rimas.agents.state import PlanState
 
+    request_payload = req.model_dump(mode="json")
+    # Items go to the graph as one PlanItems shared by reference, not as
+    # per-item dicts in the context.
+    items = (
+        req.items
+        if isinstance(req.items, PlanItems)
+        else PlanItems.from_inputs(request_payload["items"])
+    )
     context = {
         "store_id": req.store_id,
         "horizon_days": req.horizon_days,
-        "constraints": req.constraints.model_dump(),
-        "items": [i.model_dump() for i in req.items],
+        "constraints": request_payload["constraints"],
+        "items": items,
     }
+    trace_id = str(uuid4())
     graph = build_plan_graph()
-    initial: PlanState = {"objective": "optimize inventory", "context": context}
-    result = graph.invoke(initial)
+    initial: PlanState = {"objective": "optimize inventory", "context": context, "items": items}
+    with log_context(trace_id=trace_id):
+        result = graph.invoke(initial)
+        forecast = _forecast(req, items, deadline)
 
     agent_outputs = {
         "data_analysis": result.get("data_analysis", {}),
@@ -52,34 +75,51 @@ async def run_plan_workflow_stub(
         "supervisor_decision": result.get("supervisor_decision", {}),
     }
 
-    recommendations = _generate_recommendations(req, result)
-    trace_id = str(uuid4())
+    agent_outputs["demand_forecast"] = forecast_summary(forecast, req.horizon_days)
+    recommendations = _generate_recommendations(req, items, forecast["forecasts"])
     now = datetime.utcnow()
+    version = model_version("demand_model")
 
     final_decision = {
         "recommendations": recommendations,
         "metadata": {
-            "model_version": None,
+            "model_version": version,
             "generated_at": now.isoformat(),
             "trace_id": trace_id,
         },
     }
-
-    plan_id = await create_plan(
-        db=db,
-        request_payload=req.model_dump(mode="json"),
-        agent_outputs=agent_outputs,
-        final_decision=final_decision,
-        status=PlanStatus.created,
-    )
-
     return {
-        "plan_id": plan_id,
-        "status": PlanStatus.created,
+        "request_payload": request_payload,
+        "agent_outputs": agent_outputs,
+        "final_decision": final_decision,
         "recommendations": recommendations,
         "metadata": PlanMetadata(
-            model_version=None,
+            model_version=version,
             generated_at=now,
             trace_id=trace_id,
         ),
     }
+
+
+async def run_plan_workflow_stub(
+    req: PlanRequest,
+    db: AsyncSession,
+    deadline: Deadline | None = None,
+) -> dict:
+    # The legacy graph is synchronous; keep it off the event loop. On
+    # expiry the await is cancelled and the thread's result is discarded.
+    draft = await run_within(
+        deadline,
+        asyncio.to_thread(generate_plan_stub, req, deadline),
+        reserve_s=settings.plan_persist_reserve_ms / 1000,
+    )
+    if deadline is not None:
+        await apply_statement_timeout(db, deadline.remaining())
+    plan_id = await run_within(deadline, create_plan(
+        db=db,
+        request_payload=draft["request_payload"],
+        agent_outputs=draft["agent_outputs"],
+        final_decision=draft["final_decision"],
+        status=PlanStatus.created,
+    ))
+    return plan_result(plan_id, draft)
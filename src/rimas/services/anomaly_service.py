@@ -0,0 +1,169 @@
+"""Anomaly detection service - streaming detector state and batch-scan flags.
+
+Detector state lives in process memory; keys are loaded from the
+`anomaly_state` table on first use and changed keys are checkpointed back
+periodically (and on shutdown), so state survives restarts.
+
+Batch-scan results are written to `anomaly_flags` with multi-row inserts.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from rimas.config import settings
+from rimas.db.models import AnomalyFlag, AnomalyState
+from rimas.ml.streaming import MetricState, PointScore, StreamingDetector
+
+logger = logging.getLogger(__name__)
+
+_detector: StreamingDetector | None = None
+_checkpoint_task: asyncio.Task | None = None
+
+
+def get_detector() -> StreamingDetector:
+    global _detector
+    if _detector is None:
+        _detector = StreamingDetector(
+            halflife_points=settings.anomaly_halflife_points,
+            z_threshold=settings.anomaly_z_threshold,
+            warmup=settings.anomaly_warmup_points,
+        )
+    return _detector
+
+
+async def _ensure_loaded(db: AsyncSession, detector: StreamingDetector, keys: set) -> None:
+    missing = [key for key in keys if key not in detector.states]
+    if not missing:
+        return
+    rows = await db.execute(
+        select(AnomalyState.store_id, AnomalyState.metric, AnomalyState.state).where(
+            tuple_(AnomalyState.store_id, AnomalyState.metric).in_(missing)
+        )
+    )
+    for store_id, metric, state in rows:
+        # Another request may have created the key while we waited.
+        detector.states.setdefault((store_id, metric), MetricState.from_dict(state))
+
+
+async def score_stream(db: AsyncSession, store_id: int, points) -> list[PointScore]:
+    """Score a batch of points for one store, restoring checkpointed state first."""
+    detector = get_detector()
+    await _ensure_loaded(db, detector, {(store_id, p.metric) for p in points})
+    return detector.score_points(store_id, points)
+
+
+async def checkpoint(session_maker: async_sessionmaker) -> int:
+    """Persist states changed since the last checkpoint; returns how many."""
+    detector = get_detector()
+    dirty = detector.take_dirty()
+    if not dirty:
+        return 0
+    try:
+        async with session_maker() as session:
+            for (store_id, metric), state in dirty.items():
+                await session.merge(AnomalyState(store_id=store_id, metric=metric, state=state))
+            await session.commit()
+    except Exception:
+        detector.dirty.update(dirty)
+        logger.exception("Anomaly state checkpoint failed", extra={"keys": len(dirty)})
+        raise
+    logger.debug("Anomaly state checkpointed", extra={"keys": len(dirty)})
+    return len(dirty)
+
+
+async def _checkpoint_loop(session_maker: async_sessionmaker, interval_s: float) -> None:
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await checkpoint(session_maker)
+        except Exception:
+            pass  # logged in checkpoint(); retried on the next tick
+
+
+def start_checkpointer(session_maker: async_sessionmaker) -> None:
+    global _checkpoint_task
+    if _checkpoint_task is None and settings.anomaly_checkpoint_interval_s > 0:
+        _checkpoint_task = asyncio.get_running_loop().create_task(
+            _checkpoint_loop(session_maker, settings.anomaly_checkpoint_interval_s),
+            name="anomaly-checkpoint",
+        )
+
+
+async def stop_checkpointer(session_maker: async_sessionmaker) -> None:
+    global _checkpoint_task
+    if _checkpoint_task is not None:
+        _checkpoint_task.cancel()
+        try:
+            await _checkpoint_task
+        except asyncio.CancelledError:
+            pass
+        _checkpoint_task = None
+    if _detector is not None:
+        await checkpoint(session_maker)
+
+
+async def write_flags(
+    session_maker: async_sessionmaker,
+    flags: dict,
+    store_ids: list[int],
+    day_range: tuple[int, int],
+    metric: str = "units_sold",
+    chunk_rows: int = 5000,
+) -> int:
+    """Replace the flags of `store_ids` within `day_range` (epoch days) by `flags`.
+
+    One transaction per store, so a rerun of the same scan is idempotent and
+    a failure leaves each store either fully old or fully new.
+    """
+    import numpy as np
+
+    first, last = (np.datetime64(d, "D").astype(object) for d in day_range)
+    order = np.argsort(flags["store_id"], kind="stable")
+    columns = {name: values[order] for name, values in flags.items()}
+    bounds = np.searchsorted(columns["store_id"], store_ids, side="left")
+    ends = np.searchsorted(columns["store_id"], store_ids, side="right")
+    written = 0
+    for store_id, lo, hi in zip(store_ids, bounds, ends):
+        async with session_maker() as session:
+            await session.execute(
+                delete(AnomalyFlag).where(
+                    AnomalyFlag.store_id == store_id,
+                    AnomalyFlag.metric == metric,
+                    AnomalyFlag.day.between(first, last),
+                )
+            )
+            for start in range(lo, hi, chunk_rows):
+                part = slice(start, min(start + chunk_rows, hi))
+                days = columns["day"][part].astype("datetime64[D]").astype(object)
+                scores = {
+                    name: [None if np.isnan(v) else v for v in columns[name][part].tolist()]
+                    for name in ("zscore", "mad", "seasonal")
+                }
+                rows = [
+                    {
+                        "store_id": store_id,
+                        "item_id": item_id,
+                        "metric": metric,
+                        "day": day,
+                        "value": value,
+                        "zscore": z,
+                        "mad": m,
+                        "seasonal": s,
+                    }
+                    for item_id, day, value, z, m, s in zip(
+                        columns["item_id"][part].tolist(),
+                        days,
+                        columns["value"][part].tolist(),
+                        scores["zscore"],
+                        scores["mad"],
+                        scores["seasonal"],
+                    )
+                ]
+                await session.execute(insert(AnomalyFlag), rows)
+            await session.commit()
+        written += int(hi - lo)
+    logger.info("Anomaly flags written", extra={"stores": len(store_ids), "flags": written})
+    return written
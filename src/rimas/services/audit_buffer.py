@@ -0,0 +1,262 @@
+"""Write-behind buffering of `PlanEvent` audit rows (`settings.audit_write_behind`).
+
+With write-behind on, `plan_service` still writes the plan row in the
+request's transaction, but hands its events to `AuditBuffer.defer` instead
+of inserting them. When that transaction commits, the events are appended to
+a local spill segment (one `write` per commit) and to an in-memory buffer; a
+rollback discards them. A background task inserts the buffer in multi-row
+batches once it holds `audit_flush_rows` events or every
+`audit_flush_interval_s` (grouped by the shard of each event's plan, when
+sharded), then deletes the spill segments it covered.
+
+On startup, segments left by a crash are replayed. Event ids are assigned
+up front, so replay skips events that were already inserted, as well as
+events whose plan no longer exists. When the buffer is full or not running,
+events are inserted inline as before.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from rimas.config import settings
+from rimas.db.models import Plan, PlanEvent
+from rimas.db.shards import get_shards
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "audit_events"
+
+
+def _event_row(ev: PlanEvent) -> dict:
+    return {
+        "id": ev.id or str(uuid4()),
+        "plan_id": ev.plan_id,
+        "event_type": ev.event_type,
+        "payload": ev.payload,
+        "created_at": ev.created_at.isoformat(),
+    }
+
+
+def _db_rows(rows: list[dict]) -> list[dict]:
+    return [{**r, "created_at": datetime.fromisoformat(r["created_at"])} for r in rows]
+
+
+class AuditBuffer:
+    def __init__(
+        self,
+        session_maker: async_sessionmaker,
+        spill_dir: str | Path,
+        flush_rows: int = 1000,
+        flush_interval_s: float = 1.0,
+        max_rows: int = 100_000,
+    ) -> None:
+        self.session_maker = session_maker
+        self.spill_dir = Path(spill_dir)
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.max_rows = max_rows
+        self._rows: list[dict] = []
+        self._segment: Path | None = None
+        self._sealed: list[Path] = []  # segments whose rows are all in _rows or flushed
+        self._lock = threading.Lock()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.counters = {"deferred": 0, "inline": 0, "flushed": 0, "flush_errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # -- request path -------------------------------------------------------
+
+    def defer(self, db: AsyncSession, events: list[PlanEvent]) -> bool:
+        """Queue `events` for after `db` commits; False if they must be written inline."""
+        with self._lock:
+            pending = db.sync_session.info.get(_PENDING_KEY, [])
+            if not self.running or len(self._rows) + len(pending) + len(events) > self.max_rows:
+                self.counters["inline"] += len(events)
+                return False
+        db.sync_session.info.setdefault(_PENDING_KEY, []).extend(_event_row(ev) for ev in events)
+        return True
+
+    def _committed(self, rows: list[dict]) -> None:
+        data = "".join(json.dumps(r, default=str) + "\n" for r in rows).encode()
+        with self._lock:
+            if self._segment is None:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+                self._segment = self.spill_dir / f"segment-{time.time_ns()}.ndjson"
+            fd = os.open(self._segment, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            self._rows.extend(rows)
+            self.counters["deferred"] += len(rows)
+            full = len(self._rows) >= self.flush_rows
+        if full and self._wake is not None:
+            self._wake.set()
+
+    # -- background flush ---------------------------------------------------
+
+    async def flush(self) -> int:
+        """Insert everything buffered so far; returns how many rows."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            if self._segment is not None:
+                self._sealed.append(self._segment)
+                self._segment = None
+            segments, self._sealed = self._sealed, []
+        failed: list[dict] = []
+        error: Exception | None = None
+        for session_maker, part in self._by_shard(rows):
+            try:
+                async with session_maker() as session:
+                    for start in range(0, len(part), self.flush_rows):
+                        await session.execute(insert(PlanEvent), _db_rows(part[start : start + self.flush_rows]))
+                    await session.commit()
+            except Exception as e:
+                failed.extend(part)
+                error = e
+                logger.exception("Audit event flush failed", extra={"rows": len(part)})
+        self.counters["flushed"] += len(rows) - len(failed)
+        if error is not None:
+            # Retry only what failed; the segments also hold the rows that
+            # made it, which a startup replay would skip.
+            with self._lock:
+                self._rows[:0] = failed
+                self._sealed[:0] = segments
+            self.counters["flush_errors"] += 1
+            raise error
+        for segment in segments:
+            segment.unlink(missing_ok=True)
+        return len(rows)
+
+    def _by_shard(self, rows: list[dict]) -> list[tuple[async_sessionmaker, list[dict]]]:
+        """Rows grouped with the session factory of their plan's shard."""
+        shards = get_shards()
+        if shards is None:
+            return [(self.session_maker, rows)] if rows else []
+        groups: dict[int, list[dict]] = {}
+        for row in rows:
+            groups.setdefault(shards.shard_for_plan(row["plan_id"]), []).append(row)
+        return [(shards.session_makers[shard], part) for shard, part in sorted(groups.items())]
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                pass  # logged in flush(); retried on the next tick
+
+    def start(self) -> None:
+        if not self.running:
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop(), name="audit-flush")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            pass  # the spill segments are replayed on the next start
+
+    def stats(self) -> dict:
+        return {"running": self.running, "buffered": len(self._rows), **self.counters}
+
+    # -- startup replay -----------------------------------------------------
+
+    async def replay(self, chunk_rows: int = 1000) -> int:
+        """Insert spilled events missing from the database, then delete the segments."""
+        segments = sorted(p for p in self.spill_dir.glob("segment-*.ndjson") if p != self._segment)
+        replayed = 0
+        for segment in segments:
+            rows = []
+            for line in segment.read_text().splitlines():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    logger.warning("Skipping torn audit spill line", extra={"segment": segment.name})
+            for session_maker, part in self._by_shard(rows):
+                for start in range(0, len(part), chunk_rows):
+                    replayed += await self._insert_missing(session_maker, part[start : start + chunk_rows])
+            segment.unlink()
+        if replayed:
+            logger.info("Replayed spilled audit events", extra={"rows": replayed})
+        return replayed
+
+    async def _insert_missing(self, session_maker: async_sessionmaker, rows: list[dict]) -> int:
+        async with session_maker() as session:
+            ids = [r["id"] for r in rows]
+            existing = set((await session.execute(select(PlanEvent.id).where(PlanEvent.id.in_(ids)))).scalars())
+            plan_ids = {r["plan_id"] for r in rows}
+            plans = set((await session.execute(select(Plan.id).where(Plan.id.in_(plan_ids)))).scalars())
+            missing = [r for r in rows if r["id"] not in existing and r["plan_id"] in plans]
+            if missing:
+                await session.execute(insert(PlanEvent), _db_rows(missing))
+            await session.commit()
+        return len(missing)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    rows = session.info.pop(_PENDING_KEY, None)
+    if rows and _buffer is not None:
+        _buffer._committed(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_buffer: AuditBuffer | None = None
+
+
+def get_audit_buffer() -> AuditBuffer | None:
+    """The process-wide buffer, or None when write-behind is off."""
+    return _buffer if settings.audit_write_behind else None
+
+
+async def start_audit_buffer(session_maker: async_sessionmaker) -> None:
+    """Replay spilled events from an earlier run, then start buffering."""
+    global _buffer
+    if not settings.audit_write_behind or _buffer is not None:
+        return
+    _buffer = AuditBuffer(
+        session_maker,
+        settings.audit_spill_dir,
+        flush_rows=settings.audit_flush_rows,
+        flush_interval_s=settings.audit_flush_interval_s,
+        max_rows=settings.audit_buffer_max_rows,
+    )
+    await _buffer.replay()
+    _buffer.start()
+
+
+async def stop_audit_buffer() -> None:
+    global _buffer
+    if _buffer is not None:
+        await _buffer.stop()
+        _buffer = None
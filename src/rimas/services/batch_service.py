@@ -0,0 +1,150 @@
+"""Batch planning - many stores in one request.
+
+Plans are generated with bounded concurrency (on the event loop, or in a
+process pool when `settings.batch_process_workers > 0`) and persisted in
+chunks, one multi-row transaction per chunk (per shard, when sharded).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from rimas.admission import BULK, get_admission
+from rimas.api.schemas import CreatePlanRequest
+from rimas.config import settings
+from rimas.db.shards import get_shards
+from rimas.logging import log_context
+from rimas.services.orchestration import generate_plan, generate_plan_in_process
+from rimas.services.plan_service import create_plans_bulk, plan_result
+
+logger = logging.getLogger(__name__)
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn: forking a running event loop process (with aiosqlite /
+        # executor threads holding locks) can deadlock the children.
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.batch_process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+async def _generate(req: CreatePlanRequest) -> dict:
+    if settings.batch_process_workers > 0:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_process_pool(),
+            generate_plan_in_process,
+            req.model_dump(mode="json"),
+            settings.orchestrator,
+        )
+    return await generate_plan(req)
+
+
+def _error_result(index: int, req: CreatePlanRequest, error: str) -> dict:
+    return {"index": index, "store_id": req.store_id, "error": error}
+
+
+async def iter_plan_batch(
+    reqs: list[CreatePlanRequest],
+    session_maker: async_sessionmaker,
+    max_concurrency: int | None = None,
+    chunk_size: int | None = None,
+) -> AsyncIterator[list[dict]]:
+    """Generate and persist plans for `reqs`, yielding results per persisted chunk.
+
+    Results carry the request `index` and `store_id`; failures are reported
+    per store via `error` instead of failing the whole batch. Each plan also
+    holds a bulk admission slot, shared fairly across stores with other batches.
+    """
+    admission = get_admission()[BULK]
+    semaphore = asyncio.Semaphore(max_concurrency or settings.batch_max_concurrency)
+    chunk_size = chunk_size or settings.batch_persist_chunk_size
+
+    async def run_one(index: int, req: CreatePlanRequest) -> tuple[int, dict | None, str | None]:
+        async with semaphore:
+            try:
+                with log_context(store_id=req.store_id):
+                    async with admission.slot(req.store_id, bounded=False):
+                        return index, await _generate(req), None
+            except Exception as e:
+                logger.exception("Batch plan failed", extra={"store_id": req.store_id})
+                return index, None, f"{type(e).__name__}: {e}"
+
+    async def persist_group(maker: async_sessionmaker, pending: list[tuple[int, dict]]) -> list[dict]:
+        drafts = [draft for _, draft in pending]
+        try:
+            async with maker() as session:
+                plan_ids = await create_plans_bulk(session, drafts)
+                await session.commit()
+        except Exception as e:
+            logger.exception("Batch persist failed", extra={"count": len(pending)})
+            return [
+                _error_result(i, reqs[i], f"persist failed: {type(e).__name__}")
+                for i, _ in pending
+            ]
+        return [
+            {"index": i, "store_id": reqs[i].store_id, **plan_result(plan_id, draft)}
+            for (i, draft), plan_id in zip(pending, plan_ids)
+        ]
+
+    async def persist(pending: list[tuple[int, dict]]) -> list[dict]:
+        shards = get_shards()
+        if shards is None:
+            return await persist_group(session_maker, pending)
+        # One transaction per shard the chunk's stores live on.
+        groups: dict[int, list[tuple[int, dict]]] = {}
+        for i, draft in pending:
+            groups.setdefault(shards.shard_for_store(reqs[i].store_id), []).append((i, draft))
+        results: list[dict] = []
+        for shard, group in sorted(groups.items()):
+            results.extend(await persist_group(shards.session_makers[shard], group))
+        return results
+
+    tasks = [asyncio.create_task(run_one(i, req)) for i, req in enumerate(reqs)]
+    pending: list[tuple[int, dict]] = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, draft, error = await next_done
+            if error is not None:
+                yield [_error_result(index, reqs[index], error)]
+                continue
+            pending.append((index, draft))
+            if len(pending) >= chunk_size:
+                yield await persist(pending)
+                pending = []
+        if pending:
+            yield await persist(pending)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_plan_batch(
+    reqs: list[CreatePlanRequest],
+    session_maker: async_sessionmaker,
+    max_concurrency: int | None = None,
+    chunk_size: int | None = None,
+) -> list[dict]:
+    """Run a whole batch and return results in request order."""
+    results: list[dict] = []
+    async for chunk in iter_plan_batch(reqs, session_maker, max_concurrency, chunk_size):
+        results.extend(chunk)
+    results.sort(key=lambda r: r["index"])
+    return results
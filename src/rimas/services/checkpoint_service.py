@@ -0,0 +1,187 @@
+"""Durable per-node checkpoints for LangGraph plan runs.
+
+A plan request with an `Idempotency-Key` gets a `CheckpointStore`: every
+graph node that finishes writes its state update to `plan_checkpoints` in
+its own short transaction, so a worker dying mid-plan loses at most the node
+that was running. A retry with the same key replays the saved updates
+instead of re-running those nodes (model and LLM calls included) and runs
+only the rest. Once the plan is persisted, its node rows are replaced by one
+row recording the plan id, in the plan's own transaction, and further
+retries return that plan.
+
+Updates that degraded to a heuristic (`fallback_reason` set) or used stub
+forecasts (`is_mock`) are not saved, so a retry gets a fresh chance at the
+real model / LLM answer. Rows older than `plan_checkpoint_ttl_s` are deleted
+periodically, on every shard.
+"""
+
+import asyncio
+import inspect
+import logging
+import math
+from array import array
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from rimas.config import settings
+from rimas.db.models import PlanCheckpoint
+from rimas.db.shards import every_shard
+
+logger = logging.getLogger(__name__)
+
+PERSISTED_NODE = "__plan__"
+_ARRAY_TAG = "__array__"
+
+_cleanup_task: asyncio.Task | None = None
+
+
+def _encode(value):
+    if isinstance(value, array):
+        # JSON has no NaN (PostgreSQL rejects it): store it as null.
+        values = [None if isinstance(v, float) and math.isnan(v) else v for v in value]
+        return {_ARRAY_TAG: value.typecode, "values": values}
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if _ARRAY_TAG in value:
+            return array(value[_ARRAY_TAG], [math.nan if v is None else v for v in value["values"]])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _degraded(update: dict) -> bool:
+    outputs = update.get("agent_outputs") or {}
+    return any(
+        isinstance(o, dict) and ("fallback_reason" in o or o.get("is_mock"))
+        for o in outputs.values()
+    )
+
+
+class CheckpointStore:
+    """Saved node updates of one idempotency key, loaded once per run."""
+
+    def __init__(self, key: str, session_maker: async_sessionmaker, saved: dict[str, dict] | None = None) -> None:
+        self.key = key
+        self.session_maker = session_maker
+        self.saved = saved or {}
+        self.resumed: list[str] = []
+
+    @classmethod
+    async def load(cls, key: str, session_maker: async_sessionmaker) -> "CheckpointStore":
+        async with session_maker() as session:
+            rows = await session.execute(
+                select(PlanCheckpoint.node, PlanCheckpoint.payload).where(
+                    PlanCheckpoint.key == key, PlanCheckpoint.node != PERSISTED_NODE
+                )
+            )
+            return cls(key, session_maker, {node: payload for node, payload in rows})
+
+    def get(self, node: str) -> dict | None:
+        payload = self.saved.get(node)
+        if payload is None:
+            return None
+        self.resumed.append(node)
+        return _decode(payload)
+
+    async def save(self, node: str, update: dict) -> None:
+        if _degraded(update):
+            return
+        payload = _encode(update)
+        try:
+            async with self.session_maker() as session:
+                await session.merge(PlanCheckpoint(key=self.key, node=node, payload=payload))
+                await session.commit()
+        except Exception:
+            # The plan itself does not depend on the checkpoint.
+            logger.exception("Plan checkpoint write failed", extra={"key": self.key, "node": node})
+            return
+        self.saved[node] = payload
+
+
+def checkpointed(name: str, fn: Callable[[dict], dict]):
+    """Graph node running `fn` unless `state["checkpoints"]` has its update saved."""
+    is_async = inspect.iscoroutinefunction(fn)
+
+    async def node(state: dict) -> dict:
+        store: CheckpointStore | None = state.get("checkpoints")
+        if store is not None:
+            saved = store.get(name)
+            if saved is not None:
+                return saved
+        # Sync nodes block (model calls): keep them off the event loop, as
+        # LangGraph itself does for sync nodes.
+        update = await fn(state) if is_async else await asyncio.to_thread(fn, state)
+        if store is not None:
+            await store.save(name, update)
+        return update
+
+    node.__name__ = f"checkpointed_{getattr(fn, '__name__', name)}"
+    return node
+
+
+async def find_persisted_plan_id(db: AsyncSession, key: str) -> str | None:
+    return await db.scalar(
+        select(PlanCheckpoint.plan_id).where(PlanCheckpoint.key == key, PlanCheckpoint.node == PERSISTED_NODE)
+    )
+
+
+async def mark_persisted(db: AsyncSession, key: str, plan_id: str) -> None:
+    """Replace the key's node rows by the plan id, in the caller's transaction."""
+    await db.execute(delete(PlanCheckpoint).where(PlanCheckpoint.key == key))
+    db.add(PlanCheckpoint(key=key, node=PERSISTED_NODE, plan_id=plan_id))
+    await db.flush()
+
+
+async def purge_expired(session_maker: async_sessionmaker, ttl_s: float | None = None) -> int:
+    """Delete checkpoint rows older than the TTL; returns how many."""
+    ttl_s = settings.plan_checkpoint_ttl_s if ttl_s is None else ttl_s
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_s)
+    async with session_maker() as session:
+        result = await session.execute(delete(PlanCheckpoint).where(PlanCheckpoint.created_at < cutoff))
+        await session.commit()
+    return result.rowcount or 0
+
+
+async def _cleanup_loop(session_maker: async_sessionmaker, interval_s: float) -> None:
+    while True:
+        await asyncio.sleep(interval_s)
+        for shard_maker in every_shard(session_maker):
+            try:
+                purged = await purge_expired(shard_maker)
+                if purged:
+                    logger.info("Expired plan checkpoints deleted", extra={"count": purged})
+            except Exception:
+                logger.exception("Plan checkpoint cleanup failed")
+
+
+def start_checkpoint_cleanup(session_maker: async_sessionmaker) -> None:
+    global _cleanup_task
+    if _cleanup_task is None and settings.plan_checkpoint_cleanup_interval_s > 0:
+        _cleanup_task = asyncio.get_running_loop().create_task(
+            _cleanup_loop(session_maker, settings.plan_checkpoint_cleanup_interval_s),
+            name="plan-checkpoint-cleanup",
+        )
+
+
+async def stop_checkpoint_cleanup() -> None:
+    global _cleanup_task
+    if _cleanup_task is not None:
+        _cleanup_task.cancel()
+        try:
+            await _cleanup_task
+        except asyncio.CancelledError:
+            pass
+        _cleanup_task = None
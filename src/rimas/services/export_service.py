@@ -0,0 +1,286 @@
+"""Plan export service - streams plans and recommendations.
+
+Rows are read through a server-side cursor (`AsyncSession.stream` with
+`yield_per`) and encoded chunk by chunk, so memory stays flat regardless of
+how many plans match the filters. With several shards, each shard is read
+the same way and the streams are merged by creation time.
+"""
+
+import csv
+import heapq
+import io
+import json
+import logging
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import AsyncExitStack
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from rimas.db.models import Plan
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# One row per recommendation; plans without recommendations export a single
+# row with empty recommendation fields so they are not lost downstream.
+EXPORT_COLUMNS = (
+    "plan_id",
+    "store_id",
+    "status",
+    "created_at",
+    "trace_id",
+    "model_version",
+    "item_id",
+    "recommended_order_qty",
+    "recommended_discount",
+    "confidence",
+    "rationale",
+)
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+    parquet = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+
+def check_format_available(fmt: ExportFormat) -> None:
+    """Raise ValueError if the optional dependency for `fmt` is missing."""
+    if fmt == ExportFormat.parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ValueError("parquet export requires the 'pyarrow' package") from e
+
+
+def _flatten_plan(row) -> Iterator[dict]:
+    """Yield one export record per recommendation of a plan row."""
+    fd = row.final_decision or {}
+    meta = fd.get("metadata") or {}
+    base = {
+        "plan_id": row.id,
+        "store_id": row.store_id,
+        "status": row.status,
+        "created_at": row.created_at,
+        "trace_id": meta.get("trace_id"),
+        "model_version": meta.get("model_version"),
+    }
+    recs = fd.get("recommendations") or []
+    if not recs:
+        yield {**base, **{c: None for c in EXPORT_COLUMNS[6:]}}
+        return
+    for rec in recs:
+        yield {**base, **{c: rec.get(c) for c in EXPORT_COLUMNS[6:]}}
+
+
+async def iter_export_records(
+    db: AsyncSession,
+    store_id: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[dict]:
+    """Stream flattened plan/recommendation records ordered by creation time.
+
+    Only the columns needed for the export are selected (no ORM identity map),
+    and `request_payload` / `agent_outputs` are never loaded.
+    """
+    stmt = select(
+        Plan.id, Plan.store_id, Plan.status, Plan.created_at, Plan.final_decision
+    )
+    if store_id is not None:
+        stmt = stmt.where(Plan.store_id == store_id)
+    if start is not None:
+        stmt = stmt.where(Plan.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Plan.created_at < end)
+    stmt = stmt.order_by(Plan.created_at, Plan.id).execution_options(
+        yield_per=chunk_size
+    )
+
+    result = await db.stream(stmt)
+    async for row in result:
+        for record in _flatten_plan(row):
+            yield record
+
+
+async def _batched(records: AsyncIterator[dict], size: int) -> AsyncIterator[list[dict]]:
+    batch: list[dict] = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _encode_ndjson(batch: list[dict]) -> bytes:
+    return "".join(
+        json.dumps(r, default=_json_default, separators=(",", ":")) + "\n"
+        for r in batch
+    ).encode("utf-8")
+
+
+def _encode_csv(batch: list[dict], header: bool) -> bytes:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    for r in batch:
+        created_at = r["created_at"]
+        writer.writerow(
+            {**r, "created_at": created_at.isoformat() if created_at else None}
+        )
+    return buf.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back in chunks."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("plan_id", pa.string()),
+        ("store_id", pa.int64()),
+        ("status", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("trace_id", pa.string()),
+        ("model_version", pa.string()),
+        ("item_id", pa.int64()),
+        ("recommended_order_qty", pa.int64()),
+        ("recommended_discount", pa.float64()),
+        ("confidence", pa.float64()),
+        ("rationale", pa.string()),
+    ])
+
+
+async def _encode_parquet(batches: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    """Write one Parquet row group per batch and yield bytes as they are produced."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+async def encode_records(
+    records: AsyncIterator[dict],
+    fmt: ExportFormat,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Encode a record stream into `fmt`, yielding one bytes chunk per batch."""
+    batches = _batched(records, chunk_size)
+    if fmt == ExportFormat.parquet:
+        async for chunk in _encode_parquet(batches):
+            yield chunk
+        return
+
+    header = True
+    async for batch in batches:
+        if fmt == ExportFormat.csv:
+            yield _encode_csv(batch, header=header)
+            header = False
+        else:
+            yield _encode_ndjson(batch)
+    if fmt == ExportFormat.csv and header:
+        yield _encode_csv([], header=True)
+
+
+async def _merge_by_created_at(streams: list[AsyncIterator[dict]]) -> AsyncIterator[dict]:
+    """Merge record streams that are each ordered by (created_at, plan_id)."""
+    heap = []
+
+    async def push(index: int) -> None:
+        record = await anext(streams[index], None)
+        if record is not None:
+            # One entry per stream at a time, so keys never tie.
+            heapq.heappush(heap, ((record["created_at"], record["plan_id"], index), record))
+
+    for index in range(len(streams)):
+        await push(index)
+    while heap:
+        (_, _, index), record = heapq.heappop(heap)
+        yield record
+        await push(index)
+
+
+async def stream_export(
+    session_makers: Sequence[async_sessionmaker],
+    fmt: ExportFormat,
+    store_id: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Open a dedicated session per shard and stream the encoded export.
+
+    The sessions are owned by the generator (not by the request) because the
+    body is produced after the endpoint has returned.
+    """
+    async with AsyncExitStack() as stack:
+        streams = [
+            iter_export_records(
+                await stack.enter_async_context(session_maker()),
+                store_id=store_id,
+                start=start,
+                end=end,
+                chunk_size=chunk_size,
+            )
+            for session_maker in session_makers
+        ]
+        records = streams[0] if len(streams) == 1 else _merge_by_created_at(streams)
+        async for chunk in encode_records(records, fmt, chunk_size=chunk_size):
+            yield chunk
@@ -0,0 +1,137 @@
+"""Streaming NDJSON ingestion of plan requests.
+
+Format (`application/x-ndjson`), one JSON value per line:
+
+    {"store_id": 1, "horizon_days": 14, "constraints": {...}}   <- header, first line
+    {"item_id": 1001, "current_stock": 120}                     <- one item
+    [1002, 30]                                                   <- one item, compact
+    {"item_id": [1003, 1004], "current_stock": [5, 0]}          <- columnar chunk
+
+The body is parsed line by line as it arrives and items are appended straight
+into `PlanItems` columns, so no per-item Pydantic object is ever created.
+Columnar chunks of plain integers are decoded straight into the columns
+without building intermediate Python lists. Lines are capped at
+`MAX_LINE_BYTES`; split larger columns across several chunk lines.
+"""
+
+import json
+import re
+from array import array
+from collections.abc import AsyncIterator
+
+from pydantic import ValidationError
+
+from rimas.agents.items import PlanItems
+from rimas.api.schemas import ColumnarPlanRequest
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson")
+
+MAX_LINE_BYTES = 8 * 1024 * 1024
+
+_KEY = rb'"(item_id|current_stock)"'
+_COLUMN = _KEY + rb"\s*:\s*\[([^\]]*)\]"
+_COLUMNAR = re.compile(rb"\s*\{\s*" + _COLUMN + rb"\s*,\s*" + _COLUMN + rb"\s*\}\s*")
+_INT_LIST = re.compile(rb"\s*(?:-?\d+\s*(?:,\s*-?\d+\s*)*)?")
+_INT = re.compile(rb"-?\d+")
+
+
+class PlanIngestError(ValueError):
+    """Raised when an NDJSON plan body is malformed."""
+
+
+def _add_items(items: PlanItems, obj, line_no: int) -> None:
+    try:
+        if isinstance(obj, list) and len(obj) == 2:
+            items.append(obj[0], obj[1])
+            return
+        if isinstance(obj, dict) and obj.keys() == {"item_id", "current_stock"}:
+            ids, stocks = obj["item_id"], obj["current_stock"]
+            if isinstance(ids, list) and isinstance(stocks, list):
+                items.extend(ids, stocks)
+            else:
+                items.append(ids, stocks)
+            return
+    except (TypeError, ValueError, OverflowError) as e:
+        raise PlanIngestError(f"line {line_no}: invalid item values ({e})") from e
+    raise PlanIngestError(
+        f"line {line_no}: expected an item object, [item_id, current_stock] "
+        "pair or columnar chunk"
+    )
+
+
+def _int_column(body: bytes) -> array:
+    return array("q", (int(m[0]) for m in _INT.finditer(body)))
+
+
+def _add_columnar(items: PlanItems, line: bytes, line_no: int) -> bool:
+    """Decode an all-integer columnar chunk in place; False if `line` is not one."""
+    m = _COLUMNAR.fullmatch(line)
+    if m is None or m[1] == m[3]:
+        return False
+    if not (_INT_LIST.fullmatch(m[2]) and _INT_LIST.fullmatch(m[4])):
+        return False
+    columns = {m[1]: m[2], m[3]: m[4]}
+    try:
+        items.extend(_int_column(columns[b"item_id"]), _int_column(columns[b"current_stock"]))
+    except (ValueError, OverflowError) as e:
+        raise PlanIngestError(f"line {line_no}: invalid item values ({e})") from e
+    return True
+
+
+async def parse_plan_ndjson(chunks: AsyncIterator[bytes]) -> ColumnarPlanRequest:
+    """Incrementally parse an NDJSON plan body into a `ColumnarPlanRequest`."""
+    header: dict | None = None
+    items = PlanItems()
+    line_no = 0
+    # Pieces of the current, incomplete line; joined only once it completes.
+    pending: list[bytes] = []
+    pending_len = 0
+
+    def handle(line: bytes) -> None:
+        nonlocal header
+        if len(line) > MAX_LINE_BYTES:
+            raise PlanIngestError(f"line {line_no}: longer than {MAX_LINE_BYTES} bytes")
+        if not line.strip():
+            return
+        if header is not None and _add_columnar(items, line, line_no):
+            return
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            raise PlanIngestError(f"line {line_no}: invalid JSON ({e})") from e
+        if header is None:
+            if not isinstance(obj, dict) or "store_id" not in obj:
+                raise PlanIngestError("line 1: header with store_id expected")
+            header = obj
+        else:
+            _add_items(items, obj, line_no)
+
+    async for chunk in chunks:
+        start = 0
+        # Only the new chunk is scanned for newlines.
+        while (end := chunk.find(b"\n", start)) != -1:
+            line = chunk[start:end]
+            if pending:
+                pending.append(line)
+                line = b"".join(pending)
+                pending, pending_len = [], 0
+            line_no += 1
+            handle(line)
+            start = end + 1
+        if start < len(chunk):
+            pending.append(chunk[start:])
+            pending_len += len(chunk) - start
+            if pending_len > MAX_LINE_BYTES:
+                raise PlanIngestError(f"line {line_no + 1}: longer than {MAX_LINE_BYTES} bytes")
+    if pending:
+        line_no += 1
+        handle(b"".join(pending))
+
+    if header is None:
+        raise PlanIngestError("empty body")
+    if not len(items):
+        raise PlanIngestError("at least one item is required")
+    try:
+        return ColumnarPlanRequest.model_validate({**header, "items": items})
+    except ValidationError as e:
+        raise PlanIngestError(f"invalid header: {e.errors(include_url=False)}") from e
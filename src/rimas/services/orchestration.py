@@ -1,24 +1,85 @@
 """Orchestration - run plan workflow (stub or LangGraph)."""
 
+import asyncio
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from rimas.api.schemas import CreatePlanRequest
+from rimas.api.schemas import CreatePlanRequest, PlanRequest
 from rimas.config import settings
+from rimas.deadline import Deadline, run_within
+from rimas.services.checkpoint_service import find_persisted_plan_id, mark_persisted
+from rimas.services.plan_service import get_plan
 
 logger = logging.getLogger(__name__)
 
 
 async def run_plan_workflow(
-    req: CreatePlanRequest,
+    req: PlanRequest,
     db: AsyncSession,
+    deadline: Deadline | None = None,
+    idempotency_key: str | None = None,
 ) -> dict:
+    """Generate and persist one plan; raises `DeadlineExceeded` past `deadline`.
+
+    With an `idempotency_key`, a plan already persisted for the key is
+    returned instead of creating another, and the LangGraph orchestrator
+    resumes from the nodes an interrupted run finished.
+    """
+    if idempotency_key is not None:
+        existing = await _persisted_result(db, idempotency_key)
+        if existing is not None:
+            return existing
+
     if settings.orchestrator == "langgraph":
         from rimas.services.orchestration_langgraph import run_plan_workflow_langgraph
 
-        return await run_plan_workflow_langgraph(req=req, db=db)
+        result = await run_plan_workflow_langgraph(
+            req=req, db=db, deadline=deadline, idempotency_key=idempotency_key
+        )
+    else:
+        from rimas.services._orchestration_stub import run_plan_workflow_stub
+
+        result = await run_plan_workflow_stub(req=req, db=db, deadline=deadline)
+
+    if idempotency_key is not None:
+        await run_within(deadline, mark_persisted(db, idempotency_key, result["plan_id"]))
+    return result
+
+
+async def _persisted_result(db: AsyncSession, key: str) -> dict | None:
+    plan_id = await find_persisted_plan_id(db, key)
+    plan = await get_plan(db, plan_id) if plan_id is not None else None
+    if plan is None:
+        return None
+    decision = plan.final_decision or {}
+    return {
+        "plan_id": plan.id,
+        "status": plan.status,
+        "recommendations": decision.get("recommendations", []),
+        "metadata": decision.get("metadata", {}),
+    }
+
+
+async def generate_plan(req: PlanRequest, orchestrator: str | None = None) -> dict:
+    """Generate an unpersisted plan draft with the configured orchestrator."""
+    if (orchestrator or settings.orchestrator) == "langgraph":
+        from rimas.services.orchestration_langgraph import generate_plan_langgraph
+
+        return await generate_plan_langgraph(req)
+
+    from rimas.services._orchestration_stub import generate_plan_stub
+
+    # The legacy graph is synchronous; keep it off the event loop.
+    return await asyncio.to_thread(generate_plan_stub, req)
+
 
-    from rimas.services._orchestration_stub import run_plan_workflow_stub
+def generate_plan_in_process(payload: dict, orchestrator: str) -> dict:
+    """Process-pool entry point: validate `payload` and generate its draft.
 
-    return await run_plan_workflow_stub(req=req, db=db)
+    Only plain JSON-compatible data crosses the process boundary.
+    """
+    req = CreatePlanRequest.model_validate(payload)
+    draft = asyncio.run(generate_plan(req, orchestrator=orchestrator))
+    draft["metadata"] = draft["metadata"].model_dump(mode="json")
+    return draft
@@ -14,24 +14,40 @@ Design notes:
 - State fields (channels) must NOT share names with graph node identifiers.
   PlanState often contains keys like "data_analysis", etc., so node names are
   prefixed with "node_" to avoid collisions.
+- langgraph is imported lazily and the graph is compiled once per process,
+  keeping it off the API import path and off the per-request path.
+- Every node is wrapped by `checkpoint_service.checkpointed`, so runs with an
+  idempotency key save each finished node and resume after an interruption.
+  This uses our own table rather than a LangGraph checkpointer, whose API
+  differs across the LangGraph versions this module supports.
 """
 
 import logging
 from datetime import datetime
+from functools import lru_cache
 from uuid import uuid4
 
-from langgraph.graph import StateGraph, END
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from rimas.agents.items import PlanItems
 from rimas.agents.state import PlanState
 from rimas.agents.nodes import (
+    data_analysis_llm_node,
     data_analysis_node,
+    demand_forecast_node,
+    inventory_analysis_llm_node,
     inventory_analysis_node,
+    marketing_analysis_llm_node,
     marketing_analysis_node,
     supervisor_node,
 )
-from rimas.api.schemas import CreatePlanRequest, PlanMetadata, PlanStatus
-from rimas.services.plan_service import create_plan
+from rimas.api.schemas import PlanMetadata, PlanRequest, PlanStatus
+from rimas.config import settings
+from rimas.deadline import Deadline, run_within
+from rimas.logging import log_context
+from rimas.ml.model_manager import model_version
+from rimas.services.checkpoint_service import CheckpointStore, checkpointed
+from rimas.services.plan_service import apply_statement_timeout, create_plan, plan_result
 
 logger = logging.getLogger(__name__)
 
@@ -40,30 +56,45 @@ logger = logging.getLogger(__name__)
 # Graph Builder
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=1)
 def _build_graph():
     """
     Build and compile a LangGraph StateGraph for the plan workflow.
 
+    The compiled graph is stateless between invocations, so it is cached.
+    With an LLM configured (`settings.has_llm`) the analysis nodes are the
+    LLM variants, which fall back to the heuristics on timeouts or errors.
+
     IMPORTANT:
     Node names must not collide with PlanState channels.
     So we name nodes with a `node_` prefix.
     """
+    from langgraph.graph import StateGraph, END
+
     graph = StateGraph(PlanState)
 
     # Node identifiers (avoid collision with PlanState keys)
     node_data = "node_data_analysis"
+    node_fc = "node_demand_forecast"
     node_inv = "node_inventory_analysis"
     node_mkt = "node_marketing_analysis"
     node_sup = "node_supervisor"
 
+    if settings.has_llm:
+        data, inv, mkt = data_analysis_llm_node, inventory_analysis_llm_node, marketing_analysis_llm_node
+    else:
+        data, inv, mkt = data_analysis_node, inventory_analysis_node, marketing_analysis_node
+
     # Register nodes
-    graph.add_node(node_data, data_analysis_node)
-    graph.add_node(node_inv, inventory_analysis_node)
-    graph.add_node(node_mkt, marketing_analysis_node)
-    graph.add_node(node_sup, supervisor_node)
+    graph.add_node(node_data, checkpointed(node_data, data))
+    graph.add_node(node_fc, checkpointed(node_fc, demand_forecast_node))
+    graph.add_node(node_inv, checkpointed(node_inv, inv))
+    graph.add_node(node_mkt, checkpointed(node_mkt, mkt))
+    graph.add_node(node_sup, checkpointed(node_sup, supervisor_node))
 
     # Wire edges
-    graph.add_edge(node_data, node_inv)
+    graph.add_edge(node_data, node_fc)
+    graph.add_edge(node_fc, node_inv)
     graph.add_edge(node_inv, node_mkt)
     graph.add_edge(node_mkt, node_sup)
     graph.add_edge(node_sup, END)
@@ -88,32 +119,57 @@ def _build_graph():
 # Public Orchestration Entry Point
 # ---------------------------------------------------------------------------
 
-async def run_plan_workflow_langgraph(
-    req: CreatePlanRequest,
-    db: AsyncSession,
+async def generate_plan_langgraph(
+    req: PlanRequest,
+    deadline: Deadline | None = None,
+    checkpoints: CheckpointStore | None = None,
 ) -> dict:
     """
-    Execute the plan workflow using LangGraph.
+    Execute the plan workflow using LangGraph, without persisting it.
 
     Steps:
     1) Build initial workflow state
-    2) Execute graph asynchronously
+    2) Execute graph asynchronously (items shared by reference across nodes)
     3) Extract agent outputs and recommendations
-    4) Persist plan + audit-ready fields in DB
-    5) Return REST-friendly response
+    4) Return an unpersisted plan draft (see `plan_service.plan_result`)
+
+    With a `deadline`, expensive nodes degrade to heuristics as it nears,
+    and the graph run is cancelled (`DeadlineExceeded`) if it still overruns
+    the time left before the persist reserve. With `checkpoints`, nodes saved
+    by an earlier run of the same key are replayed, and the key is the trace_id.
     """
-    trace_id = str(uuid4())
+    trace_id = checkpoints.key if checkpoints is not None else str(uuid4())
     now = datetime.utcnow()
+    version = model_version("demand_model")
+
+    # Dump once: the payload is persisted as-is, nodes get the header plus a
+    # compact PlanItems shared by reference (never per-item dicts).
+    request_payload = req.model_dump(mode="json")
+    items = (
+        req.items
+        if isinstance(req.items, PlanItems)
+        else PlanItems.from_inputs(request_payload["items"])
+    )
+    header = {k: v for k, v in request_payload.items() if k != "items"}
 
     initial: PlanState = {
-        "request": req.model_dump(mode="json"),
+        "request": header,
+        "items": items,
         "trace_id": trace_id,
         "generated_at": now,
+        "deadline": deadline,
+        "checkpoints": checkpoints,
         "agent_outputs": {},
     }
 
     graph = _build_graph()
-    result = await graph.ainvoke(initial)
+    with log_context(trace_id=trace_id):
+        result = await run_within(
+            deadline, graph.ainvoke(initial), reserve_s=settings.plan_persist_reserve_ms / 1000
+        )
+
+    if checkpoints is not None and checkpoints.resumed:
+        logger.info("Plan resumed from checkpoints", extra={"trace_id": trace_id, "nodes": checkpoints.resumed})
 
     agent_outputs = result.get("agent_outputs") or {}
     final_decision_raw = result.get("final_decision") or {}
@@ -129,27 +185,48 @@ async def run_plan_workflow_langgraph(
     final_decision = {
         "recommendations": recommendations,
         "metadata": {
-            "model_version": None,
+            "model_version": version,
             "generated_at": now.isoformat(),
             "trace_id": trace_id,
         },
     }
 
-    plan_id = await create_plan(
-        db=db,
-        request_payload=req.model_dump(mode="json"),
-        agent_outputs=agent_outputs,
-        final_decision=final_decision,
-        status=PlanStatus.created,
-    )
-
     return {
-        "plan_id": plan_id,
-        "status": PlanStatus.created,
+        "request_payload": request_payload,
+        "agent_outputs": agent_outputs,
+        "final_decision": final_decision,
         "recommendations": recommendations,
         "metadata": PlanMetadata(
-            model_version=None,
+            model_version=version,
             generated_at=now,
             trace_id=trace_id,
         ),
     }
+
+
+async def run_plan_workflow_langgraph(
+    req: PlanRequest,
+    db: AsyncSession,
+    deadline: Deadline | None = None,
+    idempotency_key: str | None = None,
+) -> dict:
+    """Generate a plan with LangGraph, persist it and return a REST-friendly result.
+
+    With an `idempotency_key`, finished nodes are checkpointed (in their own
+    transactions, on the request session's engine) and reused by retries.
+    """
+    checkpoints = None
+    if idempotency_key is not None:
+        maker = async_sessionmaker(db.bind, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+        checkpoints = await run_within(deadline, CheckpointStore.load(idempotency_key, maker))
+    draft = await generate_plan_langgraph(req, deadline, checkpoints)
+    if deadline is not None:
+        await apply_statement_timeout(db, deadline.remaining())
+    plan_id = await run_within(deadline, create_plan(
+        db=db,
+        request_payload=draft["request_payload"],
+        agent_outputs=draft["agent_outputs"],
+        final_decision=draft["final_decision"],
+        status=PlanStatus.created,
+    ))
+    return plan_result(plan_id, draft)
@@ -0,0 +1,90 @@
+"""Per-process cache of serialized plan responses for `GET /plans/{plan_id}`.
+
+Entries hold the response body and an ETag derived from the plan's
+`updated_at`. Within `plan_cache_ttl_s` an entry is served without touching
+the database; after that it is revalidated with a one-column `updated_at`
+lookup, so a change made by another worker is picked up within the TTL.
+Approve/reject in this process invalidate the entry immediately.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from rimas.config import settings
+
+
+def plan_etag(updated_at: datetime) -> str:
+    return f'"{int(updated_at.timestamp() * 1_000_000):x}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """True if an `If-None-Match` header value matches `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+@dataclass
+class CachedPlan:
+    etag: str
+    body: bytes
+    checked_at: float  # time.monotonic() of the last DB (re)validation
+
+
+class PlanResponseCache:
+    def __init__(self, max_entries: int = 10_000, ttl_s: float = 2.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[str, CachedPlan] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "revalidated": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, plan_id: str) -> tuple[CachedPlan | None, bool]:
+        """(entry or None, whether it is still fresh without revalidation)."""
+        with self._lock:
+            entry = self._entries.get(plan_id)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None, False
+            self._entries.move_to_end(plan_id)
+            fresh = time.monotonic() - entry.checked_at < self.ttl_s
+            self.counters["hits" if fresh else "revalidated"] += 1
+            return entry, fresh
+
+    def put(self, plan_id: str, etag: str, body: bytes) -> CachedPlan:
+        entry = CachedPlan(etag, body, time.monotonic())
+        with self._lock:
+            self._entries[plan_id] = entry
+            self._entries.move_to_end(plan_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def touch(self, entry: CachedPlan) -> None:
+        entry.checked_at = time.monotonic()
+
+    def invalidate(self, plan_id: str) -> None:
+        with self._lock:
+            if self._entries.pop(plan_id, None) is not None:
+                self.counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, **self.counters}
+
+
+_cache: PlanResponseCache | None = None
+
+
+def get_plan_cache() -> PlanResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = PlanResponseCache(settings.plan_cache_max_entries, settings.plan_cache_ttl_s)
+    return _cache
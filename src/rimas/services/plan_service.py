@@ -1,13 +1,16 @@
 """Plan persistence service."""
 
 from datetime import datetime
-from uuid import uuid4
 
-from sqlalchemy import select
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 
 from rimas.api.schemas import PlanStatus
 from rimas.db.models import Plan, PlanEvent
+from rimas.db.shards import new_plan_id
+from rimas.services.audit_buffer import get_audit_buffer
+from rimas.services.plan_stats_service import record_created, record_decision
 
 
 def _to_serializable(obj: dict) -> dict:
@@ -28,20 +31,27 @@ def _to_serializable(obj: dict) -> dict:
     return result
 
 
-async def create_plan(
-    db: AsyncSession,
+def _build_plan_rows(
     request_payload: dict,
     agent_outputs: dict,
     final_decision: dict,
-    status: str = PlanStatus.created,
-) -> str:
-    now = datetime.utcnow()
-    payload = _to_serializable(request_payload)
+    status: str,
+    now: datetime,
+    shard: int | None = None,
+) -> tuple[Plan, list[PlanEvent]]:
+    """Build a Plan row and its audit events (one per agent output + final).
+
+    `request_payload` must already be JSON-ready (`model_dump(mode="json")`)
+    and is stored as-is, so large item lists are not walked again. `shard`
+    is encoded in the plan id when sharding is on.
+    """
+    payload = request_payload
     outputs = _to_serializable(agent_outputs)
     decision = _to_serializable(final_decision)
 
     plan = Plan(
-        id=str(uuid4()),
+        id=new_plan_id(shard),
+        store_id=payload.get("store_id"),
         request_payload=payload,
         agent_outputs=outputs,
         final_decision=decision,
@@ -49,37 +59,124 @@ async def create_plan(
         created_at=now,
         updated_at=now,
     )
-    db.add(plan)
-    await db.flush()
-
-    for event_type, payload_val in outputs.items():
-        ev = PlanEvent(
+    events = [
+        PlanEvent(
             plan_id=plan.id,
             event_type=event_type,
             payload=payload_val if isinstance(payload_val, dict) else {"value": payload_val},
             created_at=now,
         )
-        db.add(ev)
-    ev = PlanEvent(
-        plan_id=plan.id,
-        event_type="final_decision",
-        payload=decision,
-        created_at=now,
+        for event_type, payload_val in outputs.items()
+    ]
+    events.append(
+        PlanEvent(
+            plan_id=plan.id,
+            event_type="final_decision",
+            payload=decision,
+            created_at=now,
+        )
+    )
+    return plan, events
+
+
+async def _add_events(db: AsyncSession, events: list[PlanEvent]) -> None:
+    """Insert audit events with the transaction, or defer them to the write-behind buffer."""
+    buffer = get_audit_buffer()
+    if buffer is not None and buffer.defer(db, events):
+        return
+    db.add_all(events)
+    await db.flush()
+
+
+async def apply_statement_timeout(db: AsyncSession, timeout_s: float) -> None:
+    """Bound each statement of the current transaction (PostgreSQL only).
+
+    On other databases the caller's asyncio timeout is the only bound.
+    """
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text(f"SET LOCAL statement_timeout = {max(1, int(timeout_s * 1000))}"))
+
+
+async def create_plan(
+    db: AsyncSession,
+    request_payload: dict,
+    agent_outputs: dict,
+    final_decision: dict,
+    status: str = PlanStatus.created,
+) -> str:
+    plan, events = _build_plan_rows(
+        request_payload, agent_outputs, final_decision, status, datetime.utcnow(), db.info.get("shard")
     )
-    db.add(ev)
+    db.add(plan)
     await db.flush()
+    await _add_events(db, events)
+    await record_created(db, [plan])
     return plan.id
 
 
+async def create_plans_bulk(
+    db: AsyncSession,
+    drafts: list[dict],
+    status: str = PlanStatus.created,
+) -> list[str]:
+    """Persist many plan drafts and their events with two multi-row flushes."""
+    now = datetime.utcnow()
+    plans: list[Plan] = []
+    events: list[PlanEvent] = []
+    for draft in drafts:
+        plan, plan_events = _build_plan_rows(
+            draft["request_payload"],
+            draft["agent_outputs"],
+            draft["final_decision"],
+            status,
+            now,
+            db.info.get("shard"),
+        )
+        plans.append(plan)
+        events.extend(plan_events)
+    db.add_all(plans)
+    await db.flush()
+    await _add_events(db, events)
+    await record_created(db, plans)
+    return [p.id for p in plans]
+
+
+def plan_result(plan_id: str, draft: dict, status: str = PlanStatus.created) -> dict:
+    """REST-friendly result for a persisted plan draft."""
+    return {
+        "plan_id": plan_id,
+        "status": status,
+        "recommendations": draft["recommendations"],
+        "metadata": draft["metadata"],
+    }
+
+
 async def get_plan(db: AsyncSession, plan_id: str) -> Plan | None:
-    result = await db.execute(select(Plan).where(Plan.id == plan_id))
+    """Plan row without its large `request_payload` / `agent_outputs` columns.
+
+    Those are only read by the export; touching them here raises instead of
+    lazily loading them.
+    """
+    result = await db.execute(
+        select(Plan)
+        .options(
+            defer(Plan.request_payload, raiseload=True),
+            defer(Plan.agent_outputs, raiseload=True),
+        )
+        .where(Plan.id == plan_id)
+    )
     return result.scalar_one_or_none()
 
 
+async def get_plan_updated_at(db: AsyncSession, plan_id: str) -> datetime | None:
+    return await db.scalar(select(Plan.updated_at).where(Plan.id == plan_id))
+
+
 async def approve_plan(db: AsyncSession, plan_id: str) -> Plan | None:
     plan = await get_plan(db, plan_id)
     if plan is None:
         return None
+    changed = plan.status != PlanStatus.approved
     plan.status = PlanStatus.approved
     plan.updated_at = datetime.utcnow()
     await db.flush()
@@ -89,8 +186,9 @@ async def approve_plan(db: AsyncSession, plan_id: str) -> Plan | None:
         payload={"status": PlanStatus.approved},
         created_at=datetime.utcnow(),
     )
-    db.add(ev)
-    await db.flush()
+    await _add_events(db, [ev])
+    if changed:
+        await record_decision(db, plan, "approved", plan.updated_at)
     return plan
 
 
@@ -98,6 +196,7 @@ async def reject_plan(db: AsyncSession, plan_id: str) -> Plan | None:
     plan = await get_plan(db, plan_id)
     if plan is None:
         return None
+    changed = plan.status != PlanStatus.rejected
     plan.status = PlanStatus.rejected
     plan.updated_at = datetime.utcnow()
     await db.flush()
@@ -107,6 +206,7 @@ async def reject_plan(db: AsyncSession, plan_id: str) -> Plan | None:
         payload={"status": PlanStatus.rejected},
         created_at=datetime.utcnow(),
     )
-    db.add(ev)
-    await db.flush()
+    await _add_events(db, [ev])
+    if changed:
+        await record_decision(db, plan, "rejected", plan.updated_at)
     return plan
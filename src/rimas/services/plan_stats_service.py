@@ -0,0 +1,126 @@
+"""Plan statistics rolled up per store and day (`plan_daily_stats`).
+
+`plan_service` adds each plan it creates, approves or rejects to the
+store's row for the day, in the same transaction, with one
+`INSERT ... ON CONFLICT DO UPDATE` per statement. `GET /plans/stats` then
+reads at most one row per store and day of the requested range, however
+many plans and events there are; with sharding, a query over all stores
+adds up every shard's rows. Databases upgraded from an older schema
+get the rollup rebuilt from `plans` once (`rimas.db.migrations`).
+"""
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from rimas.db.models import Plan, PlanDailyStats
+
+COUNTERS = (
+    "created",
+    "approved",
+    "rejected",
+    "recommendations",
+    "order_qty_sum",
+    "decision_latency_s_sum",
+)
+
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def order_totals(final_decision: dict | None) -> tuple[int, float]:
+    """(recommendation count, summed order quantity) of a plan's final decision."""
+    recs = (final_decision or {}).get("recommendations") or []
+    return len(recs), float(sum(r.get("recommended_order_qty") or 0 for r in recs))
+
+
+async def _increment(db: AsyncSession, deltas: dict[tuple[int, date], dict[str, float]]) -> None:
+    """Add `deltas` to the (store_id, day) rows, creating missing rows."""
+    if not deltas:
+        return
+    insert = _DIALECT_INSERTS[db.bind.dialect.name]
+    stmt = insert(PlanDailyStats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PlanDailyStats.store_id, PlanDailyStats.day],
+        set_={c: getattr(PlanDailyStats, c) + stmt.excluded[c] for c in COUNTERS},
+    )
+    # Sorted keys: concurrent transactions lock rows in the same order.
+    rows = [
+        {"store_id": store_id, "day": day, **{c: delta.get(c, 0) for c in COUNTERS}}
+        for (store_id, day), delta in sorted(deltas.items())
+    ]
+    await db.execute(stmt, rows)
+
+
+async def record_created(db: AsyncSession, plans: list[Plan]) -> None:
+    deltas: dict[tuple[int, date], dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for plan in plans:
+        if plan.store_id is None:
+            continue
+        recs, qty = order_totals(plan.final_decision)
+        delta = deltas[(plan.store_id, plan.created_at.date())]
+        delta["created"] += 1
+        delta["recommendations"] += recs
+        delta["order_qty_sum"] += qty
+    await _increment(db, deltas)
+
+
+async def record_decision(db: AsyncSession, plan: Plan, status: str, at: datetime) -> None:
+    """Count an approval / rejection made at `at`, with its latency since creation."""
+    if plan.store_id is None:
+        return
+    latency_s = max(0.0, (at - plan.created_at).total_seconds())
+    await _increment(db, {(plan.store_id, at.date()): {status: 1, "decision_latency_s_sum": latency_s}})
+
+
+def _day_stats(sums: Mapping[str, float]) -> dict:
+    decided = sums["approved"] + sums["rejected"]
+    return {
+        "created": int(sums["created"]),
+        "approved": int(sums["approved"]),
+        "rejected": int(sums["rejected"]),
+        "avg_order_qty": sums["order_qty_sum"] / sums["recommendations"] if sums["recommendations"] else None,
+        "avg_decision_latency_s": sums["decision_latency_s_sum"] / decided if decided else None,
+    }
+
+
+async def daily_sums(db: AsyncSession, start: date, end: date, store_id: int | None = None) -> dict[date, dict]:
+    """Counter sums per day for `start`..`end` (inclusive)."""
+    sums = [func.sum(getattr(PlanDailyStats, c)).label(c) for c in COUNTERS]
+    query = select(PlanDailyStats.day, *sums).where(PlanDailyStats.day.between(start, end))
+    if store_id is not None:
+        query = query.where(PlanDailyStats.store_id == store_id)
+    rows = await db.execute(query.group_by(PlanDailyStats.day))
+    return {row.day: {c: getattr(row, c) for c in COUNTERS} for row in rows}
+
+
+def summarize(per_day: Iterable[dict[date, dict]]) -> dict:
+    """Per-day and total statistics from one or more (shards') `daily_sums`."""
+    merged: dict[date, dict] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for sums in per_day:
+        for day, counters in sums.items():
+            for c in COUNTERS:
+                merged[day][c] += counters[c]
+    totals = {c: sum(counters[c] for counters in merged.values()) for c in COUNTERS}
+    return {
+        "days": [{"day": day, **_day_stats(merged[day])} for day in sorted(merged)],
+        "totals": _day_stats(totals),
+    }
+
+
+async def get_plan_stats(db: AsyncSession, start: date, end: date, store_id: int | None = None) -> dict:
+    return summarize([await daily_sums(db, start, end, store_id)])
+
+
+async def get_plan_stats_across(session_makers: list[async_sessionmaker], start: date, end: date) -> dict:
+    """All stores' statistics, queried on every shard concurrently."""
+
+    async def shard_sums(session_maker: async_sessionmaker) -> dict[date, dict]:
+        async with session_maker() as session:
+            return await daily_sums(session, start, end)
+
+    return summarize(await asyncio.gather(*(shard_sums(m) for m in session_makers)))
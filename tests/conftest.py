@@ -11,6 +11,8 @@ from sqlalchemy.pool import StaticPool
 from src.rimas.api.main import app
 from src.rimas.db.models import Base
 from src.rimas.api.deps import get_db
+from rimas.api import deps as rimas_deps
+from rimas.api.main import app as rimas_app
 
 
 @pytest.fixture(scope="session")
@@ -21,6 +23,24 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def isolated_model_cache(tmp_path_factory):
+    """Keep models cached by a developer's local runs out of the suite.
+
+    With the registry unreachable the artifact cache serves its last good
+    model, which would replace the stub forecasts the plan tests expect.
+    """
+    from rimas.config import settings
+    from rimas.ml import mlflow_client
+
+    original = settings.model_cache_dir
+    settings.model_cache_dir = str(tmp_path_factory.mktemp("model-cache"))
+    mlflow_client._artifact_cache = None
+    yield
+    settings.model_cache_dir = original
+    mlflow_client._artifact_cache = None
+
+
 @pytest.fixture
 async def test_db():
     """In-memory SQLite for tests."""
@@ -48,3 +68,36 @@ async def client(test_db: AsyncSession):
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def session_maker_client():
+    """AsyncClient + session factory sharing one in-memory SQLite DB.
+
+    Overrides both `get_db` (request-scoped sessions) and `get_session_maker`
+    (sessions owned by streaming bodies / batch persistence). StaticPool keeps
+    a single connection so every session sees the same database.
+    """
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+    )
+
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        async with maker() as session:
+            yield session
+            await session.commit()
+
+    rimas_app.dependency_overrides[rimas_deps.get_db] = override_get_db
+    rimas_app.dependency_overrides[rimas_deps.get_session_maker] = lambda: maker
+    transport = ASGITransport(app=rimas_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac, maker
+    rimas_app.dependency_overrides.clear()
+    await engine.dispose()
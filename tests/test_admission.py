@@ -0,0 +1,95 @@
+"""Admission control tests (priority classes, store-fair queuing, 429 shedding)."""
+
+import asyncio
+
+import pytest
+
+from rimas import admission as admission_mod
+from rimas.admission import BULK, INTERACTIVE, AdmissionController, AdmissionRejected, PriorityClass
+
+PLAN = {"store_id": 1, "items": [{"item_id": 1, "current_stock": 10}]}
+
+
+async def _hold(cls: PriorityClass, key, release: asyncio.Event, served: list | None = None):
+    async with cls.slot(key, bounded=False):
+        if served is not None:
+            served.append(key)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_one_stores_backlog_does_not_starve_others():
+    cls = PriorityClass(BULK, limit=1, max_queue=100)
+    served: list = []
+    done = asyncio.Event()
+    done.set()
+    gate = asyncio.Event()
+    blocker = asyncio.create_task(_hold(cls, "blocker", gate))
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(_hold(cls, "big", done, served)) for _ in range(6)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(_hold(cls, s, done, served)) for s in ("a", "b")]
+    await asyncio.sleep(0)
+    assert cls.stats()["waiting"] == 8 and cls.stats()["stores_waiting"] == 3
+    gate.set()
+    await asyncio.gather(blocker, *tasks)
+    # "a" and "b" arrived after six "big" plans but are served in its first turns.
+    assert served.index("a") <= 2 and served.index("b") <= 2
+    assert cls.in_flight == 0 and cls.waiting == 0
+    assert cls.stats()["admitted"] == 9
+
+
+@pytest.mark.asyncio
+async def test_full_queue_and_long_wait_are_shed():
+    cls = PriorityClass(INTERACTIVE, limit=1, max_queue=1)
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold(cls, 1, gate))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as exc:
+        async with cls.slot(2, timeout_s=0.05):
+            pass
+    assert exc.value.reason == "wait exceeded deadline" and exc.value.retry_after_s >= 1
+
+    waiter = asyncio.create_task(_hold(cls, 2, gate))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected) as exc:
+        async with cls.slot(3):
+            pass
+    assert exc.value.reason == "full"
+
+    # A cancelled waiter gives up its place without leaking a slot.
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    gate.set()
+    await holder
+    stats = cls.stats()
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+    assert stats["rejected"] == 1 and stats["timed_out"] == 1
+
+
+@pytest.mark.asyncio
+async def test_interactive_shed_with_retry_after_while_bulk_unaffected(client, monkeypatch):
+    controller = AdmissionController(interactive_limit=1, interactive_queue=0, bulk_limit=2, bulk_queue=10)
+    monkeypatch.setattr(admission_mod, "_controller", controller)
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold(controller[INTERACTIVE], 99, gate))
+    await asyncio.sleep(0)
+
+    r = await client.post("/plans/", json=PLAN)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+
+    r = await client.post("/plans/batch", json={"plans": [PLAN, {**PLAN, "store_id": 2}]})
+    assert r.status_code == 200
+    assert all("plan_id" in res for res in r.json()["results"])
+
+    gate.set()
+    await holder
+    r = await client.post("/plans/", json=PLAN)
+    assert r.status_code == 200
+
+    stats = (await client.get("/health/admission")).json()
+    assert stats[INTERACTIVE]["rejected"] == 1 and stats[INTERACTIVE]["admitted"] == 2
+    assert stats[BULK]["admitted"] == 2 and stats[BULK]["in_flight"] == 0
+    assert set(stats[BULK]["wait_ms"]) == {"mean", "p50", "p95", "max"}
@@ -0,0 +1,77 @@
+"""Agent graph state tests (compact items, copy-free merges)."""
+
+import pytest
+
+from rimas.agents.items import PlanItems
+from rimas.agents.nodes import (
+    data_analysis_node,
+    inventory_analysis_node,
+    supervisor_node,
+)
+from rimas.agents.state import _merge_agent_outputs
+from rimas.api.schemas import CreatePlanRequest
+from rimas.services.orchestration_langgraph import generate_plan_langgraph
+
+
+def test_merge_agent_outputs_does_not_mutate_accumulator():
+    left = {"data_analysis": {"confidence": 0.85}}
+    merged = _merge_agent_outputs(left, {"inventory_analysis": {"risk_score": 0.2}})
+    assert set(merged) == {"data_analysis", "inventory_analysis"}
+    assert set(left) == {"data_analysis"}
+    assert _merge_agent_outputs(None, {"a": 1}) == {"a": 1}
+
+
+def test_streamed_states_keep_their_own_agent_outputs():
+    from langgraph.graph import END, StateGraph
+
+    from rimas.agents.state import PlanState
+
+    graph = StateGraph(PlanState)
+    graph.add_node("a", lambda s: {"agent_outputs": {"a": 1}})
+    graph.add_node("b", lambda s: {"agent_outputs": {"b": 2}})
+    graph.set_entry_point("a")
+    graph.add_edge("a", "b")
+    graph.add_edge("b", END)
+
+    init = {}
+    states = list(graph.compile().stream({"agent_outputs": init}, stream_mode="values"))
+    assert [s["agent_outputs"] for s in states] == [{}, {"a": 1}, {"a": 1, "b": 2}]
+    assert init == {}
+
+
+def test_nodes_read_plan_items_columns():
+    items = PlanItems([1, 2, 3], [5, 40, 60])
+    state = {"request": {"horizon_days": 7, "constraints": {"max_discount": 0.05}}, "items": items}
+
+    data = data_analysis_node(state)["agent_outputs"]["data_analysis"]
+    assert data["low_stock_count"] == 1
+
+    inv = inventory_analysis_node(state)["agent_outputs"]["inventory_analysis"]
+    assert inv["avg_stock"] == 35.0
+
+    recs = supervisor_node(state)["recommendations"]
+    assert [r["recommended_order_qty"] for r in recs] == [45, 10, 0]
+    assert recs[0]["recommended_discount"] == 0.05
+
+
+def test_nodes_accept_legacy_request_items():
+    state = {"request": {"items": [{"item_id": 7, "current_stock": 1}]}}
+    recs = supervisor_node(state)["recommendations"]
+    assert recs[0]["item_id"] == 7
+
+
+@pytest.mark.asyncio
+async def test_langgraph_plan_persists_full_request_payload():
+    req = CreatePlanRequest(
+        store_id=2, items=[{"item_id": 1, "current_stock": 10}, {"item_id": 2, "current_stock": 70}]
+    )
+    draft = await generate_plan_langgraph(req)
+    assert draft["request_payload"]["items"][1] == {"item_id": 2, "current_stock": 70}
+    assert set(draft["agent_outputs"]) == {
+        "data_analysis",
+        "demand_forecast",
+        "inventory_analysis",
+        "marketing_analysis",
+        "supervisor_decision",
+    }
+    assert len(draft["recommendations"]) == 2
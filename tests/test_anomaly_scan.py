@@ -0,0 +1,124 @@
+"""Batch anomaly scan tests (rimas.ml.anomaly_scan, scripts/scan_anomalies.py)."""
+
+import csv
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from rimas.db.models import AnomalyFlag, Base
+from rimas.ml.anomaly_scan import ScanParams, scan_daily, score_matrix
+from rimas.ml.inference import scan_anomalies
+from rimas.services.anomaly_service import write_flags
+
+
+def _daily(n_stores: int = 3, n_items: int = 5, n_days: int = 120) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    s, i, d = np.meshgrid(np.arange(n_stores), np.arange(n_items), np.arange(n_days), indexing="ij")
+    # Weekly pattern: day 5 of each week sells twice as much.
+    units = np.where(d % 7 == 5, 40.0, 20.0) + rng.normal(0, 1, size=s.shape)
+    return pd.DataFrame({
+        "store_id": s.ravel() + 1,
+        "item_id": i.ravel(),
+        "day": d.ravel() + 19_700,
+        "units": units.ravel(),
+        "recorded": True,
+    })
+
+
+def test_scores_match_naive_rolling_definitions():
+    rng = np.random.default_rng(1)
+    units = rng.poisson(10, size=(3, 60)).astype(float)
+    params = ScanParams(window=14, season=7, min_scale=1e-9)
+    scores = score_matrix(units, params)
+    t = 40
+    past = units[:, t - 14 : t]
+    z = (units[:, t] - past.mean(axis=1)) / past.std(axis=1, ddof=1)
+    med = np.median(past, axis=1)
+    mad = (units[:, t] - med) / (np.median(np.abs(past - med[:, None]), axis=1) * 1.4826)
+    np.testing.assert_allclose(scores["zscore"][:, t], z)
+    np.testing.assert_allclose(scores["mad"][:, t], mad)
+    assert np.isnan(scores["zscore"][:, :14]).all()
+    assert np.isnan(scores["seasonal"][:, :28]).all()
+    assert not np.isnan(scores["seasonal"][:, 28:]).any()
+
+
+def test_scan_flags_injected_spikes_not_weekly_peaks():
+    daily = _daily()
+    spike = (daily["store_id"] == 2) & (daily["item_id"] == 3) & (daily["day"] == 19_790)
+    daily.loc[spike, "units"] = 80.0
+
+    flags = scan_daily(daily, workers=1)
+    flagged = set(zip(flags["store_id"].tolist(), flags["item_id"].tolist(), flags["day"].tolist()))
+    assert (2, 3, 19_790) in flagged
+    # Weekly peaks stand out against the window (z) but not against the season.
+    i = flags["day"].tolist().index(19_790)
+    assert flags["seasonal"][i] > 3.5
+    peaks = (flags["day"] - 19_700) % 7 == 5
+    assert not (np.abs(flags["seasonal"][peaks]) > 3.5).any()
+
+
+def test_process_pool_matches_in_process_scan():
+    daily = _daily(n_stores=5)
+    inline = scan_daily(daily, workers=1)
+    pooled = scan_daily(daily, workers=2)
+    key = lambda f: np.lexsort((f["day"], f["item_id"], f["store_id"]))  # noqa: E731
+    for name, values in inline.items():
+        np.testing.assert_array_equal(values[key(inline)], pooled[name][key(pooled)])
+
+
+@pytest.mark.asyncio
+async def test_flags_written_in_bulk_and_rerun_replaces(tmp_path):
+    path = tmp_path / "sales.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "store_id", "item_id", "units_sold"])
+        for d in range(90):
+            day = (date(2024, 1, 1) + timedelta(days=d)).isoformat()
+            for item in range(3):
+                writer.writerow([day, 1, item, 500 if (d, item) == (60, 1) else 10 + d % 2])
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    result = scan_anomalies([str(path)], window=14, workers=1)
+    assert result["store_ids"] == [1] and result["points"] == 270
+    for _ in range(2):
+        written = await write_flags(maker, result["flags"], result["store_ids"], result["day_range"])
+    async with maker() as session:
+        rows = (await session.execute(select(AnomalyFlag))).scalars().all()
+        assert len(rows) == written
+        assert await session.scalar(select(func.count()).select_from(AnomalyFlag)) == written
+    spike = [r for r in rows if r.item_id == 1 and r.day == date(2024, 3, 1)]
+    assert spike and spike[0].value == 500 and spike[0].zscore > 3.5
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_scan_script_writes_csv(tmp_path):
+    from scripts.scan_anomalies import main, parse_args
+
+    daily = _daily(n_stores=1, n_items=2, n_days=60)
+    daily.loc[len(daily) - 1, "units"] = 200.0
+    path = tmp_path / "sales.csv"
+    pd.DataFrame({
+        "date": daily["day"].to_numpy().astype("datetime64[D]").astype(str),
+        "store_id": daily["store_id"],
+        "item_id": daily["item_id"],
+        "units_sold": daily["units"],
+    }).to_csv(path, index=False)
+
+    out = tmp_path / "flags.csv"
+    await main(parse_args(["--sales", str(path), "--workers", "1", "--no-write", "-o", str(out)]))
+    rows = list(csv.DictReader(open(out)))
+    assert any(r["item_id"] == "1" and float(r["value"]) == 200.0 for r in rows)
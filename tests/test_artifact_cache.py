@@ -0,0 +1,130 @@
+"""Local model artifact cache tests (file-based MLflow store as stand-in)."""
+
+import pytest
+
+from rimas.ml.artifact_cache import ModelArtifactCache
+
+
+class _FakeRegistryCache(ModelArtifactCache):
+    """Cache whose registry is a dict of version -> artifact size."""
+
+    def __init__(self, *args, versions: dict[str, int], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.versions = versions
+        self.downloads = 0
+        self.online = True
+
+    def resolve_version(self, name, stage):
+        if not self.online:
+            raise ConnectionError("registry down")
+        return max(self.versions, key=int)
+
+    def download(self, name, version, dst):
+        self.downloads += 1
+        (dst / "model.bin").write_bytes(version.encode() * self.versions[version])
+        return dst
+
+
+def test_resolve_downloads_once_and_reuses_across_instances(tmp_path):
+    cache = _FakeRegistryCache(tmp_path, max_bytes=10_000, versions={"1": 100})
+    first = cache.resolve("demand_model", "Production")
+    assert first.version == "1"
+    assert (first.path / "model.bin").is_file()
+
+    again = cache.resolve("demand_model", "Production")
+    assert again.digest == first.digest
+    assert cache.downloads == 1
+
+    other_process = _FakeRegistryCache(tmp_path, max_bytes=10_000, versions={"1": 100})
+    assert other_process.resolve("demand_model", "Production").path == first.path
+    assert other_process.downloads == 0
+
+
+def test_offline_falls_back_to_last_good_version(tmp_path):
+    cache = _FakeRegistryCache(tmp_path, max_bytes=10_000, versions={"1": 10})
+    good = cache.resolve("demand_model", "Production")
+
+    cache.online = False
+    assert cache.resolve("demand_model", "Production") == good
+
+    with pytest.raises(ConnectionError):
+        cache.resolve("anomaly_model", "Production")
+
+
+def test_lru_eviction_keeps_cache_under_budget(tmp_path):
+    cache = _FakeRegistryCache(tmp_path, max_bytes=250, versions={"1": 100})
+    v1 = cache.resolve("demand_model", "Production")
+    cache.versions["2"] = 100
+    v2 = cache.resolve("demand_model", "Production")
+    assert v1.path.is_dir() and v2.path.is_dir()
+
+    cache.versions["3"] = 100
+    v3 = cache.resolve("demand_model", "Production")
+    assert not v1.path.exists()
+    assert v2.path.is_dir() and v3.path.is_dir()
+
+
+def test_eviction_keeps_other_models_last_good_version(tmp_path):
+    cache = _FakeRegistryCache(tmp_path, max_bytes=150, versions={"1": 100})
+    anomaly = cache.resolve("anomaly_model", "Production")
+    cache.versions["2"] = 100
+    demand = cache.resolve("demand_model", "Production")
+
+    # Over budget, but both objects back a stage entry, so neither is evicted.
+    assert anomaly.path.is_dir() and demand.path.is_dir()
+    cache.online = False
+    assert cache.resolve("anomaly_model", "Production") == anomaly
+
+
+def test_registry_timeout_falls_back_without_touching_env(tmp_path, monkeypatch):
+    import os
+    import time
+
+    class SlowRegistryCache(_FakeRegistryCache):
+        def resolve_version(self, name, stage):
+            return self._call_with_timeout(lambda: time.sleep(5) or "2")
+
+    cache = SlowRegistryCache(tmp_path, max_bytes=10_000, versions={"1": 10})
+    good = _FakeRegistryCache(tmp_path, max_bytes=10_000, versions={"1": 10}).resolve(
+        "demand_model", "Production"
+    )
+    cache.request_timeout_s = 0.2
+    monkeypatch.delenv("MLFLOW_HTTP_REQUEST_MAX_RETRIES", raising=False)
+
+    started = time.monotonic()
+    assert cache.resolve("demand_model", "Production") == good
+    assert time.monotonic() - started < 2
+    assert "MLFLOW_HTTP_REQUEST_MAX_RETRIES" not in os.environ
+
+
+def test_resolves_from_local_mlflow_file_store(tmp_path):
+    mlflow = pytest.importorskip("mlflow")
+    import mlflow.pyfunc
+    from mlflow.tracking import MlflowClient
+
+    class ConstantModel(mlflow.pyfunc.PythonModel):
+        def predict(self, context, model_input, params=None):
+            return [7.0] * len(model_input)
+
+    uri = (tmp_path / "mlruns").as_uri()
+    mlflow.set_tracking_uri(uri)
+    mlflow.set_registry_uri(uri)
+    with mlflow.start_run():
+        mlflow.pyfunc.log_model(
+            "model", python_model=ConstantModel(), registered_model_name="demand_model"
+        )
+    MlflowClient().transition_model_version_stage("demand_model", "1", "Production")
+
+    cache = ModelArtifactCache(tmp_path / "cache", max_bytes=10**9, tracking_uri=uri)
+    cached = cache.resolve("demand_model", "Production")
+    assert cached.version == "1"
+    model = mlflow.pyfunc.load_model(str(cached.path))
+    assert model.predict([{"x": 1}]) == [7.0]
+
+    offline = ModelArtifactCache(
+        tmp_path / "cache",
+        max_bytes=10**9,
+        tracking_uri="http://127.0.0.1:9",
+        request_timeout_s=1.0,
+    )
+    assert offline.resolve("demand_model", "Production").digest == cached.digest
@@ -0,0 +1,96 @@
+"""Write-behind audit event tests (deferred inserts, rollback, spill replay)."""
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from rimas.config import settings
+from rimas.db.models import PlanEvent
+from rimas.services import audit_buffer as audit_mod
+from rimas.services.audit_buffer import AuditBuffer
+
+PLAN = {"store_id": 1, "items": [{"item_id": 1, "current_stock": 10}]}
+
+
+@pytest.fixture
+async def buffered(session_maker_client, tmp_path, monkeypatch):
+    client, maker = session_maker_client
+    buffer = AuditBuffer(maker, tmp_path / "spill", flush_rows=1000, flush_interval_s=3600)
+    monkeypatch.setattr(settings, "audit_write_behind", True)
+    monkeypatch.setattr(audit_mod, "_buffer", buffer)
+    buffer.start()
+    yield client, maker, buffer
+    await buffer.stop()
+
+
+async def _event_count(maker) -> int:
+    async with maker() as session:
+        return await session.scalar(select(func.count()).select_from(PlanEvent))
+
+
+@pytest.mark.asyncio
+async def test_events_deferred_until_flush(buffered):
+    client, maker, buffer = buffered
+    plan_id = (await client.post("/plans/", json=PLAN)).json()["plan_id"]
+    await client.post(f"/plans/{plan_id}/approve")
+
+    assert await _event_count(maker) == 0
+    assert buffer.stats()["buffered"] == 7  # 5 agent outputs + final + approved
+    spilled = [json.loads(line) for p in buffer.spill_dir.iterdir() for line in p.read_text().splitlines()]
+    assert len(spilled) == 7 and {e["plan_id"] for e in spilled} == {plan_id}
+
+    assert await buffer.flush() == 7
+    assert await _event_count(maker) == 7
+    assert list(buffer.spill_dir.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_size_threshold_wakes_flusher_and_full_buffer_writes_inline(buffered):
+    client, maker, buffer = buffered
+    buffer.flush_rows = 6
+    await client.post("/plans/", json=PLAN)
+    for _ in range(50):
+        if buffer.stats()["flushed"]:
+            break
+        await asyncio.sleep(0.01)
+    assert buffer.stats()["flushed"] == 6 and await _event_count(maker) == 6
+
+    buffer.max_rows = 3
+    await client.post("/plans/", json=PLAN)
+    assert buffer.stats()["inline"] == 6 and await _event_count(maker) == 12
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_events_are_discarded(buffered):
+    _, maker, buffer = buffered
+    from rimas.services.plan_service import create_plan
+
+    async with maker() as session:
+        await create_plan(session, PLAN, {"a": {}}, {"recommendations": []})
+        await session.rollback()
+    assert buffer.stats()["buffered"] == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_inserts_only_missing_events_of_existing_plans(buffered):
+    client, maker, buffer = buffered
+    plan_id = (await client.post("/plans/", json=PLAN)).json()["plan_id"]
+    rows = [json.loads(line) for p in buffer.spill_dir.iterdir() for line in p.read_text().splitlines()]
+    await buffer.flush()
+
+    # A crash after the first two rows were inserted, with a torn last line
+    # and an event of a plan that was never committed.
+    async with maker() as session:
+        await session.execute(PlanEvent.__table__.delete().where(PlanEvent.id.in_([r["id"] for r in rows[2:]])))
+        await session.commit()
+    orphan = {**rows[0], "id": "orphan", "plan_id": "missing-plan"}
+    segment = buffer.spill_dir / "segment-1.ndjson"
+    segment.write_text("".join(json.dumps(r) + "\n" for r in rows + [orphan]) + '{"id": "torn')
+
+    assert await buffer.replay() == len(rows) - 2
+    assert await _event_count(maker) == len(rows)
+    assert not segment.exists()
+    async with maker() as session:
+        assert set((await session.execute(select(PlanEvent.plan_id))).scalars()) == {plan_id}
@@ -0,0 +1,118 @@
+"""Batch planning tests (POST /plans/batch)."""
+
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from rimas.db.models import Plan, PlanEvent
+
+
+def _batch(n: int) -> dict:
+    return {
+        "plans": [
+            {"store_id": s, "items": [{"item_id": 1, "current_stock": 10}]}
+            for s in range(n)
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_results_in_request_order(session_maker_client):
+    client, maker = session_maker_client
+    r = await client.post("/plans/batch", json=_batch(5))
+    assert r.status_code == 200
+
+    results = r.json()["results"]
+    assert [res["store_id"] for res in results] == list(range(5))
+    assert all(res["plan_id"] and res["error"] is None for res in results)
+
+    async with maker() as session:
+        assert await session.scalar(select(func.count()).select_from(Plan)) == 5
+        # 5 agent outputs + final_decision per plan
+        assert await session.scalar(select(func.count()).select_from(PlanEvent)) == 30
+
+    get_r = await client.get(f"/plans/{results[2]['plan_id']}")
+    assert get_r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_batch_stream_ndjson(session_maker_client):
+    client, _ = session_maker_client
+    r = await client.post("/plans/batch", params={"stream": "true"}, json=_batch(3))
+    assert r.status_code == 200
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(line["store_id"] for line in lines) == [0, 1, 2]
+    assert all(line["status"] == "created" for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_oversized_request(session_maker_client):
+    from rimas.api.schemas import BATCH_MAX_PLANS
+
+    client, _ = session_maker_client
+    r = await client.post("/plans/batch", json=_batch(BATCH_MAX_PLANS + 1))
+    assert r.status_code == 422
+
+
+def _reqs(n: int) -> list:
+    from rimas.api.schemas import CreatePlanRequest
+
+    return [CreatePlanRequest.model_validate(p) for p in _batch(n)["plans"]]
+
+
+@pytest.mark.asyncio
+async def test_batch_persists_in_chunks(session_maker_client):
+    from rimas.services.batch_service import iter_plan_batch
+
+    _, maker = session_maker_client
+    chunks = [c async for c in iter_plan_batch(_reqs(5), maker, chunk_size=2)]
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    async with maker() as session:
+        assert await session.scalar(select(func.count()).select_from(Plan)) == 5
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_generation_error_per_store(session_maker_client, monkeypatch):
+    from rimas.services import batch_service
+
+    real_generate = batch_service.generate_plan
+
+    async def flaky(req):
+        if req.store_id == 1:
+            raise RuntimeError("boom")
+        return await real_generate(req)
+
+    monkeypatch.setattr(batch_service, "generate_plan", flaky)
+    _, maker = session_maker_client
+    results = await batch_service.run_plan_batch(_reqs(3), maker)
+    assert results[1]["error"] == "RuntimeError: boom"
+    assert results[0]["plan_id"] and results[2]["plan_id"]
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_persist_failure(session_maker_client, monkeypatch):
+    from rimas.services import batch_service
+
+    async def failing_bulk(session, drafts):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(batch_service, "create_plans_bulk", failing_bulk)
+    _, maker = session_maker_client
+    results = await batch_service.run_plan_batch(_reqs(3), maker, chunk_size=2)
+    assert [r["error"] for r in results] == ["persist failed: RuntimeError"] * 3
+
+
+@pytest.mark.asyncio
+async def test_batch_process_pool(session_maker_client, monkeypatch):
+    from rimas.config import settings
+    from rimas.services import batch_service
+
+    monkeypatch.setattr(settings, "batch_process_workers", 2)
+    _, maker = session_maker_client
+    try:
+        results = await batch_service.run_plan_batch(_reqs(3), maker)
+    finally:
+        batch_service.shutdown_process_pool()
+    assert all(r.get("error") is None and r["plan_id"] for r in results)
+    assert [r["store_id"] for r in results] == [0, 1, 2]
@@ -0,0 +1,100 @@
+"""Plan checkpoint tests (resume after an interrupted run, idempotent retries, TTL)."""
+
+import math
+from array import array
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from rimas.agents import forecast as forecast_mod
+from rimas.agents.forecast import ForecastCache
+from rimas.config import settings
+from rimas.db.models import Plan, PlanCheckpoint
+from rimas.services import orchestration_langgraph
+from rimas.services.checkpoint_service import PERSISTED_NODE, _decode, _encode, purge_expired
+
+PLAN = {"store_id": 1, "items": [{"item_id": 1, "current_stock": 10}, {"item_id": 2, "current_stock": 0}]}
+
+
+@pytest.fixture
+def flaky_graph(monkeypatch):
+    """LangGraph orchestrator whose marketing node fails once; counts model calls."""
+    calls = {"model": 0, "marketing": 0}
+
+    def predict_demand_batch(store_id, item_ids, quantity=1.0):
+        calls["model"] += 1
+        return [{"item_id": i, "prediction": 4.0 * quantity, "is_mock": False} for i in item_ids]
+
+    marketing = orchestration_langgraph.marketing_analysis_node
+
+    def flaky_marketing(state):
+        calls["marketing"] += 1
+        if calls["marketing"] == 1:
+            raise RuntimeError("worker died")
+        return marketing(state)
+
+    monkeypatch.setattr(forecast_mod, "predict_demand_batch", predict_demand_batch)
+    monkeypatch.setattr(forecast_mod, "model_version", lambda name: "1")
+    monkeypatch.setattr(settings, "orchestrator", "langgraph")
+    monkeypatch.setattr(orchestration_langgraph, "marketing_analysis_node", flaky_marketing)
+    orchestration_langgraph._build_graph.cache_clear()
+    yield calls
+    orchestration_langgraph._build_graph.cache_clear()
+
+
+async def _checkpoint_nodes(maker, key: str) -> set[str]:
+    async with maker() as session:
+        rows = await session.execute(select(PlanCheckpoint.node).where(PlanCheckpoint.key == key))
+        return set(rows.scalars())
+
+
+@pytest.mark.asyncio
+async def test_retry_resumes_from_last_finished_node(session_maker_client, flaky_graph, monkeypatch):
+    client, maker = session_maker_client
+    headers = {"Idempotency-Key": "plan-run-1"}
+
+    with pytest.raises(RuntimeError, match="worker died"):
+        await client.post("/plans/", json=PLAN, headers=headers)
+    assert await _checkpoint_nodes(maker, "plan-run-1") == {
+        "node_data_analysis",
+        "node_demand_forecast",
+        "node_inventory_analysis",
+    }
+
+    # A fresh process: nothing in the forecast cache, so only the checkpoint
+    # can spare the model call.
+    monkeypatch.setattr(forecast_mod, "_cache", ForecastCache())
+    r = await client.post("/plans/", json=PLAN, headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert flaky_graph["model"] == 1 and flaky_graph["marketing"] == 2
+    assert body["metadata"]["trace_id"] == "plan-run-1"
+    assert [rec["recommended_order_qty"] for rec in body["recommendations"]] == [18, 28]
+    assert await _checkpoint_nodes(maker, "plan-run-1") == {PERSISTED_NODE}
+
+    # Retrying a finished plan returns it instead of creating another.
+    again = await client.post("/plans/", json=PLAN, headers=headers)
+    assert again.json()["plan_id"] == body["plan_id"]
+    async with maker() as session:
+        assert await session.scalar(select(func.count()).select_from(Plan)) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_checkpoints_are_purged(session_maker_client):
+    _, maker = session_maker_client
+    old = datetime.utcnow() - timedelta(seconds=settings.plan_checkpoint_ttl_s + 60)
+    async with maker() as session:
+        session.add(PlanCheckpoint(key="old", node="node_data_analysis", payload={}, created_at=old))
+        session.add(PlanCheckpoint(key="new", node="node_data_analysis", payload={}))
+        await session.commit()
+    assert await purge_expired(maker) == 1
+    assert await _checkpoint_nodes(maker, "new") == {"node_data_analysis"}
+
+
+def test_state_updates_round_trip_through_json():
+    update = {"forecasts": array("d", [1.5, math.nan]), "agent_outputs": {"x": {"at": datetime(2024, 1, 1)}}}
+    decoded = _decode(_encode(update))
+    assert decoded["forecasts"].typecode == "d" and decoded["forecasts"][0] == 1.5
+    assert math.isnan(decoded["forecasts"][1])
+    assert decoded["agent_outputs"]["x"]["at"] == "2024-01-01T00:00:00"
@@ -0,0 +1,73 @@
+"""Response compression tests (negotiation, threshold, streaming chunks)."""
+
+import gzip
+import zlib
+
+import pytest
+import zstandard
+from starlette.responses import StreamingResponse
+
+from rimas.api.compression import CompressionMiddleware, negotiate
+
+BIG_PLAN = {"store_id": 1, "items": [{"item_id": i, "current_stock": i % 7} for i in range(300)]}
+
+
+def test_negotiation():
+    assert negotiate("gzip, deflate, br, zstd") == "zstd"
+    assert negotiate("gzip;q=1.0, zstd;q=0.5") == "gzip"
+    assert negotiate("zstd;q=0, *") == "gzip"
+    assert negotiate("identity") is None and negotiate("") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("coding", ["gzip", "zstd"])
+async def test_large_plan_compressed_small_body_not(client, coding):
+    r = await client.post("/plans/", json=BIG_PLAN, headers={"Accept-Encoding": coding})
+    assert r.headers["content-encoding"] == coding
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert len(r.json()["recommendations"]) == 300
+    assert int(r.headers["content-length"]) < len(r.content) / 3
+
+    r = await client.get("/health", headers={"Accept-Encoding": coding})
+    assert "content-encoding" not in r.headers
+    r = await client.get("/plans/missing", headers={"Accept-Encoding": coding})
+    assert r.status_code == 404 and "content-encoding" not in r.headers
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("coding", ["gzip", "zstd"])
+async def test_streaming_body_compressed_chunk_by_chunk(coding):
+    chunks = [f'{{"line": {i}, "rationale": "{"restock " * 50}"}}\n'.encode() for i in range(5)]
+
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    app = CompressionMiddleware(StreamingResponse(body(), media_type="application/x-ndjson"), minimum_size=10_000)
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"spec_version": "2.4"},
+        "method": "GET",
+        "path": "/plans/export",
+        "headers": [(b"accept-encoding", coding.encode())],
+    }
+    await app(scope, receive, send)
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == coding.encode() and b"content-length" not in headers
+    bodies = [m["body"] for m in sent[1:] if m["body"]]
+    assert len(bodies) >= len(chunks)
+    # Every chunk decodes on arrival: nothing is held back until the end.
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 16) if coding == "gzip" else zstandard.ZstdDecompressor().decompressobj()
+    for i, part in enumerate(bodies[: len(chunks)]):
+        assert decoder.decompress(part) == chunks[i]
+    if coding == "gzip":
+        assert gzip.decompress(b"".join(bodies)) == b"".join(chunks)
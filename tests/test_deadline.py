@@ -0,0 +1,124 @@
+"""Plan deadline tests (X-Deadline-Ms, degrading nodes, 504 on expiry)."""
+
+import asyncio
+import math
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from rimas.agents import forecast as forecast_mod
+from rimas.agents.forecast import ForecastCache
+from rimas.agents.items import PlanItems
+from rimas.agents.nodes import demand_forecast_node
+from rimas.config import settings
+from rimas.db.models import Plan
+from rimas.deadline import Deadline, DeadlineExceeded, run_within
+from rimas.services import _orchestration_stub, orchestration_langgraph
+
+PLAN = {"store_id": 1, "items": [{"item_id": 1, "current_stock": 10}]}
+
+
+@pytest.fixture
+def slow_model(monkeypatch):
+    """Demand model that takes `delay["s"]` seconds per batch."""
+    delay = {"s": 1.0}
+
+    def predict_demand_batch(store_id, item_ids, quantity=1.0):
+        time.sleep(delay["s"])
+        return [{"item_id": i, "prediction": 5.0 * quantity, "is_mock": False} for i in item_ids]
+
+    monkeypatch.setattr(forecast_mod, "predict_demand_batch", predict_demand_batch)
+    monkeypatch.setattr(forecast_mod, "model_version", lambda name: "1")
+    monkeypatch.setattr(forecast_mod, "_cache", ForecastCache())
+    return delay
+
+
+@pytest.mark.asyncio
+async def test_run_within_cancels_pending_work():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(DeadlineExceeded):
+        await run_within(Deadline.after_ms(50), slow())
+    assert cancelled.is_set()
+    assert await run_within(None, asyncio.sleep(0, "ok")) == "ok"
+
+
+def test_forecast_node_degrades_when_budget_runs_out(slow_model):
+    state = {
+        "request": {"store_id": 1, "horizon_days": 7},
+        "items": PlanItems([1, 2], [0, 0]),
+        "deadline": Deadline.after_ms(settings.plan_node_reserve_ms + 100),
+    }
+    started = time.monotonic()
+    update = demand_forecast_node(state)
+    assert time.monotonic() - started < 0.5
+    output = update["agent_outputs"]["demand_forecast"]
+    assert output["fallback_reason"] == "deadline" and output["forecast_count"] == 0
+    assert all(math.isnan(f) for f in update["forecasts"])
+
+    # The abandoned call still completes and serves the next plan.
+    time.sleep(1.0)
+    update = demand_forecast_node({**state, "deadline": Deadline.after_ms(1000)})
+    assert update["agent_outputs"]["demand_forecast"]["cached_count"] == 2
+    assert list(update["forecasts"]) == [35.0, 35.0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("orchestrator", ["stub", "langgraph"])
+async def test_slow_forecast_degrades_within_deadline(session_maker_client, slow_model, monkeypatch, orchestrator):
+    client, _ = session_maker_client
+    monkeypatch.setattr(settings, "orchestrator", orchestrator)
+    started = time.monotonic()
+    r = await client.post("/plans/", json=PLAN, headers={"X-Deadline-Ms": "700"})
+    assert time.monotonic() - started < 0.7
+    assert r.status_code == 200
+    # No forecast in time: the stock heuristic (top up to 50) is used.
+    assert r.json()["recommendations"][0]["recommended_order_qty"] == 40
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_returns_504_and_persists_nothing(session_maker_client, monkeypatch):
+    client, maker = session_maker_client
+
+    def stuck_graph(req, deadline=None):
+        time.sleep(0.5)
+        raise AssertionError("should have been abandoned")
+
+    monkeypatch.setattr(settings, "orchestrator", "stub")
+    monkeypatch.setattr(_orchestration_stub, "generate_plan_stub", stuck_graph)
+    r = await client.post("/plans/", json={**PLAN, "deadline_ms": 200})
+    assert r.status_code == 504
+    async with maker() as session:
+        assert await session.scalar(select(func.count()).select_from(Plan)) == 0
+
+
+@pytest.mark.asyncio
+async def test_deadline_is_capped_and_not_persisted(session_maker_client, slow_model, monkeypatch):
+    client, maker = session_maker_client
+    slow_model["s"] = 0.0
+    seen = {}
+
+    async def ainvoke_spy(req, deadline=None, checkpoints=None):
+        seen["remaining"] = deadline.remaining()
+        return await original(req, deadline, checkpoints)
+
+    original = orchestration_langgraph.generate_plan_langgraph
+    monkeypatch.setattr(settings, "orchestrator", "langgraph")
+    monkeypatch.setattr(orchestration_langgraph, "generate_plan_langgraph", ainvoke_spy)
+    r = await client.post("/plans/", json={**PLAN, "deadline_ms": 60_000})
+    assert r.status_code == 200
+    assert seen["remaining"] <= settings.plan_deadline_ms / 1000
+    async with maker() as session:
+        payload = (await session.execute(select(Plan.request_payload))).scalar_one()
+    assert "deadline_ms" not in payload
+
+    r = await client.post("/plans/", json=PLAN, headers={"X-Deadline-Ms": "0"})
+    assert r.status_code == 422
@@ -0,0 +1,68 @@
+"""Plan export tests (GET /plans/export)."""
+
+import csv
+import io
+import json
+
+import pytest
+
+
+async def _create(client, store_id: int, n_items: int = 2) -> str:
+    r = await client.post(
+        "/plans/",
+        json={
+            "store_id": store_id,
+            "items": [{"item_id": i, "current_stock": 10} for i in range(n_items)],
+        },
+    )
+    assert r.status_code == 200
+    return r.json()["plan_id"]
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_filters_by_store(session_maker_client):
+    export_client, _ = session_maker_client
+    plan_id = await _create(export_client, store_id=1, n_items=3)
+    await _create(export_client, store_id=2)
+
+    r = await export_client.get("/plans/export", params={"store_id": 1})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 3
+    assert {row["plan_id"] for row in rows} == {plan_id}
+    assert {row["item_id"] for row in rows} == {0, 1, 2}
+    assert all(row["store_id"] == 1 for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_export_csv_has_header_and_date_filter(session_maker_client):
+    export_client, _ = session_maker_client
+    await _create(export_client, store_id=1)
+
+    r = await export_client.get("/plans/export", params={"format": "csv"})
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 2
+    assert rows[0]["store_id"] == "1"
+
+    r = await export_client.get(
+        "/plans/export", params={"format": "csv", "end": "2000-01-01T00:00:00"}
+    )
+    assert r.status_code == 200
+    assert r.text.strip().split(",")[0] == "plan_id"
+    assert len(r.text.strip().splitlines()) == 1
+
+
+@pytest.mark.asyncio
+async def test_export_parquet(session_maker_client):
+    export_client, _ = session_maker_client
+    pq = pytest.importorskip("pyarrow.parquet")
+    await _create(export_client, store_id=5, n_items=4)
+
+    r = await export_client.get("/plans/export", params={"format": "parquet"})
+    assert r.status_code == 200
+    table = pq.read_table(io.BytesIO(r.content))
+    assert table.num_rows == 4
+    assert set(table.column("store_id").to_pylist()) == {5}
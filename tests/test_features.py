@@ -0,0 +1,87 @@
+"""Feature store build tests (scripts/build_features.py, rimas.ml.features)."""
+
+import csv
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from rimas.ml.features import FEATURE_NAMES, FeatureStore, build_features
+
+START = date(2024, 1, 1)
+
+
+def _write_sales(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "store_id", "item_id", "units_sold", "on_hand", "promo"])
+        writer.writerows(rows)
+
+
+def _sales(days: range, store_id: int = 1):
+    """Item 10 sells 4/day (8 on promo every 5th day); item 11 is out of stock on odd days."""
+    for d in days:
+        day = (START + timedelta(days=d)).isoformat()
+        promo = int(d % 5 == 0)
+        yield [day, store_id, 10, 8 if promo else 4, 50, promo]
+        yield [day, store_id, 11, 1, 0 if d % 2 else 5, 0]
+
+
+@pytest.mark.asyncio
+async def test_full_build_computes_window_features(tmp_path):
+    _write_sales(tmp_path / "sales.csv", _sales(range(60)))
+    manifest = await build_features(tmp_path / "fs", [tmp_path / "sales.csv"], chunk_rows=17)
+    assert manifest["end_day"] == int(np.datetime64(START + timedelta(days=59), "D").astype(int))
+
+    store = FeatureStore(tmp_path / "fs")
+    item = store.get(1, 10)
+    assert item["promo_lift"] == pytest.approx(2.0)
+    promo_days_last_7 = sum(1 for d in range(53, 60) if d % 5 == 0)
+    assert item["demand_mean_7"] == pytest.approx((4 * 7 + 4 * promo_days_last_7) / 7)
+    assert store.get(1, 11)["stockout_rate_28"] == pytest.approx(0.5)
+    assert store.get(1, 99) is None
+    assert store.get(2, 10) is None
+
+    matrix, found = store.lookup(1, [11, 99, 10])
+    assert found.tolist() == [True, False, True]
+    assert np.isnan(matrix[1]).all()
+    assert matrix.shape == (3, len(FEATURE_NAMES))
+
+
+@pytest.mark.asyncio
+async def test_incremental_build_matches_full_build(tmp_path):
+    _write_sales(tmp_path / "jan.csv", _sales(range(0, 31)))
+    _write_sales(tmp_path / "feb.csv", _sales(range(31, 70)))
+    _write_sales(tmp_path / "all.csv", _sales(range(0, 70)))
+
+    await build_features(tmp_path / "inc", [tmp_path / "jan.csv"])
+    # Re-reading January is a no-op thanks to the watermark.
+    await build_features(tmp_path / "inc", [tmp_path / "jan.csv", tmp_path / "feb.csv"])
+    await build_features(tmp_path / "full", [tmp_path / "all.csv"])
+
+    inc, full = FeatureStore(tmp_path / "inc"), FeatureStore(tmp_path / "full")
+    for item_id in (10, 11):
+        assert inc.get(1, item_id) == pytest.approx(full.get(1, item_id))
+    # Only the live generation of each partition is kept.
+    assert len(list((tmp_path / "inc" / "store=1").iterdir())) == 1
+
+
+@pytest.mark.asyncio
+async def test_plans_contribute_stock_observations(session_maker_client, tmp_path):
+    client, maker = session_maker_client
+    r = await client.post(
+        "/plans/",
+        json={"store_id": 3, "items": [{"item_id": 1, "current_stock": 0},
+                                       {"item_id": 2, "current_stock": 9}]},
+    )
+    assert r.status_code == 200
+
+    manifest = await build_features(tmp_path / "fs", session_maker=maker)
+    assert manifest["plans_watermark"] is not None
+    assert datetime.fromisoformat(manifest["plans_watermark"]) <= datetime.utcnow()
+    store = FeatureStore(tmp_path / "fs")
+    assert store.get(3, 1)["stockout_rate_28"] == 1.0
+    assert store.get(3, 2)["stockout_rate_28"] == 0.0
+
+    again = await build_features(tmp_path / "fs", session_maker=maker)
+    assert again == manifest
@@ -0,0 +1,97 @@
+"""Demand forecasting in the plan workflow (rimas.agents.forecast)."""
+
+import math
+
+import pytest
+
+from rimas.agents import forecast as forecast_mod
+from rimas.agents.forecast import ForecastCache, forecast_items
+from rimas.agents.items import PlanItems
+from rimas.agents.nodes import demand_forecast_node, supervisor_node
+from rimas.api.schemas import CreatePlanRequest
+from rimas.services._orchestration_stub import generate_plan_stub
+from rimas.services.orchestration_langgraph import generate_plan_langgraph
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Batched demand model: 2 units/day per item id; records every call."""
+    calls = []
+    version = {"value": "1"}
+
+    def predict_demand_batch(store_id, item_ids, quantity=1.0):
+        calls.append((store_id, list(item_ids), quantity))
+        return [
+            {"item_id": i, "prediction": 2.0 * i * quantity, "is_mock": False} for i in item_ids
+        ]
+
+    monkeypatch.setattr(forecast_mod, "predict_demand_batch", predict_demand_batch)
+    monkeypatch.setattr(forecast_mod, "model_version", lambda name: version["value"])
+    monkeypatch.setattr(forecast_mod, "_cache", ForecastCache(max_entries=100))
+    return calls, version
+
+
+def test_one_batched_call_then_cached_for_the_day(fake_model):
+    calls, version = fake_model
+    first = forecast_items(1, [1, 2, 3], 7)
+    assert list(first["forecasts"]) == [14.0, 28.0, 42.0]
+    assert calls == [(1, [1, 2, 3], 7)]
+
+    # Only the new item is requested; other horizons and stores are separate keys.
+    second = forecast_items(1, [3, 4], 7)
+    assert second["cached"] == 1 and calls[-1] == (1, [4], 7)
+    forecast_items(1, [1], 14)
+    forecast_items(2, [1], 7)
+    assert len(calls) == 4
+
+    # A new model version starts a fresh cache.
+    version["value"] = "2"
+    forecast_items(1, [1, 2, 3], 7)
+    assert calls[-1] == (1, [1, 2, 3], 7)
+
+
+def test_stub_predictions_are_not_cached(monkeypatch):
+    monkeypatch.setattr(forecast_mod, "_cache", ForecastCache())
+    monkeypatch.setattr(forecast_mod, "model_version", lambda name: None)
+    monkeypatch.setattr(
+        forecast_mod,
+        "predict_demand_batch",
+        lambda store_id, item_ids, quantity=1.0: [
+            {"item_id": i, "prediction": 100.0 * quantity, "is_mock": True} for i in item_ids
+        ],
+    )
+    result = forecast_items(1, [1, 2], 7)
+    assert result["is_mock"] and all(math.isnan(f) for f in result["forecasts"])
+    assert forecast_mod._cache.stats()["entries"] == 0
+
+
+def test_supervisor_orders_to_cover_forecast(fake_model):
+    items = PlanItems([1, 5, 9], [0, 100, 3])
+    state = {"request": {"store_id": 1, "horizon_days": 7}, "items": items}
+    update = demand_forecast_node(state)
+    assert update["agent_outputs"]["demand_forecast"]["forecast_count"] == 3
+
+    recs = supervisor_node({**state, "forecasts": update["forecasts"]})["recommendations"]
+    # Forecasts over 7 days: 14, 70, 126 units.
+    assert [r["recommended_order_qty"] for r in recs] == [14, 0, 123]
+    assert "forecast=14.0" in recs[0]["rationale"]
+
+
+@pytest.mark.asyncio
+async def test_plan_workflows_use_one_forecast_call_per_plan(fake_model):
+    calls, _ = fake_model
+    req = CreatePlanRequest(
+        store_id=3,
+        horizon_days=10,
+        items=[{"item_id": i, "current_stock": 5} for i in range(1, 41)],
+    )
+    draft = await generate_plan_langgraph(req)
+    assert calls == [(3, list(range(1, 41)), 10)]
+    assert draft["recommendations"][0]["recommended_order_qty"] == 15
+    assert draft["agent_outputs"]["demand_forecast"]["total_demand"] == sum(20.0 * i for i in range(1, 41))
+
+    stub = generate_plan_stub(req)
+    assert len(calls) == 1  # served from the cache
+    assert [r["recommended_order_qty"] for r in stub["recommendations"]] == [
+        r["recommended_order_qty"] for r in draft["recommendations"]
+    ]
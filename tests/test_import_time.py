@@ -0,0 +1,35 @@
+"""API cold-start budget: importing the app must stay fast and light."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Budget for rimas' own import cost, measured after the framework
+# dependencies (fastapi, sqlalchemy, pydantic-settings) are already loaded.
+# About 0.12s today; a heavy import on the API path blows well past it.
+IMPORT_BUDGET_S = 0.5
+HEAVY_MODULES = ("langgraph", "langchain_core", "langchain_openai", "mlflow")
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+def test_api_import_is_lazy_and_within_budget():
+    code = (
+        "import json, sys, time\n"
+        "import fastapi, fastapi.responses, sqlalchemy.ext.asyncio, pydantic_settings\n"
+        "t = time.perf_counter()\n"
+        "import rimas.api.main\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(SRC), os.environ.get("PYTHONPATH", "")])}
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    assert result["heavy"] == []
+    assert result["elapsed"] < IMPORT_BUDGET_S
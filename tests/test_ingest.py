@@ -0,0 +1,125 @@
+"""Streaming NDJSON plan ingestion tests (POST /plans/ingest)."""
+
+import json
+
+import pytest
+
+from rimas.agents.items import PlanItems
+from rimas.services.ingest import PlanIngestError, parse_plan_ndjson
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.mark.asyncio
+async def test_parse_mixed_item_forms_across_chunk_boundaries():
+    body = "\n".join([
+        json.dumps({"store_id": 3, "horizon_days": 14}),
+        json.dumps({"item_id": 1, "current_stock": 10}),
+        json.dumps([2, 20]),
+        json.dumps({"item_id": [3, 4], "current_stock": [30, 40]}),
+    ]).encode()
+
+    req = await parse_plan_ndjson(_chunks(body, 7))
+    assert req.store_id == 3
+    assert req.horizon_days == 14
+    assert isinstance(req.items, PlanItems)
+    assert list(req.items.item_ids) == [1, 2, 3, 4]
+    assert list(req.items.stocks) == [10, 20, 30, 40]
+    assert req.model_dump(mode="json")["items"][1] == {"item_id": 2, "current_stock": 20}
+
+
+@pytest.mark.asyncio
+async def test_parse_rejects_bad_item_line():
+    body = b'{"store_id": 1}\n{"item_id": "x", "current_stock": 1}\n'
+    with pytest.raises(PlanIngestError, match="line 2"):
+        await parse_plan_ndjson(_chunks(body, 64))
+
+
+@pytest.mark.asyncio
+async def test_ingest_endpoint_creates_plan(session_maker_client):
+    ingest_client, _ = session_maker_client
+    body = "\n".join([
+        json.dumps({"store_id": 1, "constraints": {"max_discount": 0.05}}),
+        json.dumps({"item_id": [101, 102], "current_stock": [10, 60]}),
+    ])
+    r = await ingest_client.post(
+        "/plans/ingest",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["status"] == "created"
+    assert [rec["item_id"] for rec in data["recommendations"]] == [101, 102]
+    assert data["recommendations"][0]["recommended_discount"] == 0.05
+
+    get_r = await ingest_client.get(f"/plans/{data['plan_id']}")
+    assert get_r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_ingest_endpoint_rejects_json_and_empty_items(session_maker_client):
+    ingest_client, _ = session_maker_client
+    r = await ingest_client.post("/plans/ingest", json={"store_id": 1})
+    assert r.status_code == 415
+
+    r = await ingest_client.post(
+        "/plans/ingest",
+        content=b'{"store_id": 1}\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_parse_long_columnar_line_in_small_chunks():
+    n = 200_000
+    body = (
+        json.dumps({"store_id": 1}) + "\n"
+        + json.dumps({"current_stock": list(range(n)), "item_id": list(range(n, 2 * n))})
+    ).encode()
+
+    req = await parse_plan_ndjson(_chunks(body, 256))
+    assert len(req.items) == n
+    assert req.items.item_ids[0] == n and req.items.stocks[-1] == n - 1
+
+
+@pytest.mark.asyncio
+async def test_parse_rejects_oversized_line(monkeypatch):
+    from rimas.services import ingest
+
+    monkeypatch.setattr(ingest, "MAX_LINE_BYTES", 64)
+    body = b'{"store_id": 1}\n{"item_id": [' + b"1, " * 100
+    with pytest.raises(PlanIngestError, match="line 2: longer than 64 bytes"):
+        await parse_plan_ndjson(_chunks(body, 16))
+
+
+@pytest.mark.asyncio
+async def test_parse_columnar_rejects_mismatched_columns():
+    body = b'{"store_id": 1}\n{"item_id": [1, 2], "current_stock": [5]}\n'
+    with pytest.raises(PlanIngestError, match="line 2"):
+        await parse_plan_ndjson(_chunks(body, 64))
+
+
+def test_stub_orchestrator_passes_plan_items(monkeypatch):
+    from rimas.api.schemas import ColumnarPlanRequest
+    from rimas.services import _orchestration_stub
+
+    seen = {}
+
+    class FakeGraph:
+        def invoke(self, state):
+            seen.update(state)
+            return state
+
+    monkeypatch.setattr(_orchestration_stub, "build_plan_graph", lambda: FakeGraph())
+    items = PlanItems([1, 2], [10, 60])
+    req = ColumnarPlanRequest.model_validate({"store_id": 1, "items": items})
+    draft = _orchestration_stub.generate_plan_stub(req)
+
+    assert seen["items"] is items
+    assert seen["context"]["items"] is items
+    assert [r["recommended_order_qty"] for r in draft["recommendations"]] == [40, 0]
@@ -0,0 +1,131 @@
+"""LLM agent node tests (rimas.agents.llm, scripts/fake_llm.py)."""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from rimas.agents import llm as llm_mod
+from rimas.agents.items import PlanItems
+from rimas.agents.llm import LLMClient, ResponseCache, TokenBucket, llm_node, prompt_key
+from rimas.agents.nodes import data_analysis_node, inventory_analysis_node
+from scripts.fake_llm import create_app, fake_answer
+
+STATE = {"request": {"store_id": 1, "horizon_days": 7}, "items": PlanItems([1, 2], [5, 60])}
+
+
+def _client(transport, **kwargs) -> LLMClient:
+    return LLMClient("http://fake/v1", "key", "fake-model", transport=transport, **kwargs)
+
+
+def _messages(i: int) -> list[dict]:
+    return [{"role": "user", "content": json.dumps({"draft": {"summary": f"plan {i}"}})}]
+
+
+class _SlowTransport(httpx.AsyncBaseTransport):
+    """Answers like the fake server after `delay_s`, tracking peak concurrency."""
+
+    def __init__(self, delay_s: float = 0.02) -> None:
+        self.delay_s = delay_s
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay_s)
+        finally:
+            self.active -= 1
+        body = json.loads(request.content)
+        content = fake_answer(body["messages"])
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+def test_prompt_key_normalizes_whitespace():
+    a = prompt_key("m", [{"role": "user", "content": "hello   world\n"}])
+    b = prompt_key("m", [{"role": "user", "content": " hello world"}])
+    assert a == b
+    assert a != prompt_key("other", [{"role": "user", "content": "hello world"}])
+
+
+@pytest.mark.asyncio
+async def test_llm_node_refines_draft_and_caches_responses(tmp_path):
+    app = create_app()
+    transport = httpx.ASGITransport(app=app)
+    client = _client(transport, cache=ResponseCache(tmp_path))
+    node = llm_node("data_analysis", data_analysis_node, lambda s: {"items": 2}, lambda: client)
+
+    out = (await node(STATE))["agent_outputs"]["data_analysis"]
+    assert out["source"] == "llm"
+    assert out["summary"].endswith("(reviewed)")
+    assert out["low_stock_count"] == 1
+    await node(STATE)
+    assert app.state.requests == 1 and client.counters["cache_hits"] == 1
+
+    # A fresh process (new client, same cache dir) is served from disk.
+    fresh = _client(transport, cache=ResponseCache(tmp_path))
+    node = llm_node("data_analysis", data_analysis_node, lambda s: {"items": 2}, lambda: fresh)
+    assert (await node(STATE))["agent_outputs"]["data_analysis"]["source"] == "llm"
+    assert app.state.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_shared_identical_calls():
+    transport = _SlowTransport()
+    client = _client(transport, max_concurrency=2, requests_per_s=1000, burst=1000)
+    await asyncio.gather(*(client.complete(_messages(i)) for i in range(6)))
+    assert transport.requests == 6 and transport.peak == 2
+
+    await asyncio.gather(*(client.complete(_messages(99)) for _ in range(5)))
+    assert transport.requests == 7
+    assert client.counters["shared"] == 4
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_calls():
+    bucket = TokenBucket(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    assert time.monotonic() - started >= 0.14
+
+
+@pytest.mark.asyncio
+async def test_timeouts_and_errors_fall_back_to_heuristic():
+    slow = _client(_SlowTransport(delay_s=1.0), timeout_s=0.05)
+    node = llm_node("inventory_analysis", inventory_analysis_node, lambda s: {}, lambda: slow)
+    out = (await node(STATE))["agent_outputs"]["inventory_analysis"]
+    assert out["source"] == "heuristic" and out["fallback_reason"] == "timeout"
+    assert out["avg_stock"] == inventory_analysis_node(STATE)["agent_outputs"]["inventory_analysis"]["avg_stock"]
+    assert slow.counters["timeouts"] == 1
+
+    failing = _client(httpx.ASGITransport(app=create_app(fail_rate=1.0)))
+    node = llm_node("inventory_analysis", inventory_analysis_node, lambda s: {}, lambda: failing)
+    out = (await node(STATE))["agent_outputs"]["inventory_analysis"]
+    assert out["fallback_reason"] == "HTTPStatusError"
+
+
+@pytest.mark.asyncio
+async def test_langgraph_plan_uses_llm_nodes(monkeypatch):
+    from rimas.api.schemas import CreatePlanRequest
+    from rimas.config import settings
+    from rimas.services import orchestration_langgraph
+
+    app = create_app()
+    monkeypatch.setattr(settings, "openai_api_key", "fake")
+    monkeypatch.setattr(llm_mod, "_client", _client(httpx.ASGITransport(app=app)))
+    orchestration_langgraph._build_graph.cache_clear()
+    try:
+        req = CreatePlanRequest(store_id=1, items=[{"item_id": 1, "current_stock": 5}])
+        draft = await orchestration_langgraph.generate_plan_langgraph(req)
+    finally:
+        orchestration_langgraph._build_graph.cache_clear()
+    outputs = draft["agent_outputs"]
+    assert {outputs[k]["source"] for k in ("data_analysis", "inventory_analysis", "marketing_analysis")} == {"llm"}
+    assert app.state.requests == 3
+    assert draft["recommendations"][0]["recommended_order_qty"] == 45
@@ -0,0 +1,78 @@
+"""Queue-based structured logging tests (JSON context, dropping, debug sampling)."""
+
+import json
+import logging
+import queue
+
+import pytest
+
+from rimas.logging import (
+    DebugSampler,
+    DroppingQueueHandler,
+    JsonFormatter,
+    log_context,
+    setup_logging,
+    stop_logging,
+)
+
+
+@pytest.fixture
+def queued_logger():
+    log_queue: queue.Queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    logger = logging.getLogger("rimas.tests.logging")
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    yield logger, handler, log_queue
+    logger.removeHandler(handler)
+    logger.propagate = True
+
+
+def test_records_carry_request_context_as_json(queued_logger):
+    logger, _, log_queue = queued_logger
+    with log_context(trace_id="t-1", store_id=7):
+        with log_context(plan_id="p-1"):
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.exception("Plan %s failed", "p-1", extra={"items": 3})
+        logger.info("outer")
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert entry["message"] == "Plan p-1 failed" and entry["level"] == "ERROR"
+    assert (entry["trace_id"], entry["store_id"], entry["plan_id"], entry["items"]) == ("t-1", 7, "p-1", 3)
+    assert "ValueError: boom" in entry["exc_info"]
+    outer = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert outer["trace_id"] == "t-1" and "plan_id" not in outer
+
+
+def test_full_queue_drops_instead_of_blocking(queued_logger):
+    logger, handler, log_queue = queued_logger
+    for i in range(5):
+        logger.warning("record %d", i)
+    assert log_queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_debug_records_sampled_per_call_site(queued_logger):
+    logger, handler, log_queue = queued_logger
+    handler.addFilter(DebugSampler(0.1))
+    log_queue.maxsize = 0
+    for _ in range(25):
+        logger.debug("hot loop")
+    logger.debug("rare")
+    logger.info("info")
+    messages = [log_queue.get_nowait().getMessage() for _ in range(log_queue.qsize())]
+    assert messages.count("hot loop") == 3 and messages[-2:] == ["rare", "info"]
+
+
+def test_setup_logging_writes_json_lines_from_listener(capsys):
+    try:
+        setup_logging(json_format=True)
+        with log_context(trace_id="abc"):
+            logging.getLogger("rimas.tests").warning("hello", extra={"store_id": 1})
+        stop_logging()  # flushes the queue
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+        assert {"message": "hello", "trace_id": "abc", "store_id": 1}.items() <= lines[-1].items()
+    finally:
+        setup_logging()
@@ -0,0 +1,74 @@
+"""Schema version check / upgrade tests."""
+
+from sqlalchemy import create_engine, inspect, select, text
+
+from rimas.db.migrations import current_version, upgrade_schema
+from rimas.db.models import SCHEMA_VERSION, Plan
+
+
+def test_upgrade_creates_schema_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rimas.db'}")
+    with engine.begin() as conn:
+        assert current_version(conn) is None
+        assert upgrade_schema(conn) is True
+    with engine.begin() as conn:
+        assert current_version(conn) == SCHEMA_VERSION
+        assert upgrade_schema(conn) is False
+
+
+def test_upgrade_adds_missing_nullable_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rimas.db'}")
+    with engine.begin() as conn:
+        # plans table as created before store_id existed
+        conn.execute(text(
+            "CREATE TABLE plans (id VARCHAR(36) PRIMARY KEY, request_payload JSON NOT NULL, "
+            "agent_outputs JSON NOT NULL, final_decision JSON NOT NULL, status VARCHAR(50), "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        upgrade_schema(conn)
+    with engine.connect() as conn:
+        columns = {c["name"] for c in inspect(conn).get_columns("plans")}
+        indexes = {i["name"] for i in inspect(conn).get_indexes("plans")}
+    assert "store_id" in columns
+    assert {"ix_plans_store_id", "ix_plans_created_at"} <= indexes
+
+
+def test_upgrade_backfills_store_id_from_request_payload(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rimas.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE plans (id VARCHAR(36) PRIMARY KEY, request_payload JSON NOT NULL, "
+            "agent_outputs JSON NOT NULL, final_decision JSON NOT NULL, status VARCHAR(50), "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO plans (id, request_payload, agent_outputs, final_decision, status) "
+            "VALUES ('p1', '{\"store_id\": 7, \"items\": []}', '{}', '{}', 'created')"
+        ))
+        upgrade_schema(conn)
+    with engine.connect() as conn:
+        assert conn.execute(select(Plan.store_id).where(Plan.id == "p1")).scalar_one() == 7
+
+
+def test_upgrade_builds_plan_daily_stats_from_plans(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rimas.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE plans (id VARCHAR(36) PRIMARY KEY, store_id INTEGER, request_payload JSON NOT NULL, "
+            "agent_outputs JSON NOT NULL, final_decision JSON NOT NULL, status VARCHAR(50), "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO plans VALUES "
+            "('p1', 5, '{}', '{}', '{\"recommendations\": [{\"recommended_order_qty\": 4}]}', 'approved', "
+            "'2026-03-01 10:00:00', '2026-03-02 10:00:00'), "
+            "('p2', 5, '{}', '{}', '{\"recommendations\": [{\"recommended_order_qty\": 2}]}', 'created', "
+            "'2026-03-01 11:00:00', '2026-03-01 11:00:00')"
+        ))
+        upgrade_schema(conn)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT day, created, approved, order_qty_sum, decision_latency_s_sum "
+            "FROM plan_daily_stats ORDER BY day"
+        )).all()
+    assert [tuple(r) for r in rows] == [("2026-03-01", 2, 0, 6.0, 0.0), ("2026-03-02", 0, 1, 0.0, 86400.0)]
@@ -0,0 +1,128 @@
+"""Model manager tests (hot swap, shadow scoring)."""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from rimas.ml.model_manager import ModelManager
+
+
+class _Model:
+    def __init__(self, offset: float, delay_s: float = 0.0):
+        self.offset = offset
+        self.delay_s = delay_s
+
+    def predict(self, rows):
+        time.sleep(self.delay_s)
+        return [row["quantity"] + self.offset for row in rows]
+
+
+class _Registry:
+    """Stage -> version mapping; loading a version builds a `_Model`."""
+
+    def __init__(self, stages: dict[str, str]):
+        self.stages = stages
+        self.loads = 0
+        self.load_gate = threading.Event()
+        self.load_gate.set()
+
+    def resolve(self, name, stage):
+        if stage not in self.stages:
+            raise LookupError(stage)
+        return SimpleNamespace(version=self.stages[stage])
+
+    def load(self, cached):
+        self.load_gate.wait()
+        self.loads += 1
+        return _Model(float(cached.version))
+
+
+def _manager(registry: _Registry, **kwargs) -> ModelManager:
+    return ModelManager(
+        "demand_model", resolver=registry.resolve, loader=registry.load, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_swaps_only_on_new_version():
+    registry = _Registry({"Production": "1"})
+    manager = _manager(registry)
+    assert manager.predict([{"quantity": 1}]) is None
+
+    assert await manager.refresh() is True
+    assert manager.predict([{"quantity": 1}]) == ([2.0], "1")
+    assert await manager.refresh() is False
+    assert registry.loads == 1
+
+    registry.stages["Production"] = "2"
+    assert await manager.refresh() is True
+    assert manager.version == "2"
+    assert manager.predict([{"quantity": 1}]) == ([3.0], "2")
+
+
+@pytest.mark.asyncio
+async def test_loading_does_not_block_predictions():
+    registry = _Registry({"Production": "1"})
+    manager = _manager(registry)
+    await manager.refresh()
+
+    registry.stages["Production"] = "2"
+    registry.load_gate.clear()
+    refresh = asyncio.create_task(manager.refresh())
+    await asyncio.sleep(0.05)
+    # v2 is still loading in a worker thread; v1 keeps serving.
+    assert manager.predict([{"quantity": 0}]) == ([1.0], "1")
+    registry.load_gate.set()
+    assert await refresh is True
+    assert manager.version == "2"
+
+
+@pytest.mark.asyncio
+async def test_registry_failure_keeps_current_version():
+    registry = _Registry({"Production": "1"})
+    manager = _manager(registry)
+    await manager.refresh()
+    del registry.stages["Production"]
+    assert await manager.refresh() is False
+    assert manager.version == "1"
+
+
+@pytest.mark.asyncio
+async def test_shadow_scoring_records_deltas_off_request_path():
+    registry = _Registry({"Production": "1", "Staging": "4"})
+    manager = _manager(registry, candidate_stage="Staging", shadow_fraction=1.0)
+    await manager.refresh()
+
+    preds, version = manager.predict([{"quantity": 1}, {"quantity": 2}])
+    assert (preds, version) == ([2.0, 3.0], "1")
+    deadline = time.monotonic() + 2
+    while manager.shadow_stats.scored == 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+    stats = manager.status()
+    assert stats["candidate_version"] == "4"
+    assert stats["shadow"]["scored"] == 1
+    assert stats["shadow"]["mean_abs_delta"] == pytest.approx(3.0)
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_plan_metadata_stamps_active_version(monkeypatch):
+    from rimas.api.schemas import CreatePlanRequest
+    from rimas.ml import model_manager
+    from rimas.services.orchestration import generate_plan
+
+    registry = _Registry({"Production": "7"})
+    manager = _manager(registry)
+    await manager.refresh()
+    monkeypatch.setitem(model_manager._managers, "demand_model", manager)
+
+    req = CreatePlanRequest.model_validate(
+        {"store_id": 1, "items": [{"item_id": 1, "current_stock": 5}]}
+    )
+    draft = await generate_plan(req)
+    assert draft["metadata"].model_version == "7"
+    assert draft["final_decision"]["metadata"]["model_version"] == "7"
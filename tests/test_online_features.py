@@ -0,0 +1,81 @@
+"""Online feature cache tests."""
+
+import numpy as np
+import pytest
+
+from rimas.ml.features import FEATURE_NAMES
+from rimas.ml.online_features import OnlineFeatureCache
+
+
+class _Store:
+    """Feature store stand-in: item i of any store has features [i, i, ...]."""
+
+    def __init__(self, known: set[int]):
+        self.known = known
+        self.calls: list[list[int]] = []
+
+    def lookup(self, store_id, item_ids):
+        self.calls.append(list(item_ids))
+        found = np.array([i in self.known for i in item_ids], bool)
+        rows = np.full((len(item_ids), len(FEATURE_NAMES)), np.nan, np.float32)
+        rows[found] = np.asarray(item_ids, np.float32)[found][:, None]
+        return rows, found
+
+
+class _Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_many_batches_misses_and_caches_hits():
+    store = _Store({1, 2, 3})
+    cache = OnlineFeatureCache(store, max_entries=10, ttl_s=60)
+
+    rows, found = cache.get_many(7, [1, 2, 99])
+    assert found.tolist() == [True, True, False]
+    assert rows[1, 0] == 2.0 and np.isnan(rows[2]).all()
+    assert store.calls == [[1, 2, 99]]
+
+    rows, found = cache.get_many(7, [3, 2, 99, 1])
+    assert store.calls[-1] == [3]  # unknown item 99 is negatively cached
+    assert found.tolist() == [True, True, False, True]
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 4
+
+
+def test_ttl_expiry_and_lru_bound():
+    store = _Store({1, 2, 3})
+    clock = _Clock()
+    cache = OnlineFeatureCache(store, max_entries=2, ttl_s=10, clock=clock)
+
+    cache.get_many(1, [1, 2])
+    cache.get_many(1, [1])  # 1 is now most recently used
+    cache.get_many(1, [3])  # evicts 2
+    assert cache.stats()["entries"] == 2
+    cache.get_many(1, [1, 2])
+    assert store.calls[-1] == [2]
+
+    clock.now = 11
+    cache.get_many(1, [1])
+    assert store.calls[-1] == [1]
+
+
+def test_predict_demand_batch_makes_one_model_call(monkeypatch):
+    from rimas.ml import inference, online_features
+
+    store = _Store({5})
+    monkeypatch.setattr(online_features, "_cache", OnlineFeatureCache(store))
+    calls = []
+
+    def fake_predict(name, rows):
+        calls.append(rows)
+        return [row.get("demand_mean_7", 0.0) * 2 for row in rows]
+
+    monkeypatch.setattr(inference, "_predict", fake_predict)
+    out = inference.predict_demand_batch(1, [5, 6])
+    assert len(calls) == 1
+    assert calls[0][0]["demand_mean_7"] == pytest.approx(5.0)
+    assert "demand_mean_7" not in calls[0][1]
+    assert [r["prediction"] for r in out] == [10.0, 0.0]
+    assert store.calls == [[5, 6]]
@@ -0,0 +1,82 @@
+"""Plan read cache tests (ETag, If-None-Match, invalidation, deferred columns)."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import InvalidRequestError
+
+from rimas.db.models import Plan
+from rimas.services import plan_cache as plan_cache_mod
+from rimas.services.plan_cache import PlanResponseCache, etag_matches
+from rimas.services.plan_service import get_plan
+
+PLAN = {"store_id": 1, "items": [{"item_id": 1, "current_stock": 10}]}
+
+
+@pytest.fixture
+def plan_cache(monkeypatch):
+    cache = PlanResponseCache(max_entries=100, ttl_s=60.0)
+    monkeypatch.setattr(plan_cache_mod, "_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_and_invalidation_on_approve(session_maker_client, plan_cache):
+    client, _ = session_maker_client
+    plan_id = (await client.post("/plans/", json=PLAN)).json()["plan_id"]
+
+    r = await client.get(f"/plans/{plan_id}")
+    assert r.status_code == 200 and r.json()["status"] == "created"
+    etag = r.headers["ETag"]
+
+    r = await client.get(f"/plans/{plan_id}", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert r.status_code == 304 and r.content == b"" and r.headers["ETag"] == etag
+    assert plan_cache.stats()["hits"] == 1
+
+    await client.post(f"/plans/{plan_id}/approve")
+    r = await client.get(f"/plans/{plan_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["status"] == "approved"
+    assert r.headers["ETag"] != etag
+    assert plan_cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_revalidated_against_updated_at(session_maker_client, plan_cache):
+    client, maker = session_maker_client
+    plan_cache.ttl_s = 0.0
+    plan_id = (await client.post("/plans/", json=PLAN)).json()["plan_id"]
+    etag = (await client.get(f"/plans/{plan_id}")).headers["ETag"]
+
+    # Unchanged row: revalidated with a one-column lookup, same body.
+    r = await client.get(f"/plans/{plan_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and plan_cache.stats()["revalidated"] == 1
+
+    # Changed by "another worker": the entry is replaced.
+    async with maker() as session:
+        await session.execute(
+            update(Plan)
+            .where(Plan.id == plan_id)
+            .values(status="rejected", updated_at=datetime.utcnow() + timedelta(seconds=1))
+        )
+        await session.commit()
+    r = await client.get(f"/plans/{plan_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["status"] == "rejected"
+
+
+@pytest.mark.asyncio
+async def test_get_plan_skips_large_columns(session_maker_client):
+    client, maker = session_maker_client
+    plan_id = (await client.post("/plans/", json=PLAN)).json()["plan_id"]
+    async with maker() as session:
+        plan = await get_plan(session, plan_id)
+        assert plan.final_decision["recommendations"]
+        with pytest.raises(InvalidRequestError):
+            plan.agent_outputs
+    assert (await client.get("/plans/does-not-exist")).status_code == 404
+
+
+def test_etag_matching():
+    assert etag_matches('"a"', '"a"') and etag_matches("*", '"a"')
+    assert etag_matches('W/"a"', '"a"') and etag_matches('"b", "a"', '"a"')
+    assert not etag_matches(None, '"a"') and not etag_matches('"b"', '"a"')
@@ -0,0 +1,50 @@
+"""Plan statistics rollup tests (in-transaction counters, GET /plans/stats)."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from rimas.db.models import PlanDailyStats
+
+
+def _plan(store_id: int) -> dict:
+    return {"store_id": store_id, "items": [{"item_id": 1, "current_stock": 0}, {"item_id": 2, "current_stock": 3}]}
+
+
+@pytest.mark.asyncio
+async def test_stats_follow_created_and_decided_plans(session_maker_client):
+    client, maker = session_maker_client
+    created = [(await client.post("/plans/", json=_plan(s))).json() for s in (1, 1, 2)]
+    await client.post(f"/plans/{created[0]['plan_id']}/approve")
+    await client.post(f"/plans/{created[0]['plan_id']}/approve")  # no second count
+    await client.post(f"/plans/{created[1]['plan_id']}/reject")
+
+    r = await client.get("/plans/stats", params={"store_id": 1})
+    assert r.status_code == 200
+    body = r.json()
+    today = datetime.utcnow().date().isoformat()
+    assert body["end"] == today and len(body["days"]) == 1 and body["days"][0]["day"] == today
+    totals = body["totals"]
+    assert (totals["created"], totals["approved"], totals["rejected"]) == (2, 1, 1)
+    qty = [rec["recommended_order_qty"] for plan in created[:2] for rec in plan["recommendations"]]
+    assert totals["avg_order_qty"] == pytest.approx(sum(qty) / len(qty))
+    assert totals["avg_decision_latency_s"] >= 0
+
+    everything = (await client.get("/plans/stats")).json()["totals"]
+    assert everything["created"] == 3
+    async with maker() as session:
+        assert await session.scalar(select(func.count()).select_from(PlanDailyStats)) == 2
+
+
+@pytest.mark.asyncio
+async def test_stats_batch_plans_and_range_checks(session_maker_client):
+    client, _ = session_maker_client
+    await client.post("/plans/batch", json={"plans": [_plan(3), _plan(3), _plan(4)]})
+    assert (await client.get("/plans/stats", params={"store_id": 3})).json()["totals"]["created"] == 2
+
+    past = (datetime.utcnow() - timedelta(days=400)).date()
+    empty = (await client.get("/plans/stats", params={"start": past, "end": past})).json()
+    assert empty["days"] == [] and empty["totals"]["avg_order_qty"] is None
+    assert (await client.get("/plans/stats", params={"start": past})).status_code == 400
+    assert (await client.get("/plans/stats", params={"start": "2026-02-02", "end": "2026-02-01"})).status_code == 400
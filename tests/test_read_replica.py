@@ -0,0 +1,82 @@
+"""Read-replica routing tests, with two SQLite files standing in for primary and replica."""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from rimas.api.main import app
+from rimas.db import replica as replica_mod
+from rimas.db import session as session_mod
+from rimas.db.models import Base
+from rimas.db.replica import LAST_WRITE_COOKIE, ReplicaRouter
+from rimas.services import plan_cache as plan_cache_mod
+from rimas.services.plan_cache import PlanResponseCache
+
+PLAN = {"store_id": 1, "items": [{"item_id": 1, "current_stock": 10}]}
+
+
+@pytest.fixture
+async def primary_and_replica(tmp_path, monkeypatch):
+    engines = []
+    for name in ("primary", "replica"):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        engines.append(engine)
+    primary, replica = engines
+    lag = {"s": 0.0}
+
+    async def probe(engine):
+        return lag["s"]
+
+    router = ReplicaRouter(replica, max_lag_s=5.0, read_your_writes_s=30.0, check_interval_s=0.0, lag_probe=probe)
+    monkeypatch.setattr(
+        session_mod,
+        "_session_maker",
+        async_sessionmaker(primary, class_=AsyncSession, expire_on_commit=False, autoflush=False),
+    )
+    monkeypatch.setattr(replica_mod, "_router", router)
+    monkeypatch.setattr(plan_cache_mod, "_cache", PlanResponseCache(ttl_s=0.0))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client, router, lag
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_follow_writer_then_replica_then_lag_fallback(primary_and_replica):
+    client, router, lag = primary_and_replica
+    r = await client.post("/plans/", json=PLAN)
+    assert LAST_WRITE_COOKIE in r.cookies
+    plan_id = r.json()["plan_id"]
+
+    # The writer reads its own write from the primary.
+    assert (await client.get(f"/plans/{plan_id}")).status_code == 200
+    assert router.counters["primary_sticky"] == 1
+
+    # Other clients read the replica, which (never replicating) lacks the plan.
+    client.cookies.clear()
+    assert (await client.get(f"/plans/{plan_id}")).status_code == 404
+    assert router.counters["replica"] == 1
+
+    # A lagging replica is bypassed.
+    lag["s"] = 60.0
+    assert (await client.get(f"/plans/{plan_id}")).status_code == 200
+    assert router.counters["primary_lag"] == 1
+
+    health = (await client.get("/health/replica")).json()
+    assert health["enabled"] and health["lag_s"] == 60.0
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_falls_back_to_primary(primary_and_replica):
+    client, router, _ = primary_and_replica
+
+    async def failing_probe(engine):
+        raise ConnectionError("replica down")
+
+    router._lag_probe = failing_probe
+    plan_id = (await client.post("/plans/", json=PLAN)).json()["plan_id"]
+    client.cookies.clear()
+    assert (await client.get(f"/plans/{plan_id}")).status_code == 200
+    assert router.lag_s is None and router.counters["primary_lag"] == 1
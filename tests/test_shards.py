@@ -0,0 +1,84 @@
+"""Store-level sharding tests (shard-encoded ids, routing, fan-out)."""
+
+import json
+from uuid import UUID
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from rimas.api.main import app
+from rimas.db import shards as shards_mod
+from rimas.db.migrations import upgrade_schema
+from rimas.db.models import Plan, PlanEvent
+from rimas.db.shards import ShardRegistry, new_plan_id, shard_of_plan_id
+
+
+def _plan(store_id: int) -> dict:
+    return {"store_id": store_id, "items": [{"item_id": 1, "current_stock": 2}]}
+
+
+@pytest.fixture
+async def sharded_client(tmp_path, monkeypatch):
+    """Two SQLite shards; store 7 is pinned to shard 1, others go by store_id % 2."""
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path / f'shard{i}.db'}") for i in range(2)]
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+    registry = ShardRegistry(engines, shard_map={7: 1})
+    monkeypatch.setattr(shards_mod, "_registry", registry)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client, registry
+    for engine in engines:
+        await engine.dispose()
+
+
+async def _count(registry: ShardRegistry, shard: int, model) -> int:
+    async with registry.session_makers[shard]() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+def test_plan_ids_encode_shard():
+    for shard in (0, 1, 255):
+        plan_id = new_plan_id(shard)
+        assert UUID(plan_id).version == 8 and shard_of_plan_id(plan_id) == shard
+    assert shard_of_plan_id(new_plan_id()) == 0  # made before sharding
+    assert shard_of_plan_id("not-a-uuid") == 0
+    with pytest.raises(ValueError):
+        ShardRegistry([None, None], shard_map={1: 2})
+
+
+@pytest.mark.asyncio
+async def test_plans_routed_to_store_shard(sharded_client):
+    client, registry = sharded_client
+    pinned = (await client.post("/plans/", json=_plan(7))).json()
+    hashed = (await client.post("/plans/", json=_plan(2))).json()
+    assert shard_of_plan_id(pinned["plan_id"]) == 1 and shard_of_plan_id(hashed["plan_id"]) == 0
+    assert await _count(registry, 0, Plan) == 1 and await _count(registry, 1, Plan) == 1
+    assert await _count(registry, 1, PlanEvent) > 0
+
+    r = await client.post(f"/plans/{pinned['plan_id']}/approve")
+    assert r.json()["status"] == "approved"
+    assert (await client.get(f"/plans/{pinned['plan_id']}")).json()["status"] == "approved"
+    assert (await client.get(f"/plans/{hashed['plan_id']}")).json()["status"] == "created"
+
+    batch = (await client.post("/plans/batch", json={"plans": [_plan(3), _plan(4), _plan(7)]})).json()
+    assert [shard_of_plan_id(r["plan_id"]) for r in batch["results"]] == [1, 0, 1]
+    assert await _count(registry, 0, Plan) == 2 and await _count(registry, 1, Plan) == 3
+
+
+@pytest.mark.asyncio
+async def test_stats_and_export_fan_out(sharded_client):
+    client, _ = sharded_client
+    for store_id in (7, 2, 7, 3):
+        await client.post("/plans/", json=_plan(store_id))
+
+    assert (await client.get("/plans/stats")).json()["totals"]["created"] == 4
+    assert (await client.get("/plans/stats", params={"store_id": 7})).json()["totals"]["created"] == 2
+
+    r = await client.get("/plans/export")
+    records = [json.loads(line) for line in r.text.splitlines()]
+    assert [rec["store_id"] for rec in records] == [7, 2, 7, 3]  # merged by created_at
+    r = await client.get("/plans/export", params={"store_id": 2})
+    assert [json.loads(line)["store_id"] for line in r.text.splitlines()] == [2]
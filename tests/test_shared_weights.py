@@ -0,0 +1,50 @@
+"""Shared-memory model weight tests."""
+
+from pathlib import Path
+
+import numpy as np
+
+from rimas.ml.artifact_cache import CachedModel, ModelArtifactCache
+from rimas.ml.shared_weights import dump_shared, load_mapped, load_shared
+
+
+class _LinearModel:
+    def __init__(self, coef: np.ndarray, bias: np.ndarray):
+        self.coef = coef
+        self.bias = bias
+        self.coef_alias = coef
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        return x @ self.coef + self.bias
+
+
+def test_large_arrays_are_memory_mapped_read_only(tmp_path):
+    model = _LinearModel(np.arange(100_000, dtype=np.float64), np.array([1.0]))
+    dump_shared(model, tmp_path / "m")
+
+    loaded = load_mapped(tmp_path / "m")
+    assert isinstance(loaded.coef, np.memmap)
+    assert not loaded.coef.flags.writeable
+    assert not isinstance(loaded.bias, np.memmap)  # below the size threshold
+    assert loaded.coef_alias is loaded.coef  # written once, mapped once
+    assert len(list((tmp_path / "m").glob("*.npy"))) == 1
+    x = np.ones(100_000)
+    assert loaded.predict(x)[0] == model.predict(x)[0]
+
+
+def test_load_shared_materializes_once(tmp_path):
+    loads = []
+
+    def loader(path: Path):
+        loads.append(path)
+        return _LinearModel(np.ones(20_000), np.zeros(1))
+
+    cached = CachedModel("demand_model", "Production", "1", "abc", tmp_path / "objects" / "abc")
+    worker_a = ModelArtifactCache(tmp_path, max_bytes=10**9)
+    worker_b = ModelArtifactCache(tmp_path, max_bytes=10**9)
+
+    first = load_shared(worker_a, cached, loader)
+    second = load_shared(worker_b, cached, loader)
+    assert len(loads) == 1
+    assert isinstance(second.coef, np.memmap)
+    assert second.coef.filename == first.coef.filename
@@ -0,0 +1,85 @@
+"""Streaming anomaly detection tests (POST /detect-anomaly/stream)."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from rimas.ml.streaming import P2Quantile, StreamingDetector
+from rimas.services import anomaly_service
+
+T0 = datetime(2024, 1, 1)
+
+
+def test_p2_quantile_tracks_distribution():
+    rng = random.Random(0)
+    sketches = {p: P2Quantile(p) for p in (0.01, 0.5, 0.99)}
+    for _ in range(20_000):
+        x = rng.gauss(100, 10)
+        for sketch in sketches.values():
+            sketch.add(x)
+    assert sketches[0.5].value() == pytest.approx(100, abs=1)
+    assert sketches[0.99].value() == pytest.approx(123.3, abs=2)
+    assert sketches[0.01].value() == pytest.approx(76.7, abs=2)
+    assert len(sketches[0.5].heights) == 5  # constant memory
+
+
+class _Point:
+    def __init__(self, metric, ts, value):
+        self.metric, self.ts, self.value = metric, ts, value
+
+
+def test_detector_flags_drift_relative_to_own_history():
+    rng = random.Random(1)
+    det = StreamingDetector(halflife_points=50, z_threshold=4, warmup=20)
+    # Two metrics at very different scales: a value normal for one is an
+    # outlier for the other.
+    points = [
+        _Point(m, T0 + timedelta(minutes=i), rng.gauss(base, base / 20))
+        for i in range(200)
+        for m, base in (("sales", 1000.0), ("returns", 10.0))
+    ]
+    results = det.score_points(1, points)
+    assert sum(r.is_anomaly for r in results) <= 2
+
+    spike = det.score_points(1, [
+        _Point("returns", T0 + timedelta(days=1), 60.0),
+        _Point("sales", T0 + timedelta(days=1), 1010.0),
+    ])
+    assert [r.is_anomaly for r in spike] == [True, False]
+
+
+def test_out_of_order_points_are_scored_but_not_folded_in():
+    det = StreamingDetector(warmup=0)
+    det.score_points(1, [_Point("m", T0 + timedelta(minutes=i), float(i % 3)) for i in range(10)])
+    count = det.states[(1, "m")].count
+    (late,) = det.score_points(1, [_Point("m", T0, 1.0)])
+    assert late.late
+    assert det.states[(1, "m")].count == count
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_checkpoints_and_restores_state(session_maker_client, monkeypatch):
+    monkeypatch.setattr(anomaly_service, "_detector", None)
+    client, maker = session_maker_client
+    points = [
+        {"metric": "sales", "ts": (T0 + timedelta(hours=i)).isoformat(), "value": 100 + (i % 5)}
+        for i in range(50)
+    ]
+    r = await client.post("/detect-anomaly/stream", json={"store_id": 7, "points": points})
+    assert r.status_code == 200
+    body = r.json()
+    assert len(body["results"]) == 50
+    assert not any(res["is_anomaly"] for res in body["results"])
+
+    assert await anomaly_service.checkpoint(maker) == 1
+    assert await anomaly_service.checkpoint(maker) == 0
+
+    # Simulate a restart: fresh in-memory detector, state comes from the DB.
+    monkeypatch.setattr(anomaly_service, "_detector", None)
+    spike = {"metric": "sales", "ts": (T0 + timedelta(days=3)).isoformat(), "value": 500}
+    r = await client.post("/detect-anomaly/stream", json={"store_id": 7, "points": [spike]})
+    (result,) = r.json()["results"]
+    assert result["is_anomaly"]
+    assert result["mean"] == pytest.approx(102, abs=2)
+    assert anomaly_service.get_detector().states[(7, "sales")].count == 51
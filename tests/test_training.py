@@ -0,0 +1,111 @@
+"""Training pipeline tests (scripts/train.py, rimas.ml.training)."""
+
+import csv
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from rimas.ml.features import FEATURE_NAMES, point_in_time_features, read_sales_daily
+from rimas.ml.models import RidgeStats
+from rimas.ml.training import cross_validate, time_fold_bounds, train_anomaly, train_demand
+
+
+def _write_sales(path, n_days: int = 120, n_items: int = 4):
+    rng = np.random.default_rng(0)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "store_id", "item_id", "units_sold", "on_hand", "promo"])
+        for d in range(n_days):
+            day = (date(2024, 1, 1) + timedelta(days=d)).isoformat()
+            for item in range(n_items):
+                promo = int(rng.random() < 0.2)
+                units = max(0, int(rng.poisson(3 + 2 * item) * (1.5 if promo else 1)))
+                writer.writerow([day, 1, item, units, 20, promo])
+
+
+def _linear_data(n: int = 600):
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(n, len(FEATURE_NAMES)))
+    y = x @ np.arange(1, len(FEATURE_NAMES) + 1) + 5 + rng.normal(scale=0.1, size=n)
+    days = np.repeat(np.arange(n // 6), 6)
+    return x, y, days
+
+
+def test_time_folds_only_validate_on_later_days():
+    days = np.repeat(np.arange(10), 3)
+    bounds = time_fold_bounds(days, 4)
+    assert len(bounds) == 4
+    assert all(lo < hi for lo, hi in bounds)
+    assert bounds[0][0] > 0 and bounds[-1][1] == 10
+    assert time_fold_bounds(np.arange(3), 4) == []
+
+
+def test_parallel_cv_selects_alpha_and_fits():
+    x, y, days = _linear_data()
+    cv = cross_validate(x, y, days, alphas=(0.01, 1000.0), n_folds=3, workers=2)
+    assert cv[0.01] < cv[1000.0]
+
+    model, metrics = train_demand(x, y, days, alphas=(0.01, 1000.0), n_folds=3, workers=2)
+    assert metrics["alpha"] == 0.01
+    np.testing.assert_allclose(model.coef, [1, 2, 3, 4, 5, 5], atol=0.05)
+
+
+def test_warm_start_folds_new_data_into_statistics():
+    x, y, days = _linear_data()
+    old = days < 60
+    base, _ = train_demand(x[old], y[old], days[old], alphas=(0.1,), workers=1)
+    assert base.trained_through_day == 59
+
+    warm, metrics = train_demand(x, y, days, alphas=(0.1,), workers=1, base=base)
+    full = RidgeStats.from_data(x, y)
+    assert metrics["n_new_examples"] == (~old).sum()
+    assert warm.stats.n == full.n
+    np.testing.assert_allclose(warm.coef, full.solve(0.1))
+
+
+def test_demand_model_predicts_from_features_and_falls_back_to_mean(tmp_path):
+    _write_sales(tmp_path / "sales.csv")
+    daily = read_sales_daily([tmp_path / "sales.csv"])
+    x, y, days = point_in_time_features(daily, horizon_days=7)
+    assert len(x) == 4 * (120 - 28 - 7 + 1)
+
+    model, _ = train_demand(x, y, days, workers=2)
+    row = dict(zip(FEATURE_NAMES, x[-1]))
+    preds = model.predict(None, [{**row, "quantity": 2.0}, {"quantity": 1.0}])
+    assert preds[0] > 0
+    assert preds[1] == pytest.approx(model.mean_demand)
+
+
+def test_anomaly_model_threshold(tmp_path):
+    _write_sales(tmp_path / "sales.csv")
+    daily = read_sales_daily([tmp_path / "sales.csv"])
+    model, metrics = train_anomaly(daily)
+    assert metrics["threshold"] >= 3.0
+    flags = model.predict(None, [{"metric": "units_sold", "value": 5}, {"metric": "units_sold", "value": 500}])
+    assert flags.tolist() == [False, True]
+
+
+def test_train_script_registers_production_models(tmp_path):
+    mlflow = pytest.importorskip("mlflow")
+    import mlflow.pyfunc
+
+    from scripts import train
+
+    _write_sales(tmp_path / "sales.csv", n_days=80)
+    uri = (tmp_path / "mlruns").as_uri()
+    args = ["--sales", str(tmp_path / "sales.csv"), "--tracking-uri", uri, "--workers", "2"]
+    train.main(train.parse_args(args))
+    train.main(train.parse_args(args + ["--warm-start", "--model", "demand"]))
+
+    mlflow.set_tracking_uri(uri)
+    demand = mlflow.pyfunc.load_model("models:/demand_model/Production")
+    assert demand.metadata.run_id
+    assert len(demand.predict([{"product_id": "1", "quantity": 1.0}])) == 1
+    anomaly = mlflow.pyfunc.load_model("models:/anomaly_model/Production")
+    assert anomaly.predict([{"metric": "units_sold", "value": 10_000}]).tolist() == [True]
+
+    from mlflow.tracking import MlflowClient
+
+    versions = MlflowClient().get_latest_versions("demand_model", ["Production"])
+    assert [str(v.version) for v in versions] == ["2"]